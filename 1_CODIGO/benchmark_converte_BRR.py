@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:09:14 2026
+
+@author: cecil.skaleski, est.angelo
+
+Micro-benchmark da limpeza de espaços (converte_BRR_v7.remove_espacos) e do ano de imobilização (ano_imobilizacao) em relação à
+aplicação célula a célula, por tipo de coluna (resultados conferidos com a referência).
+
+Execução (a partir da pasta 1_CODIGO): python benchmark_converte_BRR.py [nº de linhas, padrão 1000000]
+"""
+
+import sys
+import time
+
+import converte_BRR_v7
+import test_converte_BRR
+
+def cronometra(funcao, *args):
+    #Retorna o resultado e o tempo de execução [s]
+    t = time.perf_counter()
+    res = funcao(*args)
+    return res, time.perf_counter() - t
+
+def main(n=1000000):
+    df, datas = test_converte_BRR.monta_base(n)
+    print(f'{n} linhas')
+    print(f'{"caso":<40}{"célula a célula":>18}{"vetorizado":>14}{"ganho":>10}')
+    casos = [(f'remove_espacos: {col}', converte_BRR_v7.remove_espacos, test_converte_BRR.remove_espacos_referencia, df[[col]])
+             for col in ['texto', 'mista', 'distintos']]
+    casos.append(('ano_imobilizacao', converte_BRR_v7.ano_imobilizacao, test_converte_BRR.ano_imobilizacao_referencia, datas))
+    for nome, funcao, referencia, dados in casos:
+        ref, t_ref = cronometra(referencia, dados)
+        res, t_res = cronometra(funcao, dados)
+        assert res.equals(ref), nome
+        print(f'{nome:<40}{t_ref:>17.3f}s{t_res:>13.3f}s{t_ref / t_res:>9.1f}x')
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
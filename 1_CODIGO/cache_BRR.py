@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:05:42 2026
+
+@author: cecil.skaleski, est.angelo
+
+Cache colunar (Parquet) dos arquivos excel de entrada, indexado pelo hash do conteúdo dos arquivos (comum às etapas converte, consolida e movimenta).
+"""
+
+import os
+import shutil
+import hashlib
+import functools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+import openpyxl
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+#Pasta do cache (ao lado das pastas de entrada e saída das etapas)
+PASTA_CACHE = os.path.join(os.path.dirname(__file__), '0_CACHE')
+#Tamanho máximo do cache [bytes]: acima do limite, os arquivos acessados há mais tempo são removidos (LRU)
+TAMANHO_MAX_CACHE = 2 * 1024**3
+#Versão do formato do cache (alterar invalida as entradas existentes)
+VERSAO_CACHE = 1
+EXTENSOES_CACHE = ('.parquet', '.pkl')
+#Textos lidos como valor ausente (NaN) pelo pd.read_excel (na_values padrão do pandas)
+VALORES_NULOS = frozenset(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                           '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+
+#______________________________________________________________________________________
+#Funções acessórias
+def hash_arquivo(path, tam_bloco=2**20):
+    #Calcula o hash (sha256) do conteúdo do arquivo
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(tam_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def chave_cache(path, limpa, kwargs):
+    #A chave combina o conteúdo do arquivo com os parâmetros de leitura (aba, colunas, etc.) e de limpeza
+    h = hashlib.sha256()
+    h.update(hash_arquivo(path).encode())
+    h.update(repr((VERSAO_CACHE, limpa, sorted(kwargs.items()))).encode())
+    return h.hexdigest()
+
+def converte_celula(valor, tipo):
+    #Converte o valor da célula como o pd.read_excel (engine openpyxl): vazio -> '', erro -> NaN, números inteiros -> int
+    if valor is None:
+        return ''
+    elif tipo == TYPE_ERROR:
+        return np.nan
+    elif tipo == TYPE_NUMERIC:
+        val = int(valor)
+        if val == valor:
+            return val
+        return float(valor)
+    return valor
+
+def valor_vazio(valor):
+    #Valor convertido (ver converte_celula) que o pd.read_excel lê como NaN (vazio, erro ou texto de valor ausente, ex.: 'NA')
+    if isinstance(valor, str):
+        return valor in VALORES_NULOS
+    return valor is np.nan
+
+def limpa_vazios(df):
+    #Faz o drop de eventuais valores expurios (colunas e linhas totalmente vazias)
+    df.dropna(how='all', axis=1, inplace=True)
+    df.dropna(how='all', axis=0, inplace=True)
+    return df
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Gerenciamento do cache
+def busca_cache(chave, pasta_cache):
+    #Retorna o caminho da entrada do cache (ou None)
+    for ext in EXTENSOES_CACHE:
+        path_cache = os.path.join(pasta_cache, chave + ext)
+        if os.path.isfile(path_cache):
+            return path_cache
+    return None
+
+def le_parquet(path_cache):
+    #Lê a entrada Parquet do cache
+    df = pd.read_parquet(path_cache)
+    #Valores nulos das colunas de texto retornam como None: restaura o NaN da leitura do excel
+    cols_obj = df.columns[df.dtypes == object]
+    if len(cols_obj) > 0:
+        df[cols_obj] = df[cols_obj].fillna(np.nan)
+    return df
+
+def carrega_cache(path_cache):
+    #Carrega a entrada do cache e registra o acesso (data de modificação do arquivo, usada no descarte LRU)
+    if path_cache.endswith('.parquet'):
+        df = le_parquet(path_cache)
+    else:
+        df = pd.read_pickle(path_cache)
+    os.utime(path_cache)
+    return df
+
+def grava_cache(df, chave, pasta_cache):
+    #Grava o dataframe em Parquet, conferindo a leitura de volta
+    #Dataframes que o Parquet não reproduz fielmente (ex.: colunas com números e textos misturados) são gravados em pickle
+    os.makedirs(pasta_cache, exist_ok=True)
+    #Arquivo temporário exclusivo do processo (leituras em paralelo de arquivos com o mesmo conteúdo)
+    path_tmp = os.path.join(pasta_cache, f'{chave}_{os.getpid()}.tmp')
+    try:
+        df.to_parquet(path_tmp)
+        if not le_parquet(path_tmp).equals(df):
+            raise ValueError('Parquet não reproduz o dataframe')
+        ext = '.parquet'
+    except (ImportError, ValueError, TypeError, NotImplementedError):
+        df.to_pickle(path_tmp)
+        ext = '.pkl'
+    path_cache = os.path.join(pasta_cache, chave + ext)
+    os.replace(path_tmp, path_cache)
+    return path_cache
+
+def entradas_cache(pasta_cache):
+    #Lista as entradas do cache: (último acesso, tamanho, caminho)
+    #Subpastas (ex.: estado da consolidação, ver manifesto_BRR) são uma única entrada: soma dos tamanhos e acesso mais recente dos arquivos
+    entradas = []
+    for fname in os.listdir(pasta_cache):
+        path_cache = os.path.join(pasta_cache, fname)
+        if os.path.isdir(path_cache):
+            infos = [os.stat(os.path.join(raiz, nome)) for raiz, _, nomes in os.walk(path_cache) for nome in nomes]
+            acesso = max([info.st_mtime for info in infos], default=os.path.getmtime(path_cache))
+            entradas.append((acesso, sum(info.st_size for info in infos), path_cache))
+        elif fname.endswith(EXTENSOES_CACHE):
+            entradas.append((os.path.getmtime(path_cache), os.path.getsize(path_cache), path_cache))
+    return entradas
+
+def aplica_limite_cache(pasta_cache, tamanho_max=TAMANHO_MAX_CACHE):
+    #Remove as entradas acessadas há mais tempo até que o cache respeite o tamanho máximo
+    entradas = entradas_cache(pasta_cache)
+    tamanho_total = sum(tam for _, tam, _ in entradas)
+    for _, tam, path_cache in sorted(entradas):
+        if tamanho_total <= tamanho_max:
+            break
+        if os.path.isdir(path_cache):
+            shutil.rmtree(path_cache)
+        else:
+            os.remove(path_cache)
+        tamanho_total -= tam
+    return
+
+def limpa_cache(pasta_cache=PASTA_CACHE):
+    #Remove todas as entradas do cache (inclusive os estados da consolidação)
+    if os.path.isdir(pasta_cache):
+        aplica_limite_cache(pasta_cache, tamanho_max=0)
+    return
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Leitura dos arquivos de entrada
+def le_excel_colunas(path, sheet_name, colunas):
+    #Lê a aba em fluxo (modo somente leitura), materializando apenas as colunas indicadas
+    #Reproduz o pd.read_excel seguido da remoção das colunas e linhas totalmente vazias:
+    #    a conversão das células e a inferência de tipos são as mesmas do pandas
+    #    as linhas só são removidas se estiverem vazias em todas as colunas da aba (e não apenas nas colunas lidas)
+    #Colunas indicadas que não existirem na aba são ignoradas
+    colunas = set(colunas)
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name] if isinstance(sheet_name, str) else wb.worksheets[sheet_name]
+        #Dimensões gravadas no arquivo podem estar incorretas (como o pd.read_excel)
+        ws.reset_dimensions()
+        linhas = ws.iter_rows()
+        #Cabeçalho: posição das colunas selecionadas (nomes repetidos: prevalece a 1ª ocorrência)
+        posicoes = []
+        cabecalho = []
+        for pos, celula in enumerate(next(linhas, ())):
+            nome = converte_celula(celula.value, celula.data_type)
+            if nome in colunas and nome not in cabecalho:
+                posicoes.append(pos)
+                cabecalho.append(nome)
+        dados = [cabecalho]
+        indice = []
+        mantem = []
+        for n_linha, linha in enumerate(linhas):
+            valores = ['' if pos >= len(linha) else converte_celula(linha[pos].value, linha[pos].data_type) for pos in posicoes]
+            dados.append(valores)
+            #Índice do pd.read_excel: posição da linha de dados (a 1ª linha da aba é o cabeçalho)
+            indice.append(n_linha)
+            #As demais colunas são verificadas apenas se as colunas selecionadas estiverem vazias (linha candidata a remoção)
+            com_valor = False
+            if all(valor_vazio(valor) for valor in valores):
+                com_valor = not all(valor_vazio(converte_celula(celula.value, celula.data_type)) for celula in linha)
+            mantem.append(com_valor)
+    finally:
+        wb.close()
+    if len(indice) == 0 and len(cabecalho) == 0:
+        return pd.DataFrame([])
+    df = TextParser(dados, header=0, skip_blank_lines=False).read()
+    df.index = pd.Index(indice, dtype='int64')
+    #Remove as linhas vazias nas colunas lidas e nas demais colunas da aba
+    df = df[df.notna().any(axis=1).to_numpy() | np.array(mantem, dtype=bool)]
+    df.dropna(how='all', axis=1, inplace=True)
+    return df
+
+def le_cabecalho(path, sheet_name=0):
+    #Lê somente a linha de cabeçalho da aba (modo somente leitura), sem carregar os dados
+    #Retorna os nomes das colunas como o pd.read_excel (nomes repetidos: 'A', 'A.1'); colunas sem nome são ignoradas
+    #Formatos não suportados pelo openpyxl (ex.: xls): lê o arquivo inteiro pelo pd.read_excel
+    try:
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    except Exception:
+        return pd.read_excel(path, sheet_name=sheet_name, nrows=0).columns.to_list()
+    try:
+        ws = wb[sheet_name] if isinstance(sheet_name, str) else wb.worksheets[sheet_name]
+        ws.reset_dimensions()
+        linha = next(ws.iter_rows(min_row=1, max_row=1), ())
+        cabecalho = [converte_celula(celula.value, celula.data_type) for celula in linha]
+    finally:
+        wb.close()
+    #Remove as células vazias do final da linha (como o pd.read_excel)
+    while len(cabecalho) > 0 and isinstance(cabecalho[-1], str) and cabecalho[-1] == '':
+        cabecalho.pop()
+    if len(cabecalho) == 0:
+        return []
+    colunas = TextParser([cabecalho], header=0).read().columns.to_list()
+    return [col for col in colunas if not (isinstance(col, str) and col.startswith('Unnamed: '))]
+
+def le_excel(path, limpa=True, pasta_cache=PASTA_CACHE, tamanho_max=TAMANHO_MAX_CACHE, colunas=None, **kwargs):
+    #Lê o arquivo excel (pd.read_excel(path, **kwargs)) passando pelo cache
+    #limpa: remove as colunas e linhas totalmente vazias antes de armazenar no cache
+    #colunas: lista das colunas necessárias; se informada, a aba é lida em fluxo, materializando apenas essas colunas (ver le_excel_colunas)
+    #O cache é indexado pelo conteúdo do arquivo: arquivos alterados (mesmo com o mesmo nome) geram nova entrada
+    if colunas is not None:
+        colunas = sorted(set(colunas))
+        kwargs_chave = dict(kwargs, colunas=colunas)
+    else:
+        kwargs_chave = kwargs
+    chave = chave_cache(path, limpa, kwargs_chave)
+    path_cache = busca_cache(chave, pasta_cache)
+    if path_cache is not None:
+        try:
+            return carrega_cache(path_cache)
+        except Exception:
+            #Entrada corrompida: descarta e relê o arquivo excel (a entrada pode já ter sido removida por outro processo)
+            try:
+                os.remove(path_cache)
+            except OSError:
+                pass
+    if colunas is not None:
+        df = le_excel_colunas(path, kwargs.get('sheet_name', 0), colunas)
+    else:
+        df = pd.read_excel(path, **kwargs)
+        if limpa:
+            df = limpa_vazios(df)
+    try:
+        grava_cache(df, chave, pasta_cache)
+        aplica_limite_cache(pasta_cache, tamanho_max)
+    except OSError as e:
+        #Falha na gravação do cache não impede o processamento
+        print(f'    Não foi possível gravar o cache de {os.path.basename(path)}: {e}')
+    return df
+
+def le_excels(paths, n_processos=None, **kwargs):
+    #Lê os arquivos excel (le_excel(path, **kwargs)) em paralelo, em um conjunto de processos
+    #Retorna um iterador com os dataframes na ordem de paths (cada um disponível assim que ele e os anteriores forem lidos)
+    #n_processos: nº de processos de leitura (padrão: nº de processadores, limitado ao nº de arquivos); 1 lê em série no próprio processo
+    paths = list(paths)
+    if n_processos is None:
+        n_processos = os.cpu_count() or 1
+    n_processos = max(1, min(n_processos, len(paths)))
+    le = functools.partial(le_excel, **kwargs)
+    if n_processos == 1:
+        yield from map(le, paths)
+        return
+    with ProcessPoolExecutor(max_workers=n_processos) as executor:
+        yield from executor.map(le, paths)
+#______________________________________________________________________________________
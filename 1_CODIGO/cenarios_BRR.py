@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:05:17 2026
+
+@author: cecil.skaleski, est.angelo
+
+Execução da etapa movimenta para uma grade de cenários (database monetária, database de movimentação, taxa de juros e
+lista de alterações de elegibilidade), em um conjunto de processos.
+
+A BRR, a tabela do IPCA e as listas de elegibilidade são carregadas uma única vez. As colunas utilizadas no cálculo são copiadas
+para blocos de memória compartilhada, lidos (sem cópia) por todos os processos; cada processo recebe apenas os parâmetros dos cenários.
+Os cenários que diferem apenas na taxa de juros compartilham a atualização monetária e o quadro resumo por exercício (ver deprecia_BRR);
+o fluxo de caixa de verificação e a TIR de todas as taxas são avaliados de uma só vez (ver fluxo_BRR).
+"""
+
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+import deprecia_BRR
+import fluxo_BRR
+import indices_BRR
+import movimenta_BRR_v8
+
+#Parâmetros de cada cenário
+PARAMETROS = ['db_monet', 'db_mov', 'tx_juros', 'elegibilidade']
+#Parâmetros do quadro resumo (cenários com os mesmos valores diferem apenas na taxa de juros)
+PARAMETROS_RESUMO = ['db_monet', 'db_mov', 'elegibilidade']
+
+#Dados dos cenários no processo (arrays da base e da tabela do IPCA, listas de elegibilidade e blocos de memória compartilhada)
+_dados = {}
+
+#______________________________________________________________________________________
+#Funções acessórias
+def grade_cenarios(db_monet, db_mov, tx_juros=(movimenta_BRR_v8.TX_JUROS,), elegibilidade=(None,)):
+    #Monta os cenários de todas as combinações dos parâmetros (listas de valores)
+    #elegibilidade: arquivos das listas de alterações de elegibilidade (None: sem alterações)
+    return [dict(zip(PARAMETROS, valores)) for valores in itertools.product(db_monet, db_mov, tx_juros, elegibilidade)]
+
+def nome_lista(path_eleg):
+    #Nome da lista de elegibilidade nas tabelas de resultados
+    return os.path.basename(path_eleg) if path_eleg else ''
+
+def compartilha(arrays):
+    #Copia os arrays para blocos de memória compartilhada
+    #Retorna os blocos (liberar com libera) e a descrição de cada array (nome do bloco, tipo e forma)
+    blocos = []
+    specs = {}
+    try:
+        for nome, arr in arrays.items():
+            bloco = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+            blocos.append(bloco)
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=bloco.buf)[...] = arr
+            specs[nome] = (bloco.name, arr.dtype.str, arr.shape)
+    except Exception:
+        libera(blocos)
+        raise
+    return blocos, specs
+
+def anexa(specs):
+    #Abre os blocos de memória compartilhada; retorna os blocos e os arrays (somente leitura, sem cópia)
+    blocos = []
+    arrays = {}
+    for nome, (nome_bloco, tipo, forma) in specs.items():
+        bloco = shared_memory.SharedMemory(name=nome_bloco)
+        blocos.append(bloco)
+        arr = np.ndarray(forma, dtype=np.dtype(tipo), buffer=bloco.buf)
+        arr.flags.writeable = False
+        arrays[nome] = arr
+    return blocos, arrays
+
+def libera(blocos, remove=True):
+    #Fecha os blocos de memória compartilhada (e os remove, no processo que os criou)
+    for bloco in blocos:
+        bloco.close()
+        if remove:
+            try:
+                bloco.unlink()
+            except FileNotFoundError:
+                pass
+    return
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Preparação (processo principal)
+def prepara_dados(df_brr, df_ipca_rata, listas):
+    #Colunas da base e da tabela do IPCA utilizadas nos cenários e alterações de elegibilidade mapeadas para as posições dos ativos
+    #As posições na tabela do IPCA das datas monetárias de origem são calculadas uma única vez (ver movimenta_BRR_v8.posicao_datas)
+    pos_monet, situacao_monet = movimenta_BRR_v8.posicao_datas(df_brr['data_monet'], df_ipca_rata)
+    arrays = {
+        'data_imob': deprecia_BRR.datas_ns(df_brr['data_imob']),
+        'taxa_deprec_anos': df_brr['taxa_deprec_anos'].to_numpy(dtype=np.float64),
+        'vrb': df_brr['vrb'].to_numpy(dtype=np.float64),
+        'nao_elegivel': (df_brr['elegibilidade'] == deprecia_BRR.NAO_ELEGIVEL).to_numpy(),
+        'pos_monet': pos_monet.astype(np.int64),
+        'situacao_monet': situacao_monet.astype(np.int8),
+        'indices': df_ipca_rata['Índice'].to_numpy(dtype=np.float64),
+        'inicio_indice': np.array([df_ipca_rata.index[0].value], dtype=np.int64),
+        }
+    #Listas de elegibilidade: iu substituído pela posição do ativo na base (na ordem da lista de alterações)
+    eventos = {}
+    for path_eleg, df_eleg in listas.items():
+        pos, data = deprecia_BRR.alteracoes_elegibilidade(df_brr, df_eleg)
+        eventos[path_eleg] = pd.DataFrame({
+            'iu': pos,
+            'elegibilidade': deprecia_BRR.NAO_ELEGIVEL,
+            'data': data.view('datetime64[ns]'),
+            })
+    return arrays, eventos
+
+def define_dados(arrays, eventos, blocos=()):
+    #Registra os dados dos cenários no processo
+    _dados.clear()
+    _dados.update(arrays=arrays, eventos=eventos, blocos=list(blocos))
+    return
+
+def inicia_processo(specs, eventos):
+    #Inicialização de cada processo do conjunto: abre os blocos de memória compartilhada
+    #Os blocos são removidos somente pelo processo principal, ao final da execução (ver libera)
+    blocos, arrays = anexa(specs)
+    define_dados(arrays, eventos, blocos)
+    return
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Cálculo dos cenários (processo do conjunto)
+def executa_grupo(cenarios, motor='matriz'):
+    #Calcula os cenários de um grupo (mesmos parâmetros do quadro resumo, ver PARAMETROS_RESUMO) com os dados do processo (ver define_dados)
+    #Retorna, para cada cenário, a situação ('ok' ou motivo), o nº de itens com datas inválidas, o quadro resumo e a TIR do fluxo de caixa
+    arrays = _dados['arrays']
+    cenario = cenarios[0]
+    db_monet = pd.to_datetime(cenario['db_monet'], format='%d/%m/%Y')
+    db_mov = pd.to_datetime(cenario['db_mov'], format='%d/%m/%Y')
+    resultado = {'situacao': 'ok', 'datas_invalidas': 0, 'resumo': None, 'tir': np.nan}
+    #Atualização monetária: variação do índice entre a data monetária de cada ativo e a database monetária do cenário
+    indices = arrays['indices']
+    pos_fim = (db_monet.value - int(arrays['inicio_indice'][0])) // pd.Timedelta('1D').value
+    if pos_fim < 0 or pos_fim >= len(indices):
+        resultado['situacao'] = 'database monetária fora do período da série do IPCA'
+        return [resultado] * len(cenarios)
+    invalidas = int((arrays['situacao_monet'] != 0).sum())
+    if invalidas > 0:
+        resultado['situacao'] = 'itens com datas monetárias nulas ou fora do período da série do IPCA'
+        resultado['datas_invalidas'] = invalidas
+        return [resultado] * len(cenarios)
+    vrb = arrays['vrb'] * (indices[pos_fim] / indices[arrays['pos_monet']])
+    #Base do cenário (iu: posição do ativo na base, ver prepara_dados)
+    n = len(vrb)
+    df_base = pd.DataFrame({
+        'iu': np.arange(n),
+        'data_imob': arrays['data_imob'].view('datetime64[ns]'),
+        'taxa_deprec_anos': arrays['taxa_deprec_anos'],
+        'vrb': vrb,
+        'elegibilidade': pd.Categorical.from_codes(arrays['nao_elegivel'].astype(np.int8), ['Elegível', deprecia_BRR.NAO_ELEGIVEL]),
+        'data_monet_atual': db_monet,
+        }, copy=False)
+    df_eleg = _dados['eventos'].get(cenario['elegibilidade'])
+    #Quadro resumo por exercício (uma única vez para o grupo)
+    datas = movimenta_BRR_v8.calc_periodos(df_base['data_imob'].min(), db_mov)
+    resumo = deprecia_BRR.resumo_matriz if motor == 'matriz' else deprecia_BRR.resumo_eventos
+    df_resumo_brr = movimenta_BRR_v8.monta_resumo(resumo(df_base, datas, df_eleg))
+    df_resumo_brr['Saldo'] = df_resumo_brr['BRR liquida']
+    #Fluxo de caixa de verificação e TIR de todas as taxas de juros do grupo
+    taxas = [cenario['tx_juros'] for cenario in cenarios]
+    df_sens = fluxo_BRR.tabela_sensibilidade(df_resumo_brr, taxas)
+    return [{**resultado, 'resumo': df_resumo_brr, 'tir': tir} for tir in df_sens['tir']]
+
+def executa_lote(lote, motor):
+    #Calcula um lote de grupos de cenários no processo
+    return [executa_grupo(grupo, motor) for grupo in lote]
+
+def agrupa_cenarios(cenarios):
+    #Agrupa os cenários pelos parâmetros do quadro resumo; retorna os grupos (índices dos cenários de cada grupo)
+    grupos = {}
+    for i, cenario in enumerate(cenarios):
+        grupos.setdefault(tuple(cenario[param] for param in PARAMETROS_RESUMO), []).append(i)
+    return list(grupos.values())
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Função principal
+def executa_cenarios(abs_path, path_ref, cenarios, path_ipca=None, filtros=None, n_processos=None, motor='matriz'):
+    #Executa a movimentação da BRR para cada cenário (ver grade_cenarios)
+    #abs_path: pasta do projeto; path_ref: arquivo .xlsx da BRR consolidada ou dataset Parquet (ver movimenta_BRR_v8.carrega_brr); filtros: seleção de partições ou linhas
+    #path_ipca: série histórica do IPCA; se não informada (ou pasta), é utilizada a série mais recente da pasta (padrão: 5_ENTRADA_MOVIMENTA do projeto)
+    #n_processos: nº de processos (padrão: nº de processadores, limitado ao nº de cenários); 1 executa em série no próprio processo
+    #motor: motor do quadro resumo ('matriz' ou 'eventos', ver deprecia_BRR)
+    #Retorna o resumo de cada cenário (uma linha por cenário) e os resultados de todos os cenários (uma linha por cenário e exercício)
+    cenarios = [{**{'tx_juros': movimenta_BRR_v8.TX_JUROS, 'elegibilidade': None}, **cenario} for cenario in cenarios]
+    #Série do IPCA, BRR e listas de elegibilidade (carregadas uma única vez)
+    path_ipca, _ = indices_BRR.resolve_serie(path_ipca, movimenta_BRR_v8.monta_path(abs_path, '5_ENTRADA_MOVIMENTA', ''))
+    if path_ipca is None:
+        raise FileNotFoundError('Série histórica do IPCA não encontrada!')
+    _, df_ipca_rata = movimenta_BRR_v8.carrega_ipca(path_ipca)
+    df_brr, _, _ = movimenta_BRR_v8.carrega_brr(path_ref, filtros)
+    listas = {}
+    for cenario in cenarios:
+        path_eleg = cenario['elegibilidade']
+        if path_eleg and path_eleg not in listas:
+            listas[path_eleg] = movimenta_BRR_v8.carrega_elegibilidade(path_eleg)
+    arrays, eventos = prepara_dados(df_brr, df_ipca_rata, listas)
+    n_itens = len(df_brr)
+    del df_brr
+
+    #Grupos de cenários que diferem apenas na taxa de juros (um quadro resumo por grupo)
+    grupos = agrupa_cenarios(cenarios)
+    if n_processos is None:
+        n_processos = os.cpu_count() or 1
+    n_processos = max(1, min(n_processos, len(grupos)))
+    #Lotes intercalados (grupos vizinhos da grade têm custos semelhantes)
+    lotes = [[[cenarios[i] for i in grupo] for grupo in grupos[k::n_processos]] for k in range(n_processos)]
+    if n_processos == 1:
+        define_dados(arrays, eventos)
+        try:
+            por_lote = [executa_lote(lotes[0], motor)]
+        finally:
+            _dados.clear()
+    else:
+        blocos, specs = compartilha(arrays)
+        del arrays
+        try:
+            with ProcessPoolExecutor(max_workers=n_processos, initializer=inicia_processo, initargs=(specs, eventos)) as executor:
+                por_lote = list(executor.map(executa_lote, lotes, itertools.repeat(motor)))
+        finally:
+            libera(blocos)
+    resultados = [None] * len(cenarios)
+    for k, lote in enumerate(por_lote):
+        for grupo, resultados_grupo in zip(grupos[k::n_processos], lote):
+            for i, resultado in zip(grupo, resultados_grupo):
+                resultados[i] = resultado
+    return monta_tabelas(cenarios, resultados, n_itens)
+
+def monta_tabelas(cenarios, resultados, n_itens):
+    #Resumo por cenário e resultados por cenário e exercício
+    cols_params = ['cenario'] + PARAMETROS
+    linhas = []
+    tabelas = []
+    for i, (cenario, resultado) in enumerate(zip(cenarios, resultados)):
+        params = {
+            'cenario': i,
+            'db_monet': cenario['db_monet'],
+            'db_mov': cenario['db_mov'],
+            'tx_juros': cenario['tx_juros'],
+            'elegibilidade': nome_lista(cenario['elegibilidade']),
+            }
+        linha = {**params, 'situacao': resultado['situacao'], 'itens': n_itens, 'datas_invalidas': resultado['datas_invalidas']}
+        df_resumo_brr = resultado['resumo']
+        if df_resumo_brr is not None:
+            final = df_resumo_brr.iloc[-1]
+            linha.update({
+                'Investimento': df_resumo_brr['Investimento'].sum(),
+                'BRR bruta': final['BRR bruta'],
+                'BRR liquida': final['BRR liquida'],
+                'dep_acum_reg': final['dep_acum_reg'],
+                'qrr_total': df_resumo_brr['qrr'].sum(),
+                'tir': resultado['tir'],
+                'erro_tir': (resultado['tir'] - cenario['tx_juros']) / cenario['tx_juros'],
+                })
+            tabelas.append(df_resumo_brr.assign(**params))
+        linhas.append(linha)
+    df_cenarios = pd.DataFrame(linhas)
+    if len(tabelas) > 0:
+        df_resultados = pd.concat(tabelas, ignore_index=True)
+        df_resultados = df_resultados[cols_params + [col for col in df_resultados.columns if col not in cols_params]]
+    else:
+        df_resultados = pd.DataFrame(columns=cols_params + movimenta_BRR_v8.COLUNAS_RESUMO)
+    return df_cenarios, df_resultados
+#______________________________________________________________________________________
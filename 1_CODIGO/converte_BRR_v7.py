@@ -19,12 +19,14 @@ import datetime
 import matplotlib.dates as md
 import subprocess
 
-import openpyxl
-from openpyxl.styles import PatternFill
-from copy import copy
+#A interface gráfica (tkinter e segundo_plano_BRR) é importada somente nas funções GUI: as etapas são executadas sem Tk (ver movbrr)
 
-import tkinter as tk
-from tkinter import filedialog
+import progresso_BRR
+import cache_BRR
+import valida_BRR
+import resumo_BRR
+import tipos_BRR
+import formata_BRR
 
 np.set_printoptions(linewidth=np.inf)
 pd.set_option('display.max_columns', 20)
@@ -37,6 +39,11 @@ pd.options.display.float_format = '{:.2f}'.format
 pd.set_option("display.date_dayfirst", True)
 pd.set_option('display.max_colwidth', 55)
 
+#Limpeza de espaços (remove_espacos): tamanho da amostra de linhas e fração de valores distintos na amostra acima da qual
+#a coluna é limpa valor a valor (a fatoração só compensa com valores repetidos)
+AMOSTRA_DISTINTOS = 10000
+LIMITE_DISTINTOS = 0.5
+
 #______________________________________________________________________________________
 #Funções acessórias
 def formats2(x):
@@ -59,29 +66,63 @@ def millify_rs(n):
                         int(math.floor(0 if n == 0 else math.log10(abs(n))/3))))
     return 'R${:.2f}{}'.format(n / 10**(3 * millidx), millnames[millidx]).replace('.', ',')
 
-def aplica_strip(x):
-    #Aplica a função strip
-    if isinstance(x, str):
-        x = x.strip()
-    return x
+def distintos(coluna, tam_amostra=AMOSTRA_DISTINTOS):
+    #Fração de valores distintos em uma amostra de linhas espaçadas uniformemente
+    passo = max(1, len(coluna) // tam_amostra)
+    amostra = coluna.iloc[::passo]
+    if len(amostra) == 0:
+        return 0.0
+    return len(pd.unique(amostra.to_numpy(dtype=object))) / len(amostra)
 
 def remove_espacos(database):
     #Remove os espaços em branco do início e do final de todos os campos do dataframe que contenham strings
-    #Retorna o relatório das strings alteradas, por coluna e quantidade
-    #Guarda o nome de cada coluna do dataframe
-    colunas = database.columns.to_list()
+    #A limpeza é feita por coluna, inclusive nas colunas com tipos misturados (textos, números, datas, NaN)
+    #Cada valor distinto é limpo uma única vez (pd.factorize) e o resultado é redistribuído às linhas;
+    #colunas com valores majoritariamente distintos (ex.: identificadores) são limpas diretamente, valor a valor
     aux = database.copy()
-    #Analisa o tipo de dado em cada coluna
-    for i in colunas:
-        if is_string_dtype(aux.loc[:, i]):
-            aux.loc[:, i] = aux.loc[:, i].apply(aplica_strip)
+    #Analisa o tipo de dado em cada coluna (pela posição: admite nomes de colunas repetidos)
+    for i in range(aux.shape[1]):
+        coluna = aux.iloc[:, i]
+        if not is_string_dtype(coluna.dtype):
+            continue
+        if coluna.dtype != object:
+            #Coluna do tipo string do pandas (somente textos e valores ausentes)
+            aux.isetitem(i, coluna.str.strip())
+            continue
+        if distintos(coluna) > LIMITE_DISTINTOS:
+            valores = coluna.to_numpy(dtype=object)
+            limpos = [valor.strip() if isinstance(valor, str) else valor for valor in valores]
+            aux.isetitem(i, pd.Series(limpos, index=coluna.index, name=coluna.name, dtype=object))
+            continue
+        codigos, unicos = pd.factorize(coluna)
+        unicos = np.asarray(unicos, dtype=object)
+        limpos = np.array([u.strip() if isinstance(u, str) else u for u in unicos], dtype=object)
+        #Somente os campos alterados pela limpeza são substituídos (código -1: valor ausente, mantido)
+        alterados = np.append(limpos != unicos, False)
+        mask = alterados[codigos]
+        if not mask.any():
+            continue
+        valores = coluna.to_numpy(dtype=object, copy=True)
+        valores[mask] = limpos[codigos[mask]]
+        aux.isetitem(i, pd.Series(valores, index=coluna.index, name=coluna.name))
     return aux
 
+def ano_imobilizacao(datas):
+    #Retorna o ano de cada data em formato texto (datas ausentes: 'nan')
+    #A conversão para texto é feita uma única vez por ano distinto
+    anos = pd.to_datetime(datas).dt.year
+    codigos, anos_unicos = pd.factorize(anos)
+    textos = np.array([str(int(ano)) for ano in anos_unicos] + ['nan'], dtype=object)
+    #Código -1 (data ausente) aponta para o último elemento ('nan')
+    return pd.Series(textos[codigos], index=datas.index)
+
 def monta_path(abs_path, folder_path, fname):
     #Retorna o caminho absoluto para o arquivo
     return os.path.join(abs_path, folder_path+fname)
 
 def escolhe_arq(titulo, filetypes, dir_ini):
+    import tkinter as tk
+    from tkinter import filedialog
     root = tk.Tk()
     root.wm_attributes('-topmost', 1)
     root.withdraw()
@@ -96,232 +137,64 @@ def escolhe_arq(titulo, filetypes, dir_ini):
 def importa_plano_contas(path):
     #Importa o plano de contas em formato excel
     #Importa arquivo excel (alterar a engine e comando de importação para outros formatos)
-    dfs = pd.read_excel(path, sheet_name=0)
+    dfs = cache_BRR.le_excel(path, limpa=False, sheet_name=0)
     #Remove as linhas com valores NaN
     dfs = dfs.dropna()
     #Remove os espaços em branco
     dfs = remove_espacos(dfs)
     return dfs
 
-def insere_plano_contas2(database, indice_conta_contabil, df_plano_contas, nome_plano):
+def indexa_plano_contas(df_plano_contas):
+    #Monta o índice de correspondência (código -> descrição) do plano de contas
+    #O índice é montado uma única vez e pode ser reutilizado na conversão de várias bases na mesma execução
+    #Códigos repetidos: prevalece a última ocorrência no plano de contas
+    aux = df_plano_contas.drop_duplicates(subset=df_plano_contas.columns[0], keep='last')
+    indice_plano = pd.Series(aux.iloc[:, 1].to_numpy(), index=aux.iloc[:, 0].to_numpy())
+    return indice_plano
+
+def insere_plano_contas3(database, indice_conta_contabil, indice_plano, nome_plano):
     #Insere o plano de contas no final do dataframe
+    #A coluna com os códigos contábeis é mapeada de uma só vez pelo índice do plano de contas (ver indexa_plano_contas)
+    #Retorna também a relação dos códigos sem correspondência no plano de contas (código e nº de linhas)
     aux = database.copy()
-    #Cria a nova coluna no final do dataframe copiando a coluna com os codigos contabeis
     nome_col = aux.columns[indice_conta_contabil]
-    aux[nome_plano] = None
-    #Varre o dataframe na coluna indicada, alimentando a coluna do plano de contas fazendo a correspondencia com a tabela do plano de contas
-    for i in range(0, len(df_plano_contas)):
-        #Procura na coluna de referencia o codigo
-        mask = (aux.loc[:, nome_col] == df_plano_contas.iloc[i, 0])
-        #Substitui pelo valor de correspondencia
-        aux.loc[mask, nome_plano] = df_plano_contas.iloc[i, 1]
-        #print(f'Codigo {df_plano_contas.iloc[i, 0]} substituido por {df_plano_contas.iloc[i, 1]}')
-    return aux
-       
-def iu(tipo, plaqueta, complemento):
-    #Monta o código identificador único do ativo na base de referência da Sanepar
-    return f"{str(tipo).split('.')[0]}-{str(plaqueta).split('.')[0]}-{str(complemento).split('.')[0]}"
-
-def tabela_resumo(df, contas, col_qtde, col_custo, col_conta, col_mun):
-    #Calcula a tabela resumo
-    qtdes = []
-    muns = []
-    custos = []
-    itens = []
-    for conta in contas:
-        df_aux = df[df[col_conta] == conta]
-        item = len(df_aux)
-        if item > 0:
-            qtde = df_aux[col_qtde].sum()
-            nmun = len(df_aux[col_mun].unique())
-            custo = df_aux[col_custo].sum()
-        else:
-            qtde = 0
-            nmun = 0
-            custo = 0
-        #Registra
-        qtdes.append(qtde)
-        muns.append(nmun)
-        custos.append(custo)
-        itens.append(item)
-    #Monta o dataframe
-    df_resumo = pd.DataFrame({
-        'Conta contábil': contas,
-        'Linhas': itens,
-        'Qtde de bens': qtdes,
-        'N municípios': muns,
-        'Custo contábil': custos,
-        })
-    #Ordena por maior custo, linhas, qtde e municipios
-    df_resumo = df_resumo.sort_values(['Custo contábil', 'Linhas', 'Qtde de bens', 'N municípios'], ascending=[False, False, False, False]).reset_index(drop=True)
-    #Calcula o impacto percentual e cumulativo
-    df_resumo['%'] = df_resumo['Custo contábil'] / df_resumo['Custo contábil'].sum()
-    df_resumo['% acum'] = df_resumo['%'].cumsum()
-    return df_resumo
-
-def verifica_reqs(df, col_names):
-    #Verifica a consistência das colunas indicadas (iu, taxa de depreciação e qtde)
-    col_iu = col_names[0]
-    col_deprec = col_names[1]
-    col_qtde = col_names[2]
-    flag = False
-    err_msg = []
-    #Verifica se a coluna existe
-    if col_iu not in df.columns:
-        err_msg.append('Coluna com identificador único (iu) não encontrada!')
-        flag = True
-    else:
-        #Verifica se a coluna é consistente
-        mask = (df[col_iu].isnull()) | (df[col_iu].apply(str).str.strip() == '')
-        df_iu = df[mask]
-        if len(df_iu) > 0:
-            err_msg.append('Coluna identificador único (iu) inconsistente! (itens nulos ou vazios)')
-            flag = True
-        #Verifica se há itens com iu replicado
-        df_aux = df.groupby(col_iu).size().reset_index(name='qtde')
-        df_rep = df_aux[df_aux['qtde'] > 1]
-        if len(df_rep) > 0:
-            err_msg.append('Identificadores únicos (iu) replicados nos dados processados!')
-            flag = True 
-        #Verifica a composição do código identificador único de ativo (IU)
-        df_comp = df.copy()
-        df_comp['iu_verif'] = df_comp.apply(lambda x: iu(x['tipo'], x['plaqueta'], x['complemento']), axis=1)
-        #Compara
-        df_comp_res = df_comp[df_comp['iu_verif'] != df_comp[col_iu]]
-        if len(df_comp_res) > 0:
-            #Itens com código inadequado
-            print('')
-            print('Inconsistências detectadas na composição do identificador único: ')
-            print(df_comp_res.loc[:, ['tipo', 'plaqueta', 'complemento', col_iu, 'iu_verif']])
-            err_msg.append('Inconsistências detectadas na composição do identificador único!')
-            flag = True
-    #Itens sem taxa de depreciação
-    #Verifica se a coluna existe
-    if col_deprec not in df.columns:
-        err_msg.append('Coluna taxa de depreciação não encontrada!')
-        flag = True
-    else:
-        #Verifica se a coluna é consistente
-        mask = (df[col_deprec].isnull()) | (df[col_deprec].apply(str).str.strip() == '')
-        df_iu = df[mask]
-        if len(df_iu) > 0:
-            err_msg.append('Coluna taxa de depreciação inconsistente! (itens nulos ou vazios)')
-            flag = True
-    #Itens sem quantidade definida
-    #Verifica se a coluna existe
-    if col_qtde not in df.columns:
-        err_msg.append('Coluna quantidade não encontrada!')
-        flag = True
-    else:
-        #Verifica se a coluna é consistente
-        mask = (df[col_qtde].isnull()) | (df[col_qtde].apply(str).str.strip() == '')
-        df_iu = df[mask]
-        if len(df_iu) > 0:
-            err_msg.append('Coluna quantidade inconsistente! (itens nulos ou vazios)')
-            flag = True
-    return flag, err_msg
-#______________________________________________________________________________________
-
-#______________________________________________________________________________________
-#Replica formatação do arquivo excel de saída
-def num_para_letra(n):
-    letras = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-    if n <= 26:
-        result = letras[n - 1]
-    else:
-        quociente = (n - 1) // 26
-        resto = (n - 1) % 26
-        result =  num_para_letra(quociente) + letras[resto]
-    return result
-
-def justificar_tamanho_colunas(ws):
-    for coluna in ws.columns:
-        max_length = 0
-        for cell in coluna[1:]:
-            if cell.value:
-                if isinstance(cell.value, float):
-                    if 0 < cell.value < 1:
-                        max_length = max(max_length, 7)
-                    else:
-                        max_length = max(max_length, len(str(cell.value)))
-                else:
-                    max_length = max(max_length, len(str(cell.value)))
-
-        largura_justificada = (max_length + 2) * 1.2
-        ws.column_dimensions[coluna[0].column_letter].width = largura_justificada
-    return
-
-def copiar_estilos_celula(origem, destino):
-    destino.font = copy(origem.font)
-    destino.fill = copy(origem.fill)
-    destino.border = copy(origem.border)
-    destino.alignment = copy(origem.alignment)
-    destino.protection = copy(origem.protection)
-    destino.number_format = origem.number_format
-    return
-
-def copia_format(template_path, original_path, output_path):
-    template_workbook = openpyxl.load_workbook(template_path)
-    original_workbook = openpyxl.load_workbook(original_path)
-
-    template_sheet = template_workbook.active
-    original_sheet = original_workbook.active
-    
-    tpdebug = round(len(list(original_sheet.iter_rows()))/2)
-    template_place = list(template_sheet.iter_rows())[1:] * round((len(list(original_sheet.iter_rows()))-1)/round(len(list(template_sheet.iter_rows())[1:])))
-    new_template_list = [list(template_sheet.iter_rows())[0]] * round(len(list(original_sheet.iter_rows())[0])/len(list(original_sheet.iter_rows())[0]))
-    new_template_list.extend(template_place)
+    aux[nome_plano] = aux[nome_col].map(indice_plano)
+    #Códigos não encontrados no plano de contas
+    mask = aux[nome_plano].isnull() & aux[nome_col].notnull()
+    df_sem_conta = aux.loc[mask, nome_col].value_counts(sort=False).reset_index()
+    df_sem_conta.columns = ['Código', 'Linhas']
+    return aux, df_sem_conta
 
-    justificar_tamanho_colunas(original_sheet)
-
-    lenght_x = len(new_template_list[0])
-    lenght_y = len(new_template_list)
-
-    for sheet_name in original_workbook.sheetnames:
-        ws = original_workbook[sheet_name]
-        for row in ws.iter_rows(min_row=1, max_row=lenght_y*3, min_col=1, max_col=lenght_x+100):
-            for cell in row:
-                cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-    
-    for row_template, row_original in zip(new_template_list, original_sheet.iter_rows()):
-        for cell_template, cell_original in zip(row_template, row_original):
-            copiar_estilos_celula(cell_template, cell_original)
-
-    original_workbook.save(output_path)
-    return
 #______________________________________________________________________________________
 
 #______________________________________________________________________________________
 #Função principal
-def converte_BRR(export, open_folder, abs_path, path_ref, path_dp, path_contas, mensagem_text):
+def converte_BRR(export, open_folder, abs_path, path_ref, path_dp, path_contas, progresso=None, indice_plano=None, continuar_inconsistencias=None):
     """Converte a base de dados em BRR parcial conforme orientação técnica (protocolo n° xx.xxx.xx-x)"""
-    #Habilita o feedback na caixa de mensagens
-    mensagem_text.config(state=tk.NORMAL)
+    #progresso: destino das mensagens de progresso (ver progresso_BRR); se não informado, as mensagens são apenas impressas no console
+    #continuar_inconsistencias: decisão de continuar caso os requisitos de consistência não sejam cumpridos (True/False; None pergunta no console)
+    #Retorna True se a conversão foi concluída
+    #indice_plano: índice do plano de contas já montado (indexa_plano_contas), para reutilização na conversão de várias bases
+    #Se não informado, o plano de contas é carregado de path_contas
+    progresso = progresso_BRR.destino_progresso(progresso)
     #_______________________________________
     #Carrega a base de dados
     print('')
     print('_____________________________________CONVERTE BRR_____________________________________')
     print('Carregando base de dados...')
-    mensagem_text.insert(tk.END, "\n\nCarregando base de dados...\n")
-    mensagem_text.see('end')
-    mensagem_text.update()
+    progresso("\n\nCarregando base de dados...\n")
     #folder_path = '1_ENTRADA_CONVERTE'
     #dir_ini = os.path.join(abs_path, folder_path)
     #tipo_arqs = [('XLSX', '.xlsx'), ('XLS', '.xls'), ('CSV', '.csv'), ('JSON', '.json'), ('ALL', '.*')]
     #path_ref = escolhe_arq('Selecione o arquivo da base de dados', tipo_arqs, dir_ini)
-    df_ref = pd.read_excel(path_ref, sheet_name='BRR Incremental')
-    df_ref.dropna(how='all', axis=1, inplace=True)
-    df_ref.dropna(how='all', axis=0, inplace=True)
-    
     #Importa a tabela "Depara" da base de dados
-    print('Carregando tabela de conversão de atributos...')
-    mensagem_text.insert(tk.END, "Carregando tabela de conversão de atributos...\n")
-    mensagem_text.see('end')
-    mensagem_text.update()
+    print('    Carregando tabela de conversão de atributos...')
+    progresso("    Carregando tabela de conversão de atributos...\n")
     #path_dp = escolhe_arq('Selecione o arquivo da tabela "De Para"', [('XLSX', '.xlsx'), ('CSV', '.csv'), ('JSON', '.json')], dir_ini)
-    df_dp = pd.read_excel(path_dp)
-    df_dp.dropna(how='all', axis=1, inplace=True)
-    df_dp.dropna(how='all', axis=0, inplace=True)
+    df_dp = cache_BRR.le_excel(path_dp)
+    #Lê somente as colunas necessárias: origens da tabela "Depara", conta contábil (ANALISE) e data de imobilização (DT CONTABIL)
+    cols_necessarias = df_dp['col_origem'].to_list() + ['ANALISE', 'DT CONTABIL']
+    df_ref = cache_BRR.le_excel(path_ref, sheet_name='BRR Incremental', colunas=cols_necessarias)
     #_______________________________________
     
     #_______________________________________
@@ -329,55 +202,59 @@ def converte_BRR(export, open_folder, abs_path, path_ref, path_dp, path_contas,
     #Insere o plano de contas da Sanepar
     #tipo_arqs = [('XLSX', '.xlsx'), ('XLS', '.xls'), ('CSV', '.csv'), ('JSON', '.json'), ('ALL', '.*')]
     #path_contas = escolhe_arq('Selecione o arquivo com o plano de contas', tipo_arqs, dir_ini)
-    print('Carregando o plano de contas da Sanepar...')
-    mensagem_text.insert(tk.END, "Carregando o plano de contas da Sanepar...\n")
-    mensagem_text.see('end')
-    mensagem_text.update()
-    df_contas = importa_plano_contas(path_contas)
-    df_contas.dropna(how='all', axis=1, inplace=True)
-    df_contas.dropna(how='all', axis=0, inplace=True)
+    if indice_plano is None:
+        print('Carregando o plano de contas da Sanepar...')
+        progresso("Carregando o plano de contas da Sanepar...\n")
+        df_contas = importa_plano_contas(path_contas)
+        df_contas.dropna(how='all', axis=1, inplace=True)
+        df_contas.dropna(how='all', axis=0, inplace=True)
+        indice_plano = indexa_plano_contas(df_contas)
     print('Inserindo o plano de contas da Sanepar...')
-    mensagem_text.insert(tk.END, "Inserindo o plano de contas da Sanepar...\n")
-    mensagem_text.see('end')
-    mensagem_text.update()
+    progresso("Inserindo o plano de contas da Sanepar...\n")
     n_conta = df_ref.columns.to_list().index('ANALISE') #indice da coluna "ANALISE"
-    df_ref = insere_plano_contas2(df_ref, n_conta, df_contas, 'CONTA CONTABIL (DESCRICAO)')
+    df_ref, df_sem_conta = insere_plano_contas3(df_ref, n_conta, indice_plano, 'CONTA CONTABIL (DESCRICAO)')
+    if len(df_sem_conta) > 0:
+        print(f'    {len(df_sem_conta)} códigos contábeis sem correspondência no plano de contas ({df_sem_conta["Linhas"].sum()} linhas):')
+        print(df_sem_conta)
+        progresso(f'    {len(df_sem_conta)} códigos contábeis sem correspondência no plano de contas ({df_sem_conta["Linhas"].sum()} linhas):\n')
+        progresso(f'{df_sem_conta}\n')
     print('    Plano de contas inserido com sucesso!')
-    mensagem_text.insert(tk.END, "    Plano de contas inserido com sucesso!\n")
-    mensagem_text.see('end')
-    mensagem_text.update()
+    progresso("    Plano de contas inserido com sucesso!\n")
     #Explicita o ano de imobilização
-    df_ref['ano_imob'] = df_ref['DT CONTABIL'].apply(lambda x: str(x.year))
+    df_ref['ano_imob'] = ano_imobilizacao(df_ref['DT CONTABIL'])
     
     #Seleciona as colunas indicadas na tabela "Depara"
     cols_origem = df_dp['col_origem'].to_list()
     cols_brr = df_dp['col_brr'].to_list()
     df_base = df_ref.loc[:, cols_origem].copy()
     df_base.columns = cols_brr
+    #Tipos compactos (categorias e datas)
+    df_base, mem_antes, mem_depois = tipos_BRR.compacta_tipos(df_base)
+    print(tipos_BRR.relata_memoria(mem_antes, mem_depois))
+    progresso(f"{tipos_BRR.relata_memoria(mem_antes, mem_depois)}\n")
     #_______________________________________
     
     #_______________________________________
     #Verificação de requisitos mínimos
     print('')
     print('Verificando requisitos mínimos de consistência de dados...')
-    mensagem_text.insert(tk.END, "\n\nVerificando requisitos mínimos de consistência de dados...\n")
-    mensagem_text.see('end')
-    mensagem_text.update()
-    flag, err_msg = verifica_reqs(df_base, ['iu', 'taxa_deprec_anos', 'qtde'])
+    progresso("\n\nVerificando requisitos mínimos de consistência de dados...\n")
+    flag, err_msg, inconsistencias = valida_BRR.verifica_reqs(df_base, ['iu', 'taxa_deprec_anos', 'qtde'])
     flag_cont = 'S'
     if flag == True:
         print('')
         for msgm in err_msg:
             print(msgm)
-        flag_cont = (input('Requisitos de consistência não cumpridos. Continuar mesmo assim? (S ou N) ')).upper().strip()
-        mensagem_text.insert(tk.END, "\nRequisitos de consistência não cumpridos. Continuar mesmo assim?\n")
-        mensagem_text.see('end')
-        mensagem_text.update()
+            progresso(f"{msgm}\n")
+        for msgm in valida_BRR.relata_inconsistencias(inconsistencias):
+            print(msgm)
+            progresso(f"{msgm}\n")
+        progresso("\nRequisitos de consistência não cumpridos. Continuar mesmo assim?\n")
+        flag_cont = progresso_BRR.decide_continuar(continuar_inconsistencias, 'Requisitos de consistência não cumpridos. Continuar mesmo assim?')
+        progresso(f"    {flag_cont}\n")
     else:
         print('    Requisitos verificados!')
-        mensagem_text.insert(tk.END, "    Requisitos verificados!\n")
-        mensagem_text.see('end')
-        mensagem_text.update()
+        progresso("    Requisitos verificados!\n")
     if flag_cont == 'S':   
         #_______________________________________
         #Cria tabela resumo por conta contábil
@@ -387,18 +264,8 @@ def converte_BRR(export, open_folder, abs_path, path_ref, path_dp, path_contas,
         col_conta = 'conta_contabil'
         col_mun = 'municipio'
         
-        #Monta a tabela de resumo
-        contas = df_base[col_conta].unique()
-        df_res_ref = tabela_resumo(df_base, contas, col_qtde, col_custo, col_conta, col_mun)
-        #Adiciona os totais
-        df_res_ref.loc['TOTAL', :] = df_res_ref.sum(axis=0)
-        df_res_ref.loc['TOTAL', 'Conta contábil'] = 'TOTAL'
-        df_res_ref.loc['TOTAL', 'N municípios'] = len(df_base[col_mun].unique())
-        df_res_ref.loc['TOTAL', '% acum'] = 1
-        #Formata valores unitários
-        df_res_ref['Linhas'] = df_res_ref['Linhas'].apply(int)
-        df_res_ref['Qtde de bens'] = df_res_ref['Qtde de bens'].apply(int)
-        df_res_ref['N municípios'] = df_res_ref['N municípios'].apply(int)
+        #Monta a tabela de resumo (com os totais)
+        df_res_ref = resumo_BRR.tabela_resumo(df_base, col_qtde, col_custo, col_conta, col_mun)
         
         #Apresenta o resultado
         print('')
@@ -414,75 +281,54 @@ def converte_BRR(export, open_folder, abs_path, path_ref, path_dp, path_contas,
         
         #_______________________________________
         #Exporta resultados
-        rtp = df_base['rtp'].apply(int).max()
+        rtp = df_base['rtp'].astype(int).max()
         n_linhas = len(df_base)
         data_hj = datetime.datetime.today().strftime('%d-%m-%Y_%Hh%Mmin%Ss')
         #Exporta o resumo da BRR em formato de planilha excel
         if export == True:
             print('')
             print(f'Exportando o resumo da BRR parcial em formato .xlsx...')
-            mensagem_text.insert(tk.END, "\n\nExportando o resumo da BRR parcial em formato .xlsx...\n")
-            mensagem_text.update()
+            progresso("\n\nExportando o resumo da BRR parcial em formato .xlsx...\n")
             fname = f"RESUMO_BRR_PARCIAL_{rtp}RTP_{str(n_linhas)}_itens_{data_hj}.xlsx"
             folder_path = '2_SAIDA_CONVERTE//'
             path_exp = monta_path(abs_path, folder_path, fname)
-            with pd.ExcelWriter(path_exp) as writer:
-                df_res_ref.to_excel(writer, index=False)
+            #Formatação do arquivo de modelo (aplicada durante a exportação)
+            folder_path = '1_ENTRADA_CONVERTE/1_FORMATOS//'
+            template_path = monta_path(abs_path, folder_path, 'Template_resumo_brr_parcial.xlsx')
+            formata_BRR.exporta_xlsx(df_res_ref, path_exp, formata_BRR.carrega_modelo(template_path, linha_total=True))
             print(f'    Arquivo exportado com sucesso!')
             print(f'    {path_exp}')
-            #Replica a formatação do template
-            print('Replicando a formatação do arquivo de modelo...')
-            mensagem_text.insert(tk.END, "Replicando a formatação do arquivo de modelo...\n")
-            mensagem_text.see('end')
-            mensagem_text.update()
-            folder_path = '1_ENTRADA_CONVERTE/1_FORMATOS//'
-            fname = 'Template_resumo_brr_parcial.xlsx'
-            template_path = monta_path(abs_path, folder_path, fname)
-            copia_format(template_path, path_exp, path_exp)
-            print('    Formatação replicada com sucesso!')
-            mensagem_text.insert(tk.END, "    Formatação replicada com sucesso!\n")
-            mensagem_text.see('end')
-            mensagem_text.update()
+            progresso(f"    Arquivo exportado com sucesso! {path_exp}\n")
             
         #Exporta a BRR parcial em formato excel
             print('')
             print(f'Exportando dados da BRR parcial em formato .xlsx...')
-            mensagem_text.insert(tk.END, "\n\nExportando dados da BRR parcial em formato .xlsx...\n")
-            mensagem_text.see('end')
-            mensagem_text.update()
+            progresso("\n\nExportando dados da BRR parcial em formato .xlsx...\n")
             fname = f"BRR_PARCIAL_{rtp}RTP_{str(n_linhas)}_itens_{data_hj}.xlsx"
             folder_path = '2_SAIDA_CONVERTE//'
             folder_exp = folder_path.split('/')[0]
             path_exp = monta_path(abs_path, folder_path, fname)
-            with pd.ExcelWriter(path_exp) as writer:
-                df_base.to_excel(writer, index=False)
+            #Formatação do arquivo de modelo (aplicada durante a exportação)
+            folder_path = '1_ENTRADA_CONVERTE/1_FORMATOS//'
+            template_path = monta_path(abs_path, folder_path, 'Template_brr_parcial.xlsx')
+            formata_BRR.exporta_xlsx(df_base, path_exp, formata_BRR.carrega_modelo(template_path))
             print(f'    Arquivo exportado com sucesso!')
             print(f'    {path_exp}')
-            mensagem_text.insert(tk.END, f"    Arquivo exportado com sucesso! {path_exp}\n")
-            mensagem_text.see('end')
-            mensagem_text.update()
-            
-            #Replica a formatação do template
-            #print('Replicando a formatação do arquivo de modelo...')
-            #folder_path = '1_ENTRADA_CONVERTE/1_FORMATOS//'
-            #fname = 'Template_brr_parcial.xlsx'
-            #template_path = monta_path(abs_path, folder_path, fname)
-            #copia_format(template_path, path_exp, path_exp) #Desabilitado por tempo de execução excessivo
-            #print('    Formatação replicada com sucesso!')
+            progresso(f"    Arquivo exportado com sucesso! {path_exp}\n")
         #Abre a pasta com os arquivos gerados
             if open_folder == True:
                 res = subprocess.Popen(fr'explorer "{folder_exp}"')
         #_______________________________________
     #_______________________________________
-    #Desabilita o feedback no campo de mensagens
-    mensagem_text.config(state=tk.DISABLED)
     print('_____________________________________CONVERTE BRR_____________________________________')
-    return
+    return flag_cont == 'S'
 #______________________________________________________________________________________
 
 #______________________________________________________________________________________
 #Funções GUI
 def buscar_arquivo(entry_arquivo, path_var):
+    import tkinter as tk
+    from tkinter import filedialog
     abs_path = os.path.dirname(__file__)
     folder_path = '1_ENTRADA_CONVERTE'
     dir_ini = os.path.join(abs_path, folder_path)
@@ -493,10 +339,12 @@ def buscar_arquivo(entry_arquivo, path_var):
     path_var.set(arquivo)
 
 def printm(texto, mensagem_text):
+    import tkinter as tk
     print(texto)
     mensagem_text.insert(tk.END, texto)
 
-def converter_base_dados(path_ref_var, path_dp_var, path_contas_var, mensagem_text):
+def converter_base_dados(path_ref_var, path_dp_var, path_contas_var, painel):
+    import segundo_plano_BRR
     #Captura o conteúdo dos elementos de texto
     path_ref = path_ref_var.get()
     path_dp = path_dp_var.get()
@@ -506,14 +354,15 @@ def converter_base_dados(path_ref_var, path_dp_var, path_contas_var, mensagem_te
     abs_path = os.path.dirname(__file__)
     export = True
     open_folder = True
-    converte_BRR(export, open_folder, abs_path, path_ref, path_dp, path_contas, mensagem_text)
+    #Executa em segundo plano (as mensagens e o feedback final são apresentados na caixa de mensagens)
+    args = (export, open_folder, abs_path, path_ref, path_dp, path_contas)
+    kwargs = {'continuar_inconsistencias': segundo_plano_BRR.pergunta_na_interface(painel)}
+    segundo_plano_BRR.executa(painel, 'Converte BRR', converte_BRR, args, kwargs, mensagem_sucesso='Base de dados convertida com sucesso!')
     #______________________________________EXECUÇÃO________________________________________
-    #Feedback na caixa de mensagens
-    mensagem_text.config(state=tk.NORMAL)
-    mensagem_text.insert(tk.END, "Base de dados convertida com sucesso!\n")
-    mensagem_text.config(state=tk.DISABLED)
 
 def make_frame(frame):
+    import tkinter as tk
+    import segundo_plano_BRR
     #Captura o conteudo das caixas de texto com o caminho dos arquivos selecionados
     path_ref_var = tk.StringVar()
     path_dp_var = tk.StringVar()
@@ -550,7 +399,7 @@ def make_frame(frame):
     btn_buscar3.grid(row=2, column=2, padx=10, sticky="w")
 
     # Botão Converter Base de Dados
-    btn_converter_base_dados = tk.Button(frame, text="Converter Base de Dados", bg="navy", fg="white", width=20, height=2, command=lambda: converter_base_dados(path_ref_var, path_dp_var, path_contas_var, mensagem_text))
+    btn_converter_base_dados = tk.Button(frame, text="Converter Base de Dados", bg="navy", fg="white", width=20, height=2, command=lambda: converter_base_dados(path_ref_var, path_dp_var, path_contas_var, painel))
     btn_converter_base_dados.grid(row=3, column=1, columnspan=3, pady=10, sticky="e")  
 
     # Display
@@ -565,7 +414,11 @@ def make_frame(frame):
     scrollbar.grid(row=7, column=3, rowspan=3, sticky='nse')
     mensagem_text['yscrollcommand'] = scrollbar.set
 
+    # Progresso da execução
+    painel = segundo_plano_BRR.painel_execucao(frame, mensagem_text, btn_converter_base_dados, 6, 80)
+
 def init_frame():
+    import tkinter as tk
     root = tk.Tk()
     root.title("Converte BRR")
 
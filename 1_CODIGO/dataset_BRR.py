@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:12:40 2026
+
+@author: cecil.skaleski, est.angelo
+
+Saída da BRR consolidada em dataset Parquet particionado por rtp e município (alternativa ao arquivo .xlsx, sem limite de linhas).
+
+O dataset é uma pasta com subpastas no formato rtp=<rtp>/municipio=<municipio> e o arquivo _metadata (padrão Parquet),
+com o nº de linhas e as estatísticas (mínimo, máximo, nulos) de cada coluna por arquivo.
+A ordem original das linhas e os tipos das colunas são preservados na leitura; colunas com valores de tipos misturados
+(ex.: números e textos), que o Parquet não representa, são gravadas como texto (relacionadas nos metadados).
+"""
+
+import os
+import json
+import numpy as np
+
+#Colunas de particionamento
+PARTICOES = ['rtp', 'municipio']
+#Coluna auxiliar com a ordem original das linhas
+COLUNA_ORDEM = '_linha'
+NOME_METADATA = '_metadata'
+#Chave dos metadados do dataset (colunas e tipos originais) no esquema do _metadata
+CHAVE_METADADOS = b'brr'
+
+#______________________________________________________________________________________
+#Funções acessórias
+def eh_dataset(path):
+    #Verifica se o caminho é um dataset da BRR (a pasta ou o seu arquivo _metadata)
+    return pasta_dataset(path) is not None
+
+def pasta_dataset(path):
+    #Retorna a pasta do dataset (ou None)
+    if os.path.basename(path) == NOME_METADATA:
+        path = os.path.dirname(path)
+    if os.path.isdir(path) and os.path.isfile(os.path.join(path, NOME_METADATA)):
+        return path
+    return None
+
+def metadados(path):
+    #Retorna os metadados do dataset: colunas e tipos originais, colunas gravadas como texto, nº de linhas e nº de arquivos
+    import pyarrow.parquet as pq
+    meta = pq.read_metadata(os.path.join(pasta_dataset(path), NOME_METADATA))
+    info = json.loads(meta.schema.to_arrow_schema().metadata[CHAVE_METADADOS])
+    info.setdefault('textos', [])
+    info['linhas'] = meta.num_rows
+    #Cada arquivo pode ter mais de um grupo de linhas no _metadata: conta os arquivos distintos
+    info['arquivos'] = len({meta.row_group(i).column(0).file_path for i in range(meta.num_row_groups)})
+    return info
+
+def colunas_texto(df):
+    #Colunas de texto ou categóricas que o Arrow não converte (valores de tipos misturados, ex.: [1, 'X2', nan])
+    import pyarrow as pa
+    textos = []
+    for col in df.columns[(df.dtypes == object) | (df.dtypes == 'category')]:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            textos.append(col)
+    return textos
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Gravação e leitura
+def grava_dataset(df, path_dataset):
+    #Grava a BRR no dataset Parquet particionado (a pasta não pode existir)
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    textos = colunas_texto(df)
+    info = {
+        'colunas': df.columns.to_list(),
+        'tipos': [str(tipo) for tipo in df.dtypes],
+        'textos': textos,
+        }
+    #Colunas de tipos misturados gravadas como texto (valores nulos preservados)
+    convertidas = {col: df[col].astype(object).where(df[col].isna(), df[col].astype(str)) for col in textos}
+    tabela = pa.Table.from_pandas(df.assign(**convertidas, **{COLUNA_ORDEM: np.arange(len(df), dtype=np.int64)}), preserve_index=False)
+    #Estatísticas de cada arquivo gravado, reunidas no _metadata
+    metas = []
+    def registra(arquivo):
+        arquivo.metadata.set_file_path(os.path.relpath(arquivo.path, path_dataset).replace(os.sep, '/'))
+        metas.append(arquivo.metadata)
+    ds.write_dataset(tabela, path_dataset, format='parquet', partitioning=PARTICOES, partitioning_flavor='hive',
+                     existing_data_behavior='error', file_visitor=registra)
+    #Esquema dos arquivos (sem as colunas de particionamento, gravadas nos nomes das pastas)
+    esquema = pa.schema([campo for campo in tabela.schema if campo.name not in PARTICOES])
+    esquema = esquema.with_metadata({CHAVE_METADADOS: json.dumps(info).encode()})
+    pq.write_metadata(esquema, os.path.join(path_dataset, NOME_METADATA), metadata_collector=metas)
+    return
+
+def le_dataset(path, colunas=None, filtros=None):
+    #Lê o dataset da BRR, somente com as colunas indicadas (padrão: todas)
+    #filtros: valores aceitos das colunas de particionamento (ex.: {'municipio': ['CURITIBA']}); somente as partições selecionadas são lidas
+    #Retorna o dataframe com a ordem original das linhas e os tipos originais das colunas (colunas gravadas como texto: valores em texto)
+    import pyarrow.dataset as ds
+    path = pasta_dataset(path)
+    info = metadados(path)
+    tipos = dict(zip(info['colunas'], info['tipos']))
+    if colunas is None:
+        colunas = info['colunas']
+    colunas = [col for col in info['colunas'] if col in colunas]
+    #Dataset montado a partir do _metadata (sem listar e abrir os arquivos); o filtro seleciona as partições antes da leitura
+    dataset = ds.parquet_dataset(os.path.join(path, NOME_METADATA), partitioning='hive')
+    filtro = None
+    for col, valores in (filtros or {}).items():
+        expr = ds.field(col).isin(list(valores))
+        filtro = expr if filtro is None else (filtro & expr)
+    tabela = dataset.to_table(columns=colunas + [COLUNA_ORDEM], filter=filtro)
+    df = tabela.to_pandas()
+    #Restaura a ordem das linhas e os tipos (as colunas de particionamento retornam com o tipo inferido dos nomes das pastas)
+    df = df.sort_values(COLUNA_ORDEM, kind='stable').drop(columns=COLUNA_ORDEM).reset_index(drop=True)
+    df = df.astype({col: tipos[col] for col in colunas})
+    #Valores nulos das colunas de texto retornam como None: restaura o NaN da leitura do excel
+    cols_obj = df.columns[df.dtypes == object]
+    if len(cols_obj) > 0:
+        df[cols_obj] = df[cols_obj].where(df[cols_obj].notna(), np.nan)
+    return df
+#______________________________________________________________________________________
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:10:52 2026
+
+@author: cecil.skaleski, est.angelo
+
+Motores de depreciação da BRR para todas as datas de movimentação da etapa movimenta (quadro resumo por exercício).
+
+Os invariantes de cada ativo (data de imobilização, vida útil, depreciação anual, elegibilidade) são calculados uma única vez.
+Os resultados são os mesmos de movimenta_BRR_v8.calc_brr_imob (sem alterações de elegibilidade) e calc_brr_imob2.
+
+Matriz (resumo_matriz): a vida útil consumida, a depreciação acumulada e o valor regulatório líquido são avaliados para todas as datas
+de uma só vez, em matrizes datas x ativos, processadas em blocos de ativos para limitar a memória.
+Eventos (resumo_eventos): a contribuição de cada ativo para os totais é linear no tempo entre os seus eventos (imobilização, fim da
+vida útil, alteração de elegibilidade). Os totais de cada data são somas acumuladas das variações registradas nos eventos,
+sem calcular os valores de cada ativo em cada data.
+"""
+
+import numpy as np
+import pandas as pd
+
+#Nº máximo de elementos (datas x ativos) de cada matriz de um bloco de ativos
+LIMITE_ELEMENTOS_BLOCO = 2_000_000
+#Nº de ativos de cada bloco do motor de eventos
+TAMANHO_BLOCO_EVENTOS = 1_000_000
+#Data sem limite (ativos não amortizáveis, sem alteração de elegibilidade) [ns]
+SEM_LIMITE = np.iinfo(np.int64).max
+#Ano fiscal considerado: ano civil (365 dias) [ns]
+ANO_NS = pd.Timedelta('365 days').value
+NAO_ELEGIVEL = 'Não elegível'
+
+#______________________________________________________________________________________
+#Funções acessórias
+def datas_ns(datas):
+    #Datas em ns (int64); datas nulas: NaT
+    return pd.to_datetime(datas).to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+def invariantes(df_base):
+    #Invariantes de cada ativo, calculados uma única vez para todas as datas
+    taxa = df_base['taxa_deprec_anos'].to_numpy(dtype=np.float64)
+    vrb = df_base['vrb'].to_numpy(dtype=np.float64)
+    data_imob = pd.to_datetime(df_base['data_imob'])
+    #Vida útil do ativo [anos] (taxa nula: vida útil infinita, ativo não amortizável)
+    with np.errstate(divide='ignore'):
+        vur = 1 / (taxa / 100)
+    return {
+        'imob': datas_ns(data_imob),
+        'imob_valida': data_imob.notnull().to_numpy(),
+        #Vida útil do ativo [anos] e depreciação anual [R$]
+        'vur': vur,
+        'tdr_monet': (taxa / 100) * vrb,
+        'vrb': vrb,
+        'nao_elegivel': (df_base['elegibilidade'] == NAO_ELEGIVEL).to_numpy(),
+        }
+
+def alteracoes_elegibilidade(df_base, df_eleg):
+    #Alterações para não elegível dos ativos da base (na ordem da lista de alterações): posição do ativo na base e data da alteração
+    #Somente os ativos com alteração são indexados (a base é apenas consultada pelos iu da lista)
+    vazio = np.array([], dtype=np.int64)
+    if df_eleg is None or len(df_eleg) == 0:
+        return vazio, vazio
+    eventos = df_eleg[(df_eleg['elegibilidade'] == NAO_ELEGIVEL) & df_eleg['data'].notnull()]
+    pos_base = np.flatnonzero(df_base['iu'].isin(eventos['iu']).to_numpy())
+    #iu repetido na base: prevalece a última ocorrência
+    posicoes = pd.Series(pos_base, index=df_base['iu'].to_numpy()[pos_base])
+    posicoes = posicoes[~posicoes.index.duplicated(keep='last')]
+    eventos = eventos[eventos['iu'].isin(posicoes.index)]
+    return posicoes.loc[eventos['iu'].to_numpy()].to_numpy(dtype=np.int64), datas_ns(eventos['data'])
+
+def eventos_elegibilidade(df_base, df_eleg, datas):
+    #Alterações de elegibilidade (para não elegível) em vigor em cada data, por posição do ativo na base
+    #Em cada data valem as alterações anteriores à data; havendo mais de uma por ativo, prevalece a última da lista de alterações
+    #Retorna, para cada data, as posições dos ativos e as datas das alterações em vigor
+    pos_ev, data_ev = alteracoes_elegibilidade(df_base, df_eleg)
+    em_vigor = []
+    for data in datas:
+        sel = data_ev < data
+        #Última alteração de cada ativo (ordem da lista de alterações)
+        pos_rev = pos_ev[sel][::-1]
+        _, idx = np.unique(pos_rev, return_index=True)
+        em_vigor.append((pos_rev[idx], data_ev[sel][::-1][idx]))
+    return em_vigor
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Registro de alterações de elegibilidade (depreciação data a data, ver movimenta_BRR_v8.calc_brr_imob2)
+class RegistroElegibilidade:
+    #Alterações para não elegível ordenadas por data e mapeadas para as posições dos ativos na base uma única vez
+    #A cada data são aplicadas somente as alterações novas (anteriores à data e ainda não aplicadas); consultas em datas
+    #anteriores à última consulta reiniciam o registro
+    #Havendo mais de uma alteração por ativo, prevalece a última da lista de alterações (como em eventos_elegibilidade)
+    def __init__(self, df_base, df_eleg):
+        pos_ev, data_ev = alteracoes_elegibilidade(df_base, df_eleg)
+        #Ordena por data, mantendo a ordem da lista de alterações
+        idx = np.argsort(data_ev, kind='stable')
+        self.pos = pos_ev[idx]
+        self.data = data_ev[idx]
+        self.ordem = idx
+        self.n_ativos = len(df_base)
+        self.reinicia()
+
+    def reinicia(self):
+        #Nenhuma alteração aplicada
+        self.aplicadas = 0
+        self.data_consulta = None
+        #Ordem (na lista de alterações) e data da alteração em vigor de cada ativo (-1: sem alteração)
+        self.ordem_vigente = np.full(self.n_ativos, -1, dtype=np.int64)
+        self.data_vigente = np.zeros(self.n_ativos, dtype=np.int64)
+        return
+
+    def atualiza(self, data):
+        #Aplica as alterações anteriores à data
+        t = pd.Timestamp(data).value
+        if self.data_consulta is not None and t < self.data_consulta:
+            self.reinicia()
+        self.data_consulta = t
+        fim = int(np.searchsorted(self.data, t, side='left'))
+        if fim <= self.aplicadas:
+            return
+        pos, ordem, data_ev = self.pos[self.aplicadas:fim], self.ordem[self.aplicadas:fim], self.data[self.aplicadas:fim]
+        self.aplicadas = fim
+        #Última alteração de cada ativo entre as novas (ordem da lista de alterações)
+        idx = np.argsort(ordem)[::-1]
+        _, unicos = np.unique(pos[idx], return_index=True)
+        idx = idx[unicos]
+        pos, ordem, data_ev = pos[idx], ordem[idx], data_ev[idx]
+        #Substitui a alteração em vigor somente se a nova for posterior na lista de alterações
+        novas = ordem > self.ordem_vigente[pos]
+        self.ordem_vigente[pos[novas]] = ordem[novas]
+        self.data_vigente[pos[novas]] = data_ev[novas]
+        return
+
+    def vigentes(self, data):
+        #Retorna a máscara dos ativos da base com alteração em vigor na data e a data da alteração de cada ativo (datetime64[ns])
+        self.atualiza(data)
+        return self.ordem_vigente >= 0, self.data_vigente.view('datetime64[ns]')
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Motor de depreciação
+def resumo_matriz(df_base, datas, df_eleg=None, limite_elementos=LIMITE_ELEMENTOS_BLOCO):
+    #Calcula o quadro resumo da BRR para todas as datas de movimentação (ver movimenta_BRR_v8.calc_brr_imob2)
+    #df_base: base atualizada monetariamente (iu, data_imob, taxa_deprec_anos, vrb, elegibilidade, data_monet_atual)
+    #Retorna uma linha por data: [data, database monetária, investimento, BRR bruta, BRR líquida, depreciação acumulada,
+    #    saldo inelegível bruto e líquido]
+    inv = invariantes(df_base)
+    n = len(df_base)
+    datas = [pd.Timestamp(data) for data in datas]
+    t_fim = datas_ns(datas)
+    #Início do exercício de cada data
+    t_ini = datas_ns([pd.to_datetime(f'01/01/{data.year}') for data in datas])
+    em_vigor = eventos_elegibilidade(df_base, df_eleg, t_fim)
+    n_datas = len(datas)
+    totais = np.zeros((6, n_datas))
+    #Blocos de ativos: matrizes datas x ativos com no máximo limite_elementos elementos
+    tam_bloco = max(1, limite_elementos // max(1, n_datas))
+    for ini in range(0, n, tam_bloco):
+        fim = min(n, ini + tam_bloco)
+        imob = inv['imob'][ini:fim]
+        vur = inv['vur'][ini:fim]
+        tdr_monet = inv['tdr_monet'][ini:fim]
+        vrb = inv['vrb'][ini:fim]
+        #Ativos imobilizados até cada data
+        imobilizado = inv['imob_valida'][ini:fim] & (imob <= t_fim[:, None])
+        #Database de movimentação de cada ativo e elegibilidade (alterações de elegibilidade em vigor)
+        t_mov = np.repeat(t_fim[:, None], fim - ini, axis=1)
+        nao_elegivel = np.repeat(inv['nao_elegivel'][None, ini:fim], n_datas, axis=0)
+        for k, (pos, data_ev) in enumerate(em_vigor):
+            sel = (pos >= ini) & (pos < fim)
+            t_mov[k, pos[sel] - ini] = data_ev[sel]
+            nao_elegivel[k, pos[sel] - ini] = True
+        #Vida útil consumida (não negativa e limitada à vida útil do ativo)
+        vur_consumida = (t_mov - imob).astype(np.float64) / ANO_NS
+        vur_consumida[vur_consumida < 0] = 0
+        vur_consumida = np.where(vur_consumida > vur, vur, vur_consumida)
+        #Depreciação acumulada e valor regulatório líquido
+        dep = vur_consumida * tdr_monet
+        vrl = vrb - dep
+        #Ativos não amortizados
+        ativo = imobilizado & (vur_consumida < vur)
+        elegivel = ativo & ~nao_elegivel
+        inelegivel = ativo & nao_elegivel & (t_mov >= t_ini[:, None]) & (t_mov <= t_fim[:, None])
+        investido = imobilizado & (imob >= t_ini[:, None])
+        totais[0] += np.nansum(np.where(investido, vrb, 0.0), axis=1)
+        totais[1] += np.nansum(np.where(elegivel, vrb, 0.0), axis=1)
+        totais[2] += np.nansum(np.where(elegivel, vrl, 0.0), axis=1)
+        totais[3] += np.nansum(np.where(imobilizado, dep, 0.0), axis=1)
+        totais[4] += np.nansum(np.where(inelegivel, vrb, 0.0), axis=1)
+        totais[5] += np.nansum(np.where(inelegivel, vrl, 0.0), axis=1)
+    db_monet = pd.to_datetime(df_base['data_monet_atual'].iloc[0]).strftime('%d/%m/%Y') if n > 0 else ''
+    results = []
+    for k, data in enumerate(datas):
+        results.append([data.strftime('%d/%m/%Y'), db_monet] + totais[:, k].tolist())
+    return results
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Motor de eventos
+def segmentos_elegibilidade(df_base, df_eleg):
+    #Períodos de vigência das alterações de elegibilidade (para não elegível), ordenados pela posição do ativo na base
+    #A alteração vale para as datas posteriores à data da alteração; havendo mais de uma, prevalece a última da lista de alterações
+    #(a alteração em vigor muda somente quando entra em vigor uma alteração posterior na lista)
+    #Retorna a posição do ativo, a data da alteração e a data da alteração seguinte do mesmo ativo (SEM_LIMITE: sem alteração seguinte)
+    pos, data = alteracoes_elegibilidade(df_base, df_eleg)
+    if len(pos) == 0:
+        return pos, data, data
+    ordem_lista = np.arange(len(pos))
+    #Ordena por ativo, data e ordem na lista
+    ordem = np.lexsort((ordem_lista, data, pos))
+    pos, data, ordem_lista = pos[ordem], data[ordem], ordem_lista[ordem]
+    #Máximo acumulado da ordem na lista em cada ativo: a alteração entra em vigor se for posterior na lista a todas as anteriores
+    novo_ativo = np.r_[True, pos[1:] != pos[:-1]]
+    chave = (np.cumsum(novo_ativo) - 1) * len(ordem_lista) + ordem_lista
+    em_vigor = chave == np.maximum.accumulate(chave)
+    pos, data = pos[em_vigor], data[em_vigor]
+    fim = np.r_[np.where(pos[1:] == pos[:-1], data[1:], SEM_LIMITE), SEM_LIMITE]
+    return pos, data, fim
+
+def limite_vida_util(imob, vur):
+    #Primeira data (ns) em que a vida útil consumida atinge a vida útil do ativo: (data - imob) / ano >= vur
+    #Mesmo critério (em ponto flutuante) de calc_brr_imob2; vida útil infinita ou inválida: SEM_LIMITE
+    with np.errstate(invalid='ignore', over='ignore'):
+        limite = vur * ANO_NS
+        valido = np.isfinite(limite) & (limite < 2.0**62)
+        delta = np.where(valido, np.ceil(np.maximum(limite, 0)), 0).astype(np.int64)
+    #Ajuste fino do arredondamento (critério exato da comparação)
+    for _ in range(2):
+        delta = np.where((delta > 0) & ((delta - 1).astype(np.float64) / ANO_NS >= vur), delta - 1, delta)
+        delta = np.where(delta.astype(np.float64) / ANO_NS < vur, delta + 1, delta)
+    return np.where(valido, imob + delta, SEM_LIMITE)
+
+def mais_um(datas):
+    #Data seguinte (ns), preservando SEM_LIMITE
+    return np.where(datas == SEM_LIMITE, SEM_LIMITE, datas + 1)
+
+def resumo_eventos(df_base, datas, df_eleg=None, tamanho_bloco=TAMANHO_BLOCO_EVENTOS):
+    #Calcula o quadro resumo da BRR para todas as datas de movimentação por varredura de eventos (ver movimenta_BRR_v8.calc_brr_imob2)
+    #Cada ativo contribui para os totais com termos constantes (alfa) e proporcionais ao tempo (beta, em anos) em intervalos entre eventos;
+    #as variações de alfa e beta são registradas na primeira data de movimentação de cada intervalo e acumuladas ao longo das datas
+    #Retorna uma linha por data (mesmo formato de resumo_matriz)
+    inv = invariantes(df_base)
+    n = len(df_base)
+    datas = [pd.Timestamp(data) for data in datas]
+    n_datas = len(datas)
+    t_fim = datas_ns(datas)
+    t_ini = datas_ns([pd.to_datetime(f'01/01/{data.year}') for data in datas])
+    #Tempo em anos a partir da primeira data (reduz o cancelamento numérico dos termos proporcionais ao tempo)
+    t0 = t_fim[0] if n_datas > 0 else 0
+    x_datas = (t_fim - t0).astype(np.float64) / ANO_NS
+    seg_pos, seg_data, seg_fim = segmentos_elegibilidade(df_base, df_eleg)
+    #Variações dos totais (investimento, BRR bruta, BRR líquida, depreciação acumulada, saldo inelegível bruto e líquido)
+    d_alfa = np.zeros((6, n_datas + 1))
+    d_beta = np.zeros((6, n_datas + 1))
+    #Variações do nº de termos em vigor de cada total, constantes e proporcionais ao tempo (inteiros, sem erro de arredondamento)
+    d_termos = np.zeros((6, n_datas + 1), dtype=np.int64)
+    d_termos_beta = np.zeros((6, n_datas + 1), dtype=np.int64)
+
+    def registra(total, ini, fim, alfa, beta=None, por_indice=False):
+        #Registra o termo no intervalo de datas [ini, fim) (ou de índices das datas, se por_indice)
+        k_ini = ini if por_indice else np.searchsorted(t_fim, ini, side='left')
+        k_fim = fim if por_indice else np.searchsorted(t_fim, fim, side='left')
+        k_fim = np.maximum(k_fim, k_ini)
+        d_termos[total] += np.bincount(k_ini, minlength=n_datas + 1) - np.bincount(k_fim, minlength=n_datas + 1)
+        d_alfa[total] += np.bincount(k_ini, alfa, n_datas + 1) - np.bincount(k_fim, alfa, n_datas + 1)
+        if beta is not None:
+            d_termos_beta[total] += np.bincount(k_ini, minlength=n_datas + 1) - np.bincount(k_fim, minlength=n_datas + 1)
+            d_beta[total] += np.bincount(k_ini, beta, n_datas + 1) - np.bincount(k_fim, beta, n_datas + 1)
+
+    for ini in range(0, n, tamanho_bloco):
+        fim = min(n, ini + tamanho_bloco)
+        imob = inv['imob'][ini:fim]
+        vur = inv['vur'][ini:fim]
+        tdr_monet = inv['tdr_monet'][ini:fim]
+        vrb = inv['vrb'][ini:fim]
+        nao_elegivel = inv['nao_elegivel'][ini:fim]
+        #Ativos sem data de imobilização, valor ou taxa de depreciação não contribuem para os totais (valores nulos)
+        valido = inv['imob_valida'][ini:fim] & ~np.isnan(vrb) & ~np.isnan(tdr_monet) & ~np.isnan(vur)
+        #Investimento: datas cujo exercício contém a data de imobilização
+        sel = inv['imob_valida'][ini:fim] & ~np.isnan(vrb)
+        registra(0, np.searchsorted(t_fim, imob[sel], side='left'), np.searchsorted(t_ini, imob[sel], side='right'), vrb[sel], por_indice=True)
+        imob, vur, tdr_monet, vrb, nao_elegivel = imob[valido], vur[valido], tdr_monet[valido], vrb[valido], nao_elegivel[valido]
+        posicoes = np.flatnonzero(valido) + ini
+        x_imob = (imob - t0).astype(np.float64) / ANO_NS
+        #Alterações de elegibilidade dos ativos do bloco
+        s_ini, s_fim = np.searchsorted(seg_pos, [ini, fim], side='left')
+        s_pos, s_data, s_prox = seg_pos[s_ini:s_fim], seg_data[s_ini:s_fim], seg_fim[s_ini:s_fim]
+        local = np.searchsorted(posicoes, s_pos)
+        s_valido = (local < len(posicoes)) & (posicoes[np.minimum(local, len(posicoes) - 1)] == s_pos)
+        s_pos, s_data, s_prox, local = s_pos[s_valido], s_data[s_valido], s_prox[s_valido], local[s_valido]
+        #Fim do período sem alteração de elegibilidade (a primeira alteração vale a partir da data seguinte à alteração)
+        fim_normal = np.full(len(imob), SEM_LIMITE, dtype=np.int64)
+        primeira = np.r_[True, s_pos[1:] != s_pos[:-1]] if len(s_pos) > 0 else np.array([], dtype=bool)
+        fim_normal[local[primeira]] = mais_um(s_data[primeira])
+        #Período sem alteração: vida útil em curso [imob, fim da vida útil) e vida útil encerrada
+        limite = limite_vida_util(imob, vur)
+        fim_ativo = np.minimum(limite, fim_normal)
+        #BRR bruta/líquida (ativos elegíveis) ou saldo inelegível (ativos não elegíveis na base): vrl = vrb - tdr * (x - x_imob)
+        for total_b, total_l, mask in [(1, 2, ~nao_elegivel), (4, 5, nao_elegivel)]:
+            registra(total_b, imob[mask], fim_ativo[mask], vrb[mask])
+            registra(total_l, imob[mask], fim_ativo[mask], vrb[mask] + tdr_monet[mask] * x_imob[mask], -tdr_monet[mask])
+        #Depreciação acumulada: tdr * (x - x_imob) em curso e tdr * vur após o fim da vida útil
+        registra(3, imob, fim_ativo, -tdr_monet * x_imob, tdr_monet)
+        registra(3, limite, fim_normal, tdr_monet * np.where(np.isfinite(vur), vur, 0))
+        #Períodos com alteração de elegibilidade em vigor: base congelada na data da alteração (ativo não elegível)
+        if len(local) > 0:
+            a = imob[local]
+            v = vur[local]
+            cons = (s_data - a).astype(np.float64) / ANO_NS
+            cons[cons < 0] = 0
+            cons = np.where(cons > v, v, cons)
+            dep = cons * tdr_monet[local]
+            ativo = cons < v
+            p_ini = np.maximum(a, s_data + 1)
+            p_fim = mais_um(s_prox)
+            registra(3, p_ini, p_fim, dep)
+            #Saldo inelegível: somente nas datas do exercício da alteração
+            ano_seguinte = (s_data.astype('datetime64[ns]').astype('datetime64[Y]') + 1).astype('datetime64[ns]').view(np.int64)
+            p_fim_ine = np.minimum(p_fim, ano_seguinte)
+            registra(4, p_ini[ativo], p_fim_ine[ativo], vrb[local][ativo])
+            registra(5, p_ini[ativo], p_fim_ine[ativo], vrb[local][ativo] - dep[ativo])
+    #Datas sem termos em vigor: parcela exatamente nula (as somas acumuladas deixam resíduos de arredondamento onde os termos se cancelam)
+    alfa = np.cumsum(d_alfa[:, :n_datas], axis=1)
+    alfa[np.cumsum(d_termos[:, :n_datas], axis=1) == 0] = 0.0
+    beta = np.cumsum(d_beta[:, :n_datas], axis=1)
+    beta[np.cumsum(d_termos_beta[:, :n_datas], axis=1) == 0] = 0.0
+    totais = alfa + beta * x_datas
+    db_monet = pd.to_datetime(df_base['data_monet_atual'].iloc[0]).strftime('%d/%m/%Y') if n > 0 else ''
+    results = []
+    for k, data in enumerate(datas):
+        results.append([data.strftime('%d/%m/%Y'), db_monet] + totais[:, k].tolist())
+    return results
+#______________________________________________________________________________________
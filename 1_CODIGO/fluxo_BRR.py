@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:48:33 2026
+
+@author: cecil.skaleski, est.angelo
+
+Fluxo de caixa de verificação da etapa movimenta (investimentos, amortização e juros sobre a BRR líquida), VPL e TIR
+avaliados para vários fluxos e taxas de juros de uma só vez.
+
+Os fluxos são as linhas de uma matriz (fluxos x períodos). A TIR de todos os fluxos é calculada em conjunto pelo método de Newton,
+confinado a um intervalo com troca de sinal do VPL (bissecção quando o passo sai do intervalo), a partir de uma estimativa inicial
+(ex.: a taxa de juros do fluxo ou a solução de um fluxo semelhante).
+O intervalo é o par de taxas de busca consecutivas (TAXAS_BUSCA) com troca de sinal do VPL mais próximo de zero: com mais de uma
+TIR, a solução retornada é uma raiz desse intervalo, não necessariamente a de menor valor absoluto; TIR fora de (-0.999, 100)
+ou raízes sem troca de sinal entre as taxas de busca (ex.: raiz dupla) resultam em NaN.
+"""
+
+import numpy as np
+import pandas as pd
+
+#Tolerância relativa da TIR e nº máximo de iterações
+TOLERANCIA_TIR = 1e-13
+MAX_ITERACOES = 100
+#Taxas de busca do intervalo inicial da TIR (VPL com troca de sinal entre taxas consecutivas)
+TAXAS_BUSCA = np.array([-0.999, -0.99, -0.9, -0.5, -0.25, -0.1, 0.0, 0.05, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 100.0])
+#Estimativa inicial padrão da TIR
+CHUTE_TIR = 0.1
+
+#______________________________________________________________________________________
+#Fluxos de caixa
+def fluxos_taxas(df_resumo_brr, taxas):
+    #Fluxo de pagamentos do quadro resumo (ver movimenta_BRR_v8.monta_fluxo) para cada taxa de juros
+    #Retorna a matriz taxas x períodos (períodos a partir do primeiro sem pagamentos zerados) e o nº de períodos de cada fluxo
+    taxas = np.atleast_1d(np.asarray(taxas, dtype=np.float64))
+    liquida = df_resumo_brr['BRR liquida'].to_numpy(dtype=np.float64)
+    #Investimentos (desconsiderados no último ano), amortização (com o saldo não amortizado no último ano) e juros sobre a BRR líquida anterior
+    investimento = np.r_[-1 * df_resumo_brr['Investimento'].to_numpy(dtype=np.float64), 0.0]
+    amortizacao = np.r_[df_resumo_brr['qrr'].to_numpy(dtype=np.float64), liquida[-1:]]
+    juros = np.r_[0.0, liquida]
+    fluxos = (investimento + amortizacao)[None, :] + juros[None, :] * taxas[:, None]
+    #Corte do fluxo no primeiro período sem pagamentos
+    zeros = fluxos == 0
+    periodos = np.where(zeros.any(axis=1), zeros.argmax(axis=1), fluxos.shape[1])
+    fluxos[np.arange(fluxos.shape[1])[None, :] >= periodos[:, None]] = 0
+    return fluxos, periodos
+
+def descontos(taxas, n_periodos):
+    #Fatores de desconto de cada taxa (linhas) em cada período: (1 + taxa) ** -período
+    return (1 + np.asarray(taxas, dtype=np.float64))[:, None] ** -np.arange(n_periodos, dtype=np.float64)[None, :]
+
+def vpl(fluxos, taxas):
+    #Valor presente líquido de cada fluxo (linhas) descontado pela taxa correspondente
+    fluxos = np.atleast_2d(fluxos)
+    return (fluxos * descontos(taxas, fluxos.shape[1])).sum(axis=1)
+
+def vpl_derivada(fluxos, taxas):
+    #VPL de cada fluxo e a sua derivada em relação à taxa
+    fator = descontos(taxas, fluxos.shape[1])
+    t = np.arange(fluxos.shape[1], dtype=np.float64)
+    valor = (fluxos * fator).sum(axis=1)
+    derivada = -(fluxos * fator * t).sum(axis=1) / (1 + taxas)
+    return valor, derivada
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#TIR
+def intervalos_tir(fluxos):
+    #Intervalo inicial de cada fluxo: taxas de busca consecutivas com troca de sinal do VPL, o mais próximo de zero
+    #(distância a zero: nula se o intervalo contém zero, senão a menor taxa em valor absoluto; empate: o intervalo de menores taxas)
+    #Retorna os limites do intervalo (NaN: sem troca de sinal nas taxas de busca)
+    n = len(fluxos)
+    #Taxas próximas de -1 com muitos períodos: fatores de desconto infinitos (VPL NaN, intervalo descartado)
+    with np.errstate(over='ignore', invalid='ignore'):
+        valores = np.column_stack([vpl(fluxos, np.full(n, taxa)) for taxa in TAXAS_BUSCA])
+    sinais = np.sign(valores)
+    troca = (sinais[:, :-1] * sinais[:, 1:]) <= 0
+    #Distância do intervalo a zero (intervalos sem troca de sinal descartados)
+    distancia = np.minimum(np.abs(TAXAS_BUSCA[:-1]), np.abs(TAXAS_BUSCA[1:]))
+    distancia = np.where((TAXAS_BUSCA[:-1] <= 0) & (TAXAS_BUSCA[1:] >= 0), 0.0, distancia)
+    distancia = np.where(troca, distancia[None, :], np.inf)
+    k = distancia.argmin(axis=1)
+    valido = np.isfinite(distancia[np.arange(n), k])
+    inf = np.where(valido, TAXAS_BUSCA[k], np.nan)
+    sup = np.where(valido, TAXAS_BUSCA[k + 1], np.nan)
+    return inf, sup
+
+def tir(fluxos, chute=None, tol=TOLERANCIA_TIR, max_iter=MAX_ITERACOES):
+    #TIR de cada fluxo (linhas da matriz) pelo método de Newton confinado ao intervalo com troca de sinal do VPL
+    #chute: estimativa inicial de cada fluxo (ex.: taxa de juros ou solução anterior); padrão: CHUTE_TIR
+    #Fluxos nulos ou sem troca de sinal do VPL nas taxas de busca: NaN
+    fluxos = np.atleast_2d(np.asarray(fluxos, dtype=np.float64))
+    n = len(fluxos)
+    inf, sup = intervalos_tir(fluxos)
+    ativo = np.isfinite(inf) & (fluxos != 0).any(axis=1)
+    resultado = np.full(n, np.nan)
+    if not ativo.any():
+        return resultado
+    idx = np.flatnonzero(ativo)
+    fluxos, inf, sup = fluxos[idx], inf[idx], sup[idx]
+    chute = np.broadcast_to(np.full(n, CHUTE_TIR) if chute is None else np.asarray(chute, dtype=np.float64), (n,))[idx]
+    #Estimativa inicial fora do intervalo: ponto médio
+    x = np.where(np.isfinite(chute) & (chute > inf) & (chute < sup), chute, (inf + sup) / 2)
+    v_inf = vpl(fluxos, inf)
+    for _ in range(max_iter):
+        valor, derivada = vpl_derivada(fluxos, x)
+        #Atualiza o intervalo (mantém a troca de sinal)
+        mesmo_lado = np.sign(valor) == np.sign(v_inf)
+        inf = np.where(mesmo_lado, x, inf)
+        v_inf = np.where(mesmo_lado, valor, v_inf)
+        sup = np.where(mesmo_lado, sup, x)
+        #Passo de Newton; fora do intervalo (ou derivada nula): bissecção
+        with np.errstate(divide='ignore', invalid='ignore'):
+            novo = x - valor / derivada
+        fora = ~np.isfinite(novo) | (novo <= inf) | (novo >= sup)
+        novo = np.where(fora, (inf + sup) / 2, novo)
+        concluido = (valor == 0) | (np.abs(novo - x) <= tol * (1 + np.abs(x)))
+        x = np.where(valor == 0, x, novo)
+        resultado[idx[concluido]] = x[concluido]
+        pendente = ~concluido
+        if not pendente.any():
+            break
+        idx, fluxos, x, inf, sup, v_inf = idx[pendente], fluxos[pendente], x[pendente], inf[pendente], sup[pendente], v_inf[pendente]
+    return resultado
+
+def tabela_sensibilidade(df_resumo_brr, taxas, chute=None):
+    #Sensibilidade da TIR do fluxo de caixa de verificação à taxa de juros (todas as taxas de uma só vez)
+    #chute: estimativa inicial da TIR de cada taxa (padrão: a própria taxa, TIR esperada do fluxo de verificação)
+    #Retorna, para cada taxa, a TIR, o erro relativo da TIR, o VPL do fluxo descontado pela taxa e o nº de períodos do fluxo
+    taxas = np.atleast_1d(np.asarray(taxas, dtype=np.float64))
+    fluxos, periodos = fluxos_taxas(df_resumo_brr, taxas)
+    tirs = tir(fluxos, taxas if chute is None else chute)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        erros = (tirs - taxas) / taxas
+    return pd.DataFrame({
+        'tx_juros': taxas,
+        'tir': tirs,
+        'erro_tir': erros,
+        'vpl': vpl(fluxos, taxas),
+        'periodos': periodos,
+        })
+#______________________________________________________________________________________
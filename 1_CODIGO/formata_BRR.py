@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:20:11 2026
+
+@author: cecil.skaleski, est.angelo
+
+Exportação dos arquivos excel com a formatação dos arquivos de modelo (comum às etapas converte, consolida e movimenta).
+"""
+
+import pandas as pd
+from pandas.api.types import is_float_dtype
+import openpyxl
+from openpyxl.styles import NamedStyle
+from openpyxl.utils import get_column_letter
+from copy import copy
+
+#______________________________________________________________________________________
+#Leitura do arquivo de modelo
+def periodo_minimo(seq):
+    #Retorna o menor período que reproduz a sequência (ex.: linhas zebradas do modelo -> 2)
+    for p in range(1, len(seq) + 1):
+        if all(seq[k] == seq[k % p] for k in range(len(seq))):
+            return p
+    return len(seq)
+
+def carrega_modelo(template_path, linha_total=False):
+    #Lê a formatação do arquivo de modelo uma única vez
+    #Cada estilo distinto do modelo é registrado uma única vez; as linhas são descritas pelo estilo de cada coluna:
+    #    cabecalho: estilos da 1ª linha
+    #    ciclo: estilos das linhas de dados, reduzidos ao menor ciclo que se repete (ex.: linhas zebradas)
+    #    total: estilos da última linha do modelo, aplicados à última linha exportada (tabelas com linha de totais)
+    template_workbook = openpyxl.load_workbook(template_path)
+    template_sheet = template_workbook.active
+    linhas = [list(linha) for linha in template_sheet.iter_rows()]
+    estilos = {}
+    for linha in linhas:
+        for celula in linha:
+            if celula.style_id not in estilos:
+                estilos[celula.style_id] = {
+                    'font': copy(celula.font),
+                    'fill': copy(celula.fill),
+                    'border': copy(celula.border),
+                    'alignment': copy(celula.alignment),
+                    'protection': copy(celula.protection),
+                    'number_format': celula.number_format,
+                    }
+    cabecalho = [celula.style_id for celula in linhas[0]]
+    dados = linhas[1:]
+    total = None
+    if linha_total and len(dados) > 1:
+        total = [celula.style_id for celula in dados[-1]]
+        dados = dados[:-1]
+    ids_dados = [tuple(celula.style_id for celula in linha) for linha in dados]
+    ciclo = ids_dados[:periodo_minimo(ids_dados)] if len(ids_dados) > 0 else [tuple(cabecalho)]
+    modelo = {
+        'estilos': estilos,
+        'cabecalho': cabecalho,
+        'ciclo': ciclo,
+        'total': total,
+        }
+    return modelo
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Aplicação da formatação
+def registra_estilos(wb, modelo):
+    #Registra os estilos do modelo como estilos nomeados da planilha de saída (uma única vez por arquivo)
+    nomes = {}
+    for style_id, atributos in modelo['estilos'].items():
+        nome = f'Modelo BRR {style_id}'
+        if nome not in wb.named_styles:
+            estilo = NamedStyle(name=nome)
+            for atributo, valor in atributos.items():
+                setattr(estilo, atributo, copy(valor))
+            wb.add_named_style(estilo)
+        nomes[style_id] = nome
+    return nomes
+
+def aplica_modelo(ws, modelo):
+    #Aplica os estilos do modelo à planilha já preenchida (antes de salvar), coluna a coluna
+    #Os estilos de cada coluna são resolvidos uma única vez e cada célula recebe apenas a referência ao estilo nomeado
+    nomes = registra_estilos(ws.parent, modelo)
+    n_linhas = ws.max_row
+    n_cols = min(ws.max_column, len(modelo['cabecalho']))
+    ciclo = modelo['ciclo']
+    periodo = len(ciclo)
+    ult_linha_dados = n_linhas - 1 if (modelo['total'] is not None and n_linhas > 2) else n_linhas
+    for j in range(n_cols):
+        #Cabeçalho
+        ws.cell(row=1, column=j+1).style = nomes[modelo['cabecalho'][j]]
+        #Linhas de dados
+        nomes_col = [nomes[ciclo[k][j]] if j < len(ciclo[k]) else None for k in range(periodo)]
+        for i, (celula,) in enumerate(ws.iter_rows(min_row=2, max_row=ult_linha_dados, min_col=j+1, max_col=j+1)):
+            nome = nomes_col[i % periodo]
+            if nome is not None:
+                celula.style = nome
+        #Linha de totais
+        if ult_linha_dados < n_linhas and j < len(modelo['total']):
+            ws.cell(row=n_linhas, column=j+1).style = nomes[modelo['total'][j]]
+    #Oculta as linhas de grade (substitui o preenchimento branco das células)
+    ws.sheet_view.showGridLines = False
+    return
+
+def justifica_largura_colunas(ws, df):
+    #Ajusta a largura das colunas pelo maior conteúdo de cada coluna, calculado sobre o dataframe exportado
+    for j, col in enumerate(df.columns, start=1):
+        valores = df[col]
+        valores = valores[valores.notnull() & (valores != 0) & (valores != '')]
+        max_length = 0
+        if len(valores) > 0:
+            tamanhos = valores.astype(str).str.len()
+            if is_float_dtype(valores.dtype):
+                #Percentuais (entre 0 e 1)
+                tamanhos = tamanhos.where(~((valores > 0) & (valores < 1)), 7)
+            max_length = int(tamanhos.max())
+        ws.column_dimensions[get_column_letter(j)].width = (max_length + 2) * 1.2
+    return
+
+def exporta_xlsx(df, path_exp, modelo=None):
+    #Exporta o dataframe em formato .xlsx, aplicando a formatação do modelo antes de salvar o arquivo (uma única gravação)
+    with pd.ExcelWriter(path_exp, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False)
+        ws = writer.sheets[list(writer.sheets)[0]]
+        if modelo is not None:
+            aplica_modelo(ws, modelo)
+        justifica_largura_colunas(ws, df)
+    return
+#______________________________________________________________________________________
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:24:51 2026
+
+@author: cecil.skaleski, est.angelo
+
+Índice incremental dos identificadores únicos (iu) para a detecção de iu replicados entre os arquivos da etapa consolida.
+
+Cada arquivo é comparado somente com o índice já montado (apenas as chaves novas são verificadas).
+Acima do limite de chaves em memória, o índice é descarregado em disco em blocos ordenados, consultados por busca binária.
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+#Nº máximo de chaves (iu) mantidas em memória; acima do limite, as chaves são descarregadas em disco
+LIMITE_CHAVES_MEMORIA = 10_000_000
+
+#______________________________________________________________________________________
+#Índice
+class IndiceIU:
+    #Registra cada iu com o arquivo de origem (índice na ordem de inclusão dos arquivos)
+    #Os iu com mais de uma ocorrência (no mesmo arquivo ou em arquivos diferentes) são guardados com os arquivos de cada ocorrência
+    #Nos blocos em disco as chaves são comparadas em formato texto (o iu é um código texto: tipo-plaqueta-complemento)
+    def __init__(self, limite_memoria=LIMITE_CHAVES_MEMORIA, pasta=None):
+        self.limite_memoria = limite_memoria
+        self.pasta = pasta
+        self.pasta_blocos = None
+        self.arquivos = []
+        #iu -> arquivo da 1ª ocorrência (chaves em memória)
+        self.memoria = {}
+        #Blocos em disco: (chaves ordenadas, arquivos), abertos em mapeamento de memória
+        self.blocos = []
+        #iu -> arquivos de todas as ocorrências (somente iu replicados)
+        self.repetidos = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fecha()
+
+    def fecha(self):
+        #Remove os blocos em disco
+        self.blocos = []
+        if self.pasta_blocos is not None:
+            shutil.rmtree(self.pasta_blocos, ignore_errors=True)
+            self.pasta_blocos = None
+        return
+
+    def busca_blocos(self, chaves):
+        #Retorna o arquivo da 1ª ocorrência de cada chave nos blocos em disco (-1: chave não encontrada)
+        origem = np.full(len(chaves), -1, dtype=np.int64)
+        if len(self.blocos) == 0 or len(chaves) == 0:
+            return origem
+        textos = np.array([str(chave) for chave in chaves])
+        for chaves_bloco, arquivos_bloco in self.blocos:
+            pos = np.searchsorted(chaves_bloco, textos)
+            pos_valida = np.minimum(pos, len(chaves_bloco) - 1)
+            mask = (pos < len(chaves_bloco)) & (chaves_bloco[pos_valida] == textos) & (origem < 0)
+            origem[mask] = arquivos_bloco[pos_valida[mask]]
+        return origem
+
+    def descarrega(self):
+        #Grava as chaves em memória em um bloco ordenado em disco e libera a memória
+        if self.pasta_blocos is None:
+            self.pasta_blocos = tempfile.mkdtemp(prefix='indice_iu_', dir=self.pasta)
+        chaves = np.array([str(chave) for chave in self.memoria])
+        arquivos = np.fromiter(self.memoria.values(), dtype=np.int32, count=len(self.memoria))
+        ordem = np.argsort(chaves, kind='stable')
+        n = len(self.blocos)
+        path_chaves = os.path.join(self.pasta_blocos, f'chaves_{n}.npy')
+        path_arquivos = os.path.join(self.pasta_blocos, f'arquivos_{n}.npy')
+        np.save(path_chaves, chaves[ordem])
+        np.save(path_arquivos, arquivos[ordem])
+        self.blocos.append((np.load(path_chaves, mmap_mode='r'), np.load(path_arquivos, mmap_mode='r')))
+        self.memoria = {}
+        return
+
+    def adiciona(self, ius, arquivo):
+        #Inclui os iu de um arquivo no índice (valores nulos são ignorados)
+        #Retorna o nº total de iu replicados após a inclusão
+        n_arquivo = len(self.arquivos)
+        self.arquivos.append(arquivo)
+        #Ocorrências de cada iu no arquivo (em ordem de aparição)
+        contagem = ius.dropna().value_counts(sort=False)
+        chaves = contagem.index.to_list()
+        qtdes = contagem.to_numpy()
+        origem_blocos = self.busca_blocos(chaves)
+        for chave, qtde, origem in zip(chaves, qtdes, origem_blocos):
+            if chave in self.repetidos:
+                self.repetidos[chave] += [n_arquivo] * qtde
+                continue
+            if origem < 0:
+                origem = self.memoria.get(chave, -1)
+            if origem >= 0:
+                #iu já registrado em arquivo anterior
+                self.repetidos[chave] = [origem] + [n_arquivo] * qtde
+                continue
+            self.memoria[chave] = n_arquivo
+            if qtde > 1:
+                #iu replicado no próprio arquivo
+                self.repetidos[chave] = [n_arquivo] * qtde
+        if len(self.memoria) > self.limite_memoria:
+            self.descarrega()
+        return len(self.repetidos)
+
+    def colisoes(self):
+        #Retorna a relação dos iu replicados: nº de ocorrências e arquivos de origem
+        linhas = []
+        for chave, arquivos in self.repetidos.items():
+            nomes = [self.arquivos[n] for n in dict.fromkeys(arquivos)]
+            linhas.append((chave, len(arquivos), ', '.join(nomes)))
+        return pd.DataFrame(linhas, columns=['iu', 'Ocorrências', 'Arquivos'])
+
+    def colisoes_arquivos(self):
+        #Retorna o nº de iu replicados por combinação de arquivos
+        df_col = self.colisoes()
+        return df_col.groupby('Arquivos', sort=False).size().reset_index(name='iu replicados')
+#______________________________________________________________________________________
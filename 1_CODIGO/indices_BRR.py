@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:41:05 2026
+
+@author: cecil.skaleski, est.angelo
+
+Tabela do índice IPCA pré-calculada para a etapa movimenta (série mensal e índice diário pro-rata).
+
+A série histórica do IBGE (ipca_AAAAMMSerieHist.xls) é interpretada uma única vez e gravada em formato binário (numpy .npz) na pasta de cache.
+Nas execuções seguintes a tabela é carregada diretamente do arquivo binário, enquanto o arquivo da série não for alterado.
+Se a série não for indicada, é utilizada a mais recente da pasta de entrada: uma nova série (ex.: ipca_202406SerieHist.xls) substitui a tabela gravada.
+"""
+
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+
+import cache_BRR
+import manifesto_BRR
+
+#Versão do formato da tabela (alterar invalida as tabelas existentes)
+VERSAO_INDICE = 1
+NOME_INDICE = 'indice_ipca.npz'
+#Nome dos arquivos da série histórica do IBGE (ano e mês da última medição)
+PADRAO_SERIE = re.compile(r'^ipca_(\d{6})SerieHist\.xlsx?$', re.IGNORECASE)
+
+#______________________________________________________________________________________
+#Funções acessórias
+def series_pasta(pasta):
+    #Retorna os arquivos da série histórica do IPCA na pasta, do mais antigo ao mais recente (ano e mês do nome do arquivo)
+    if not os.path.isdir(pasta):
+        return []
+    series = []
+    for arquivo in os.listdir(pasta):
+        m = PADRAO_SERIE.match(arquivo)
+        if m is not None:
+            series.append((m.group(1), os.path.join(pasta, arquivo)))
+    return [path for _, path in sorted(series)]
+
+def serie_mais_recente(pasta):
+    #Retorna a série histórica do IPCA mais recente da pasta (ou None)
+    series = series_pasta(pasta)
+    return series[-1] if len(series) > 0 else None
+
+def mesmo_arquivo(path1, path2):
+    return os.path.normcase(os.path.abspath(path1)) == os.path.normcase(os.path.abspath(path2))
+
+def resolve_serie(path_ipca, pasta_entrada):
+    #Retorna o arquivo da série a utilizar e a série mais recente da pasta do arquivo, se for outra (ou None)
+    #Arquivo não informado ou pasta: série mais recente da pasta (padrão: pasta de entrada da etapa movimenta)
+    if not path_ipca or os.path.isdir(path_ipca):
+        return serie_mais_recente(path_ipca or pasta_entrada), None
+    recente = serie_mais_recente(os.path.dirname(os.path.abspath(path_ipca)))
+    if recente is None or mesmo_arquivo(recente, path_ipca) or PADRAO_SERIE.match(os.path.basename(path_ipca)) is None:
+        return path_ipca, None
+    return path_ipca, recente
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Leitura e gravação da tabela
+def carrega_indice(path_ipca, pasta_cache=cache_BRR.PASTA_CACHE):
+    #Retorna a série mensal (Data_ts, Índice) e a tabela diária pro-rata (ver movimenta_BRR_v8.ipca_rata) gravadas para o arquivo da série
+    #Tabela inexistente, de outra versão, de outro arquivo (ex.: série mais recente, ver resolve_serie) ou de arquivo alterado: retorna (None, None)
+    path_indice = os.path.join(pasta_cache, NOME_INDICE)
+    if not os.path.isfile(path_indice):
+        return None, None
+    try:
+        with np.load(path_indice) as dados:
+            anterior = json.loads(str(dados['registro']))
+            if anterior['versao'] != VERSAO_INDICE or not mesmo_arquivo(anterior['path'], path_ipca):
+                return None, None
+            if not manifesto_BRR.arquivo_inalterado(manifesto_BRR.registro_arquivo(path_ipca), anterior):
+                return None, None
+            df_ipca = pd.DataFrame({
+                'Data_ts': dados['datas_mes'].astype('datetime64[ns]'),
+                'Índice': dados['indices_mes'],
+                })
+            datas = pd.date_range(pd.Timestamp(dados['inicio'].item()), periods=len(dados['indices']), freq='D')
+            df_ipca_rata = pd.DataFrame({'Índice': dados['indices']}, index=datas)
+    except Exception:
+        return None, None
+    return df_ipca, df_ipca_rata
+
+def grava_indice(path_ipca, df_ipca, df_ipca_rata, pasta_cache=cache_BRR.PASTA_CACHE):
+    #Grava a série mensal e a tabela diária pro-rata (substitui a tabela anterior)
+    os.makedirs(pasta_cache, exist_ok=True)
+    path_indice = os.path.join(pasta_cache, NOME_INDICE)
+    registro = manifesto_BRR.registro_arquivo(path_ipca)
+    registro['hash'] = cache_BRR.hash_arquivo(path_ipca)
+    registro['versao'] = VERSAO_INDICE
+    path_tmp = os.path.join(pasta_cache, f'indice_ipca_{os.getpid()}.tmp.npz')
+    np.savez(path_tmp,
+             registro=np.array(json.dumps(registro)),
+             datas_mes=df_ipca['Data_ts'].to_numpy(dtype='datetime64[D]'),
+             indices_mes=df_ipca['Índice'].to_numpy(dtype=np.float64),
+             inicio=df_ipca_rata.index[0].to_datetime64().astype('datetime64[D]'),
+             indices=df_ipca_rata['Índice'].to_numpy(dtype=np.float64))
+    os.replace(path_tmp, path_indice)
+    return
+#______________________________________________________________________________________
@@ -9,7 +9,6 @@ Requeriments
 conda install conda-forge::matplotlib
 conda install anaconda::openpyxl
 conda install conda-forge::natsort
-conda install -c conda-forge numpy-financial
 conda install anaconda::xlrd
 
 Gerar executável
@@ -18,6 +17,7 @@ pyinstaller main_mov_BRR.py --hidden-import openpyxl.cell._writer --hidden-impor
 
 
 
+import multiprocessing
 import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog
@@ -35,48 +35,53 @@ def show_tab(event):
     elif tab_name == tab3:
         print("Você está na aba 'Movimenta BRR'")
 
-# Criando a janela principal
-root = tk.Tk()
-root.wm_attributes('-topmost', 1)
-root.title("Ferramenta de movimentação da BRR")
-root.geometry("700x350")
-root.configure(bg="white")
-
-# Definindo estilo
-style = ttk.Style()
-style.theme_create("MyStyle", parent="alt", settings={
-    "TNotebook": {"configure": {"background": "navy"}},
-    "TNotebook.Tab": {
-        "configure": {"padding": [20, 5], "background": "blue", "foreground": "white"},
-        "map": {"background": [("selected", "royalblue")]}
-    },
-    "TFrame": {"configure": {"background": "white"}}
-})
-style.theme_use("MyStyle")
-
-# Criando o controle de abas
-tab_control = ttk.Notebook(root)
-
-# Cria as guias
-#Guia 1: Converte BRR
-tab1 = ttk.Frame(tab_control)
-converte_BRR_v7.make_frame(tab1)
-
-#Guia 1: Consolida BRR
-tab2 = ttk.Frame(tab_control)
-consolida_BRR_v5.make_frame(tab2)
-
-#Guia 3: Movimenta BRR
-tab3 = ttk.Frame(tab_control)
-movimenta_BRR_v8.make_frame(tab3)
-
-tab_control.add(tab1, text='Converte BRR')
-tab_control.add(tab2, text='Consolida BRR')
-tab_control.add(tab3, text='Movimenta BRR')
-
-tab_control.pack(expand=1, fill="both")
-
-# Evento para mostrar a aba selecionada
-tab_control.bind("<<NotebookTabChanged>>", show_tab)
-
-root.mainloop()
+if __name__ == '__main__':
+    #Necessário para a leitura em paralelo (processos) no executável gerado pelo pyinstaller e no Windows:
+    #os processos de leitura importam este arquivo e não devem criar a interface
+    multiprocessing.freeze_support()
+
+    # Criando a janela principal
+    root = tk.Tk()
+    root.wm_attributes('-topmost', 1)
+    root.title("Ferramenta de movimentação da BRR")
+    root.geometry("700x350")
+    root.configure(bg="white")
+
+    # Definindo estilo
+    style = ttk.Style()
+    style.theme_create("MyStyle", parent="alt", settings={
+        "TNotebook": {"configure": {"background": "navy"}},
+        "TNotebook.Tab": {
+            "configure": {"padding": [20, 5], "background": "blue", "foreground": "white"},
+            "map": {"background": [("selected", "royalblue")]}
+        },
+        "TFrame": {"configure": {"background": "white"}}
+    })
+    style.theme_use("MyStyle")
+
+    # Criando o controle de abas
+    tab_control = ttk.Notebook(root)
+
+    # Cria as guias
+    #Guia 1: Converte BRR
+    tab1 = ttk.Frame(tab_control)
+    converte_BRR_v7.make_frame(tab1)
+
+    #Guia 1: Consolida BRR
+    tab2 = ttk.Frame(tab_control)
+    consolida_BRR_v5.make_frame(tab2)
+
+    #Guia 3: Movimenta BRR
+    tab3 = ttk.Frame(tab_control)
+    movimenta_BRR_v8.make_frame(tab3)
+
+    tab_control.add(tab1, text='Converte BRR')
+    tab_control.add(tab2, text='Consolida BRR')
+    tab_control.add(tab3, text='Movimenta BRR')
+
+    tab_control.pack(expand=1, fill="both")
+
+    # Evento para mostrar a aba selecionada
+    tab_control.bind("<<NotebookTabChanged>>", show_tab)
+
+    root.mainloop()
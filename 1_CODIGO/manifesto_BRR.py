@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:06:13 2026
+
+@author: cecil.skaleski, est.angelo
+
+Estado da última consolidação (manifesto dos arquivos e base consolidada) para a reconsolidação incremental da etapa consolida.
+
+O manifesto registra, para cada arquivo de BRR parcial: caminho, tamanho, data de modificação, hash do conteúdo,
+cabeçalho (colunas da linha de cabeçalho, usadas na verificação prévia), intervalo de linhas na base consolidada, colunas e tipos. Os iu de cada arquivo são os do seu intervalo de linhas.
+Na reexecução, somente os arquivos novos ou alterados são lidos; os demais são recuperados da base consolidada gravada.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+import cache_BRR
+
+#Versão do formato do manifesto (alterar invalida os estados existentes)
+VERSAO_MANIFESTO = 2
+NOME_MANIFESTO = 'manifesto.json'
+#Chave da base consolidada na pasta do estado (gravada como uma entrada do cache, ver cache_BRR.grava_cache)
+CHAVE_ESTADO = 'brr'
+
+#______________________________________________________________________________________
+#Funções acessórias
+def pasta_estado(path_base, pasta_cache=cache_BRR.PASTA_CACHE):
+    #Pasta do estado da consolidação da pasta de entrada (identificada pelo caminho absoluto)
+    h = hashlib.sha256(os.path.normcase(os.path.abspath(path_base)).encode()).hexdigest()
+    return os.path.join(pasta_cache, f'consolida_{h[:16]}')
+
+def versao():
+    #O estado depende também do formato do cache (leitura e limpeza dos arquivos)
+    return [VERSAO_MANIFESTO, cache_BRR.VERSAO_CACHE]
+
+def registro_arquivo(path):
+    #Registro do arquivo no manifesto (o hash do conteúdo e o cabeçalho são lidos somente quando necessário)
+    info = os.stat(path)
+    return {
+        'arquivo': os.path.basename(path),
+        'path': path,
+        'tamanho': info.st_size,
+        'mtime': info.st_mtime_ns,
+        'hash': None,
+        'cabecalho': None,
+        }
+
+def arquivo_inalterado(registro, anterior):
+    #Verifica se o arquivo é o mesmo da última consolidação
+    #Mesmo tamanho e data de modificação: inalterado; mesmo tamanho e data diferente: compara o hash do conteúdo
+    #Arquivo inalterado: o cabeçalho registrado é reaproveitado
+    if anterior is None or registro['tamanho'] != anterior['tamanho']:
+        return False
+    if registro['mtime'] != anterior['mtime']:
+        registro['hash'] = cache_BRR.hash_arquivo(registro['path'])
+        if registro['hash'] != anterior['hash']:
+            return False
+    registro['hash'] = anterior['hash']
+    registro['cabecalho'] = anterior.get('cabecalho')
+    return True
+
+def cabecalho_arquivo(registro):
+    #Colunas da linha de cabeçalho do arquivo, antes da remoção das colunas vazias (ver cache_BRR.le_cabecalho)
+    if registro['cabecalho'] is None:
+        registro['cabecalho'] = cache_BRR.le_cabecalho(registro['path'])
+    return registro['cabecalho']
+
+def recupera_base(df_estado, anterior):
+    #Recupera a base do arquivo a partir do seu intervalo de linhas na base consolidada
+    #Colunas e tipos originais do arquivo (a concatenação pode ter alterado os tipos, ex.: int -> float em colunas não comuns)
+    df = df_estado.iloc[anterior['linha_ini']:anterior['linha_fim']]
+    df = df.loc[:, anterior['colunas']]
+    return df.astype(dict(zip(anterior['colunas'], anterior['tipos'])))
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Leitura e gravação do estado
+def carrega_estado(path_base, pasta_cache=cache_BRR.PASTA_CACHE):
+    #Retorna o manifesto (nome do arquivo -> registro) e a base consolidada da última consolidação
+    #Estado inexistente, de outra versão ou corrompido: retorna ({}, None)
+    pasta = pasta_estado(path_base, pasta_cache)
+    path_manifesto = os.path.join(pasta, NOME_MANIFESTO)
+    path_df = cache_BRR.busca_cache(CHAVE_ESTADO, pasta)
+    if not os.path.isfile(path_manifesto) or path_df is None:
+        return {}, None
+    try:
+        with open(path_manifesto, 'r', encoding='utf-8') as f:
+            manifesto = json.load(f)
+        if manifesto['versao'] != versao():
+            return {}, None
+        df_estado = cache_BRR.carrega_cache(path_df)
+        if len(df_estado) != manifesto['linhas']:
+            return {}, None
+    except Exception:
+        return {}, None
+    return {anterior['arquivo']: anterior for anterior in manifesto['arquivos']}, df_estado
+
+def compara_manifesto(paths, manifesto):
+    #Classifica os arquivos em relação à última consolidação
+    #Retorna os registros atuais, a indicação de arquivo inalterado e os arquivos removidos
+    registros = [registro_arquivo(path) for path in paths]
+    inalterados = [arquivo_inalterado(registro, manifesto.get(registro['arquivo'])) for registro in registros]
+    atuais = set(registro['arquivo'] for registro in registros)
+    removidos = [arquivo for arquivo in manifesto if arquivo not in atuais]
+    return registros, inalterados, removidos
+
+def carrega_bases(registros, inalterados, manifesto, df_estado, n_processos=None):
+    #Retorna um iterador com as bases dos arquivos, na ordem dos registros
+    #Arquivos inalterados são recuperados da base consolidada; os demais são lidos em paralelo (ver cache_BRR.le_excels)
+    paths_alterados = [registro['path'] for registro, inalterado in zip(registros, inalterados) if not inalterado]
+    leitura = cache_BRR.le_excels(paths_alterados, n_processos)
+    try:
+        for registro, inalterado in zip(registros, inalterados):
+            if inalterado:
+                yield recupera_base(df_estado, manifesto[registro['arquivo']])
+            else:
+                yield next(leitura)
+    finally:
+        #Encerra os processos de leitura
+        leitura.close()
+
+def grava_estado(path_base, registros, dfs, df_brr, pasta_cache=cache_BRR.PASTA_CACHE):
+    #Grava o manifesto e a base consolidada (com o índice original das linhas de cada arquivo)
+    pasta = pasta_estado(path_base, pasta_cache)
+    os.makedirs(pasta, exist_ok=True)
+    path_manifesto = os.path.join(pasta, NOME_MANIFESTO)
+    arquivos = []
+    linha = 0
+    for registro, df in zip(registros, dfs):
+        if registro['hash'] is None:
+            registro['hash'] = cache_BRR.hash_arquivo(registro['path'])
+        cabecalho_arquivo(registro)
+        arquivos.append(dict(registro,
+                             linha_ini=linha,
+                             linha_fim=linha + len(df),
+                             colunas=df.columns.to_list(),
+                             tipos=[str(tipo) for tipo in df.dtypes]))
+        linha += len(df)
+    manifesto = {
+        'versao': versao(),
+        'linhas': linha,
+        'arquivos': arquivos,
+        }
+    #Remove o estado anterior antes de gravar o novo (o manifesto é gravado por último)
+    for path in [path_manifesto] + [os.path.join(pasta, CHAVE_ESTADO + ext) for ext in cache_BRR.EXTENSOES_CACHE]:
+        if os.path.isfile(path):
+            os.remove(path)
+    #Índice atribuído à própria base durante a gravação (set_axis copiaria a base inteira) e restaurado em seguida
+    indice = np.concatenate([df.index.to_numpy() for df in dfs]) if len(dfs) > 0 else []
+    indice_brr = df_brr.index
+    df_brr.index = pd.Index(indice)
+    try:
+        cache_BRR.grava_cache(df_brr, CHAVE_ESTADO, pasta)
+    finally:
+        df_brr.index = indice_brr
+    path_tmp = path_manifesto + '.tmp'
+    with open(path_tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f)
+    os.replace(path_tmp, path_manifesto)
+    return
+#______________________________________________________________________________________
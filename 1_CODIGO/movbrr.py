@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:02:37 2026
+
+@author: cecil.skaleski, est.angelo
+
+Execução das etapas converte, consolida e movimenta pela linha de comando (sem interface gráfica), para execuções desassistidas e em lote.
+
+Exemplos (a partir da pasta 1_CODIGO)
+python -m movbrr converte --base 1_ENTRADA_CONVERTE/base.xlsx --depara 1_ENTRADA_CONVERTE/1_depara_brr.xlsx --plano-contas 1_ENTRADA_CONVERTE/plano_contas.xlsx
+python -m movbrr consolida --pasta 3_ENTRADA_CONSOLIDA/RTP4 --inconsistencias interromper
+python -m movbrr movimenta --base 5_ENTRADA_MOVIMENTA/brr.xlsx --elegibilidade 5_ENTRADA_MOVIMENTA/2_elegibilidade.xlsx --ipca 5_ENTRADA_MOVIMENTA/ipca_202312SerieHist.xls --db-monet 31/12/2023 --db-mov 31/12/2023
+python -m movbrr cenarios --base 5_ENTRADA_MOVIMENTA/brr.xlsx --db-monet 31/12/2022 --db-monet 31/12/2023 --db-mov 31/12/2023 --tx-juros 0.10 --tx-juros 0.1182768
+"""
+
+import os
+import sys
+import argparse
+
+DECISOES = {
+    'continuar': True,
+    'interromper': False,
+    'perguntar': None,
+    }
+
+#______________________________________________________________________________________
+#Destinos das mensagens de progresso
+def progresso_arquivo(path_log):
+    #Destino das mensagens em arquivo de log (acrescenta ao final do arquivo)
+    def progresso(texto):
+        with open(path_log, 'a', encoding='utf-8') as f:
+            f.write(texto)
+    return progresso
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Etapas
+def executa_converte(args, progresso):
+    import converte_BRR_v7
+    return converte_BRR_v7.converte_BRR(not args.sem_exportar, False, args.pasta_projeto, args.base, args.depara, args.plano_contas,
+                                        progresso, continuar_inconsistencias=DECISOES[args.inconsistencias])
+
+def executa_consolida(args, progresso):
+    import consolida_BRR_v5
+    return consolida_BRR_v5.consolida_BRR(not args.sem_exportar, False, args.pasta_projeto, args.pasta, progresso,
+                                          continuar_colunas=DECISOES[args.colunas_nao_comuns],
+                                          continuar_inconsistencias=DECISOES[args.inconsistencias],
+                                          n_processos=args.processos, incremental=not args.reconstroi,
+                                          exporta_parquet=args.parquet)
+
+def executa_movimenta(args, progresso):
+    #Gráficos gerados sem janela (somente exportação em pdf)
+    import matplotlib
+    matplotlib.use('Agg')
+    import movimenta_BRR_v8
+    #Seleção de partições (dataset Parquet) ou de linhas (.xlsx)
+    filtros = {}
+    if args.rtp:
+        filtros['rtp'] = args.rtp
+    if args.municipio:
+        filtros['municipio'] = args.municipio
+    tx_juros = movimenta_BRR_v8.TX_JUROS if args.tx_juros is None else args.tx_juros
+    return movimenta_BRR_v8.movimenta_BRR(not args.sem_exportar, args.pdf, False, args.pasta_projeto, args.db_monet, args.db_mov, args.anos_sim,
+                                          args.base, args.elegibilidade, args.ipca, progresso, filtros=filtros, motor=args.motor,
+                                          retratos=args.retratos, tx_juros=tx_juros, taxas_sensibilidade=args.sensibilidade)
+
+def executa_cenarios(args, progresso):
+    import pandas as pd
+    import progresso_BRR
+    import cenarios_BRR
+    progresso = progresso_BRR.destino_progresso(progresso)
+    #Grade de cenários (todas as combinações dos valores informados)
+    grade = {}
+    if args.tx_juros:
+        grade['tx_juros'] = args.tx_juros
+    if args.elegibilidade:
+        grade['elegibilidade'] = args.elegibilidade
+    cenarios = cenarios_BRR.grade_cenarios(args.db_monet, args.db_mov, **grade)
+    filtros = {}
+    if args.rtp:
+        filtros['rtp'] = args.rtp
+    if args.municipio:
+        filtros['municipio'] = args.municipio
+    print(f'Executando {len(cenarios)} cenários...')
+    progresso(f'Executando {len(cenarios)} cenários...\n')
+    df_cenarios, df_resultados = cenarios_BRR.executa_cenarios(args.pasta_projeto, args.base, cenarios, args.ipca, filtros, args.processos, args.motor)
+    print(df_cenarios)
+    progresso(f'{df_cenarios}\n')
+    #Exporta o resumo dos cenários e os resultados por exercício em formato de planilha excel
+    if not args.sem_exportar:
+        path_exp = os.path.join(args.pasta_projeto, '6_SAIDA_MOVIMENTA', f'CENARIOS_BRR_{len(cenarios)}_cenarios.xlsx')
+        with pd.ExcelWriter(path_exp) as writer:
+            df_cenarios.to_excel(writer, sheet_name='Cenários', index=False)
+            df_resultados.to_excel(writer, sheet_name='Resultados', index=False)
+        print(f'    {path_exp}')
+        progresso(f'    {path_exp}\n')
+    return bool((df_cenarios['situacao'] == 'ok').all())
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Linha de comando
+def monta_parser():
+    parser = argparse.ArgumentParser(prog='movbrr', description='Ferramenta de movimentação da BRR (execução sem interface gráfica)')
+    comuns = argparse.ArgumentParser(add_help=False)
+    comuns.add_argument('--pasta-projeto', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='Pasta com as pastas de entrada e saída das etapas (padrão: pasta do código)')
+    comuns.add_argument('--sem-exportar', action='store_true', help='Não exporta os arquivos de saída')
+    comuns.add_argument('--log', default=None, help='Arquivo de log das mensagens de progresso')
+    sub = parser.add_subparsers(dest='etapa', required=True)
+
+    p = sub.add_parser('converte', parents=[comuns], help='Converte a base de dados em BRR parcial')
+    p.add_argument('--base', required=True, help='Arquivo da base de dados (aba "BRR Incremental")')
+    p.add_argument('--depara', required=True, help='Tabela de conversão de atributos ("De Para")')
+    p.add_argument('--plano-contas', required=True, help='Plano de contas')
+    p.add_argument('--inconsistencias', choices=DECISOES, default='interromper',
+                   help='Decisão caso os requisitos de consistência não sejam cumpridos (padrão: interromper)')
+    p.set_defaults(executa=executa_converte)
+
+    p = sub.add_parser('consolida', parents=[comuns], help='Consolida os arquivos de BRR parcial')
+    p.add_argument('--pasta', required=True, help='Pasta com os arquivos de BRR parcial')
+    p.add_argument('--colunas-nao-comuns', choices=DECISOES, default='interromper',
+                   help='Decisão caso haja colunas não comuns a todos os arquivos (padrão: interromper)')
+    p.add_argument('--inconsistencias', choices=DECISOES, default='interromper',
+                   help='Decisão caso os requisitos de consistência não sejam cumpridos (padrão: interromper)')
+    p.add_argument('--processos', type=int, default=None,
+                   help='Nº de processos de leitura dos arquivos em paralelo (padrão: nº de processadores; 1: leitura em série)')
+    p.add_argument('--reconstroi', action='store_true',
+                   help='Ignora o estado da última consolidação e lê todos os arquivos')
+    p.add_argument('--parquet', action='store_true',
+                   help='Exporta também a BRR em dataset Parquet particionado por rtp e município (entrada aceita pela etapa movimenta)')
+    p.set_defaults(executa=executa_consolida)
+
+    p = sub.add_parser('movimenta', parents=[comuns], help='Movimenta a BRR')
+    p.add_argument('--base', required=True, help='Arquivo da BRR consolidada (.xlsx) ou pasta do dataset Parquet')
+    p.add_argument('--elegibilidade', required=True, help='Lista de alterações de elegibilidade')
+    p.add_argument('--ipca', help='Série histórica do IPCA (IBGE) ou pasta com as séries (padrão: série mais recente em 5_ENTRADA_MOVIMENTA)')
+    p.add_argument('--db-monet', required=True, help='Database monetária (dd/mm/aaaa)')
+    p.add_argument('--db-mov', required=True, help='Database de movimentação (dd/mm/aaaa)')
+    p.add_argument('--anos-sim', type=int, default=76, help='Anos de simulação (padrão: 76)')
+    p.add_argument('--pdf', action='store_true', help='Exporta os gráficos em pdf')
+    p.add_argument('--rtp', type=int, action='append', help='Movimenta somente a RTP indicada (pode ser repetido)')
+    p.add_argument('--municipio', action='append', help='Movimenta somente o município indicado (pode ser repetido)')
+    p.add_argument('--motor', choices=['matriz', 'eventos', 'iterativo'], default='matriz',
+                   help='Cálculo do quadro resumo por exercício: todas as datas de uma só vez (matriz), somas acumuladas dos eventos de cada ativo '
+                        '(eventos, bases grandes) ou uma base depreciada por data (iterativo)')
+    p.add_argument('--retratos', action='store_true',
+                   help='Grava a base depreciada em cada data em 6_SAIDA_MOVIMENTA/2_RETRATOS (um arquivo Parquet por data)')
+    p.add_argument('--tx-juros', type=float, default=None,
+                   help='Taxa de juros do fluxo de caixa de verificação (padrão: a taxa da etapa movimenta, movimenta_BRR_v8.TX_JUROS)')
+    p.add_argument('--sensibilidade', type=float, action='append',
+                   help='Taxa de juros da tabela de sensibilidade da TIR (pode ser repetido)')
+    p.set_defaults(executa=executa_movimenta)
+
+    p = sub.add_parser('cenarios', parents=[comuns], help='Movimenta a BRR para uma grade de cenários, em paralelo')
+    p.add_argument('--base', required=True, help='Arquivo da BRR consolidada (.xlsx) ou pasta do dataset Parquet')
+    p.add_argument('--elegibilidade', action='append', help='Lista de alterações de elegibilidade (pode ser repetido; padrão: sem alterações)')
+    p.add_argument('--ipca', help='Série histórica do IPCA (IBGE) ou pasta com as séries (padrão: série mais recente em 5_ENTRADA_MOVIMENTA)')
+    p.add_argument('--db-monet', action='append', required=True, help='Database monetária (dd/mm/aaaa, pode ser repetido)')
+    p.add_argument('--db-mov', action='append', required=True, help='Database de movimentação (dd/mm/aaaa, pode ser repetido)')
+    p.add_argument('--tx-juros', type=float, action='append', help='Taxa de juros do fluxo de caixa (ex.: 0.1182768, pode ser repetido)')
+    p.add_argument('--rtp', type=int, action='append', help='Movimenta somente a RTP indicada (pode ser repetido)')
+    p.add_argument('--municipio', action='append', help='Movimenta somente o município indicado (pode ser repetido)')
+    p.add_argument('--processos', type=int, default=None,
+                   help='Nº de processos em paralelo (padrão: nº de processadores; 1: execução em série)')
+    p.add_argument('--motor', choices=['matriz', 'eventos'], default='matriz',
+                   help='Cálculo do quadro resumo por exercício (ver a etapa movimenta)')
+    p.set_defaults(executa=executa_cenarios)
+    return parser
+
+def main(argv=None):
+    args = monta_parser().parse_args(argv)
+    progresso = None
+    if args.log is not None:
+        progresso = progresso_arquivo(args.log)
+    concluido = args.executa(args, progresso)
+    #Código de saída: 0 se a etapa foi concluída, 1 se foi interrompida
+    return 0 if concluido else 1
+#______________________________________________________________________________________
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -19,15 +19,17 @@ import calendar
 import math
 import subprocess
 
-import openpyxl
-from openpyxl.styles import PatternFill
-from copy import copy
-
-import tkinter as tk
-from tkinter import filedialog
-
-import numpy_financial as npf
-    #conda install -c conda-forge numpy-financial
+#A interface gráfica (tkinter e segundo_plano_BRR) é importada somente nas funções GUI: as etapas são executadas sem Tk (ver movbrr)
+
+import progresso_BRR
+import cache_BRR
+import dataset_BRR
+import resumo_BRR
+import tipos_BRR
+import indices_BRR
+import deprecia_BRR
+import formata_BRR
+import fluxo_BRR
 
 np.set_printoptions(linewidth=np.inf)
 pd.set_option('display.max_columns', 20)
@@ -40,6 +42,14 @@ pd.options.display.float_format = '{:.2f}'.format
 pd.set_option("display.date_dayfirst", True)
 pd.set_option('display.max_colwidth', 55)
 
+#Colunas da BRR utilizadas na movimentação (leitura do dataset Parquet)
+COLUNAS_MOVIMENTA = ['iu', 'rtp', 'municipio', 'servico', 'conta_contabil', 'descricao', 'qtde', 'custo_contabil',
+                     'data_imob', 'data_monet', 'taxa_deprec_anos', 'elegibilidade', 'vrb']
+#Taxa de juros do fluxo de caixa de verificação
+TX_JUROS = 0.1182768
+#Colunas do quadro resumo por exercício (linhas dos motores de depreciação)
+COLUNAS_RESUMO = ['data_imob', 'data_monet_atual', 'Investimento', 'BRR bruta', 'BRR liquida', 'dep_acum_reg', 'saldo_ineleg_bruto', 'saldo_ineleg_liquido']
+
 #______________________________________________________________________________________
 #Funções acessórias
 def formats2(x):
@@ -60,6 +70,8 @@ def monta_path(abs_path, folder_path, fname):
     return os.path.join(abs_path, folder_path+fname)
 
 def escolhe_arq(titulo, filetypes, dir_ini):
+    import tkinter as tk
+    from tkinter import filedialog
     root = tk.Tk()
     root.wm_attributes('-topmost', 1)
     root.withdraw()
@@ -85,7 +97,7 @@ def agrupa2(database, i_colunas_agrupamento, i_coluna_agregacao, ordem_decrescen
     colunas_agrupamento = colunas_agrupamento + ']'
 
     #Constroi o comando para agrupamento:
-    comando_agrup = "database.groupby(" + colunas_agrupamento + ")[database.columns[i_coluna_agregacao]].sum().reset_index(name=database.columns[i_coluna_agregacao])"
+    comando_agrup = "database.groupby(" + colunas_agrupamento + ", observed=True)[database.columns[i_coluna_agregacao]].sum().reset_index(name=database.columns[i_coluna_agregacao])"
     df_agrupado = eval(comando_agrup)
 
     if ordem_decrescente == 1:
@@ -106,23 +118,24 @@ def agrupa2(database, i_colunas_agrupamento, i_coluna_agregacao, ordem_decrescen
   
 def calc_brr_imob2(df_base, db_mov, df_eleg):
     #Calcula os resultados da BRR para uma determinada database de depreciação dos ativos (considerando alterações de elegibilidade)
+    #df_eleg: lista de alterações de elegibilidade ou registro das alterações da base (deprecia_BRR.RegistroElegibilidade, montado
+    #    uma única vez para todas as datas: em cada data são aplicadas somente as alterações novas)
+    if not isinstance(df_eleg, deprecia_BRR.RegistroElegibilidade):
+        df_eleg = deprecia_BRR.RegistroElegibilidade(df_base, df_eleg)
     
     #Data do início do exercício
     data_ini = pd.to_datetime(f'01/01/{db_mov.year}')
     #Filtra os ativos imobilizados até a data especificada
-    df_aux = df_base[df_base['data_imob'] <= db_mov].copy()
+    imob = (df_base['data_imob'] <= db_mov).to_numpy()
+    df_aux = df_base[imob].copy()
     #Indexa pelo identificador único
     df_aux.index = df_aux['iu']
     
     #Atualiza elegibilidade
-    #Verifica se há itens imobilizados com atualização de elegibilidade no período
-    df_aux_eleg = df_eleg[df_eleg['data'] < db_mov].copy()
-    #Verifica se os itens já foram imobilizados na BRR
-    df_aux_eleg = df_aux_eleg[df_aux_eleg['iu'].isin(df_aux['iu'].to_list())]
-    if len(df_aux_eleg) > 0:
-        mask = (df_aux_eleg['elegibilidade'] == 'Não elegível')
-        df_aux_eleg = df_aux_eleg[mask].copy()
-        df_aux_eleg.index = df_aux_eleg['iu']
+    #Alterações em vigor na data (posições dos ativos já imobilizados na BRR)
+    alterados, datas_eleg = df_eleg.vigentes(db_mov)
+    pos_eleg = np.flatnonzero(alterados[imob])
+    datas_eleg = datas_eleg[imob][pos_eleg]
         
     #Calcula a vida útil do ativo [anos]
     df_aux['vur_anos'] = 1 / (df_aux['taxa_deprec_anos'] / 100)
@@ -134,10 +147,9 @@ def calc_brr_imob2(df_base, db_mov, df_eleg):
     df_aux['data_mov_atual'] = db_mov
     
     #Restringe a data de movimentação de ativos não elegíveis
-    if len(df_aux_eleg) > 0:
-        mask = df_aux_eleg.index
-        df_aux.loc[mask, 'data_mov_atual'] = df_aux_eleg['data'].to_list()
-        df_aux.loc[mask, 'elegibilidade'] = df_aux_eleg.loc[mask, 'elegibilidade']
+    if len(pos_eleg) > 0:
+        df_aux.iloc[pos_eleg, df_aux.columns.get_loc('data_mov_atual')] = datas_eleg
+        df_aux.iloc[pos_eleg, df_aux.columns.get_loc('elegibilidade')] = deprecia_BRR.NAO_ELEGIVEL
         
     #Calcula vida útil consumida
     df_aux['vur_consumida_anos'] = (df_aux['data_mov_atual'] - df_aux['data_imob']) / pd.Timedelta('365 days') #Ano fiscal considerado: ano civil
@@ -232,6 +244,48 @@ def calc_brr_imob(df_base, db_mov):
     #_______________________________________
     return df_aux, result_ano
 
+def carrega_brr(path_ref, filtros=None):
+    #Carrega a BRR consolidada (.xlsx ou dataset Parquet) com os tipos compactos
+    #Retorna a base e a memória ocupada antes e depois da compactação
+    if dataset_BRR.eh_dataset(path_ref):
+        #Dataset Parquet: lê somente as colunas utilizadas na movimentação e as partições selecionadas
+        df_brr = dataset_BRR.le_dataset(path_ref, COLUNAS_MOVIMENTA, filtros)
+    else:
+        #Carrega o arquivo (faz o drop de eventuais valores expurios)
+        df_brr = cache_BRR.le_excel(path_ref)
+        for col, valores in (filtros or {}).items():
+            df_brr = df_brr[df_brr[col].isin(list(valores))]
+    #Tipos compactos (categorias e datas): as bases de cada exercício compartilham as categorias da base carregada
+    return tipos_BRR.compacta_tipos(df_brr)
+
+def carrega_elegibilidade(path_eleg):
+    #Carrega a lista de alterações de elegibilidade (datas convertidas em timestamp)
+    #Carrega o arquivo (faz o drop de eventuais valores expurios)
+    df_eleg = cache_BRR.le_excel(path_eleg)
+    #Converte a data para timestamp
+    if len(df_eleg) > 0:
+        df_eleg['data'] = pd.to_datetime(df_eleg['data'])
+    return df_eleg
+
+def deprecia_base(df_base, db_mov, df_eleg=None):
+    #Deprecia a base na data, com as alterações de elegibilidade (se informadas)
+    if df_eleg is not None:
+        return calc_brr_imob2(df_base, db_mov, df_eleg)
+    return calc_brr_imob(df_base, db_mov)
+
+def grava_retrato(df_brr_db, pasta_retratos, db_mov):
+    #Grava a base depreciada na data (um arquivo por data), conferindo a gravação em Parquet como no cache (ver cache_BRR.grava_cache)
+    #Bases que o Parquet não grava (ex.: colunas com números e textos misturados) são gravadas em pickle
+    os.makedirs(pasta_retratos, exist_ok=True)
+    fname = f"BRR_DBI-{db_mov.strftime('%d-%m-%Y')}"
+    try:
+        path_retrato = os.path.join(pasta_retratos, fname + '.parquet')
+        df_brr_db.to_parquet(path_retrato, index=False)
+    except (ImportError, ValueError, TypeError, NotImplementedError):
+        path_retrato = os.path.join(pasta_retratos, fname + '.pkl')
+        df_brr_db.reset_index(drop=True).to_pickle(path_retrato)
+    return path_retrato
+
 def valida_data(data):
     #Função para testar se a data está no formato adequado
     try:
@@ -246,20 +300,12 @@ def monta_data(mes, ano):
     last_day = calendar.monthrange(int(ano), int(mes))[1]
     return f'{last_day}/{mes}/{ano}'
 
-def gera_datas(data_ini, data_fim):
-    #Gera as datas intermediarias entre duas datas
-    datas = [data_ini]
-    delta_dias = (data_fim - data_ini).days
-    for i in range(0, delta_dias):
-        datas.append(datas[-1] + pd.Timedelta('1 day'))
-    return datas        
-
 def importa_ipca(path_ipca):
     #Importa o arquivo excel do IBGE com as séries históricas
     #https://www.ibge.gov.br/estatisticas/economicas/precos-e-custos/9256-indice-nacional-de-precos-ao-consumidor-amplo.html?=&t=series-historicas
 
     #Importa arquivo excel (alterar a engine e comando de importação para outros formatos)
-    dfs = pd.read_excel(path_ipca, sheet_name=0)
+    dfs = cache_BRR.le_excel(path_ipca, limpa=False, sheet_name=0)
     #path = 'F:\HOMEOFFICE\SANEAMENTO\\ipca_202011SerieHist.xls'
     #Seleciona as 3 primeiras colunas, remove as linhas com valores NaN e também as duas ulltimas linhas de texto do dataframe
     dfs = dfs.iloc[:, 0:3].dropna(how='all')
@@ -293,37 +339,71 @@ def importa_ipca(path_ipca):
     return dfs
 
 def ipca_rata(df_ipca):
-    #Gera a tabela do índice IPCA pro-rata
-    df_ipca_rata = pd.DataFrame([])
-    for i in range(0, len(df_ipca)-1):
-        idx_ini = i
-        idx_fim = i+1
-        ni_ini = df_ipca.loc[idx_ini, 'Índice']
-        ni_fim = df_ipca.loc[idx_fim, 'Índice']
-        data_ini = df_ipca.loc[idx_ini, 'Data_ts']
-        data_fim = df_ipca.loc[idx_fim, 'Data_ts']
-        datas_inter = gera_datas(data_ini, data_fim)
-        #Gera interpolação linear dos valores
-        idx_inter = np.linspace(ni_ini, ni_fim, len(datas_inter))
-        #Monta o dataframe
-        df_aux = pd.DataFrame({'Índice': idx_inter})
-        df_aux.index = datas_inter
-        #Registra
-        df_ipca_rata = pd.concat([df_ipca_rata, df_aux], ignore_index=False)
-    df_ipca_rata.drop_duplicates(keep='first', inplace=True)
+    #Gera a tabela do índice IPCA pro-rata: interpolação linear diária entre os índices mensais consecutivos
+    #Todos os dias entre o primeiro e o último mês são calculados de uma só vez (um registro por dia, inclusive dias com o mesmo índice)
+    #A tabela é indexada pela data (índice diário contínuo): a consulta de uma data é feita em tempo constante
+    datas_mes = df_ipca['Data_ts'].to_numpy(dtype='datetime64[D]')
+    indices_mes = df_ipca['Índice'].to_numpy(dtype=np.float64)
+    datas = np.arange(datas_mes[0], datas_mes[-1] + np.timedelta64(1, 'D'))
+    indices = np.interp(datas.astype(np.int64), datas_mes.astype(np.int64), indices_mes)
+    df_ipca_rata = pd.DataFrame({'Índice': indices}, index=pd.DatetimeIndex(datas.astype('datetime64[ns]'), freq='D'))
     return df_ipca_rata
 
-def var_indice(data_ini, data_fim, df_indice):
-    #Calcula a variação do índice economico no período especificado
-    return (df_indice.loc[data_fim, 'Índice'] / df_indice.loc[data_ini, 'Índice'])
+def posicao_datas(datas, df_indice):
+    #Posição de cada data na tabela diária do índice: nº de dias desde a primeira data da tabela (ver ipca_rata)
+    #Retorna as posições e a situação de cada data: 0 = válida, 1 = nula, 2 = anterior ao início e 3 = posterior ao fim da tabela
+    dias = pd.to_datetime(datas).to_numpy(dtype='datetime64[D]')
+    nulas = np.isnat(dias)
+    pos = (dias - df_indice.index[0].to_datetime64().astype('datetime64[D]')).astype(np.int64)
+    situacao = np.select([nulas, pos < 0, pos >= len(df_indice)], [1, 2, 3], default=0)
+    pos[situacao != 0] = 0
+    return pos, situacao
+
+def var_indice(datas_ini, datas_fim, df_indice):
+    #Calcula a variação do índice economico entre as datas iniciais e finais (colunas) de cada item
+    #Uma única consulta por posição na tabela diária do índice para cada coluna de datas
+    #Retorna a variação (NaN para datas nulas ou fora do período da tabela) e a situação das datas de cada coluna (ver posicao_datas)
+    indices = df_indice['Índice'].to_numpy()
+    pos_ini, situacao_ini = posicao_datas(datas_ini, df_indice)
+    pos_fim, situacao_fim = posicao_datas(datas_fim, df_indice)
+    var = indices[pos_fim] / indices[pos_ini]
+    var[(situacao_ini != 0) | (situacao_fim != 0)] = np.nan
+    return var, situacao_ini, situacao_fim
+
+def datas_invalidas(df, cols_data, situacoes, df_indice):
+    #Relação dos itens com datas nulas ou fora do período da tabela do índice (iu, datas e motivo)
+    inicio = df_indice.index[0].strftime('%d/%m/%Y')
+    fim = df_indice.index[-1].strftime('%d/%m/%Y')
+    motivos = pd.Series('', index=df.index)
+    for col, situacao in zip(cols_data, situacoes):
+        textos = np.array(['', f'{col} nula', f'{col} anterior a {inicio}', f'{col} posterior a {fim}'])
+        mask = (situacao != 0) & (motivos == '').to_numpy()
+        motivos[mask] = textos[situacao[mask]]
+    mask = (motivos != '')
+    df_inv = df.loc[mask, ['iu'] + cols_data].copy()
+    df_inv['motivo'] = motivos[mask]
+    return df_inv
+
+def carrega_ipca(path_ipca):
+    #Retorna a série mensal do IPCA e a tabela diária pro-rata
+    #Tabela já calculada para o arquivo da série (ver indices_BRR); se inexistente ou desatualizada, importa o arquivo e grava a tabela
+    df_ipca, df_ipca_rata = indices_BRR.carrega_indice(path_ipca)
+    if df_ipca is None:
+        df_ipca = importa_ipca(path_ipca)
+        #Monta a tabela com  a variação proporcional do índice (pro-rata)
+        df_ipca_rata = ipca_rata(df_ipca)
+        try:
+            indices_BRR.grava_indice(path_ipca, df_ipca, df_ipca_rata)
+        except OSError as e:
+            print(f'    Não foi possível gravar a tabela do IPCA: {e}')
+    return df_ipca, df_ipca_rata
 
 def atualiza_ipca(path_ipca, df_base, db_monet, cols_data, cols_monet):
     #Atualiza monetariamente a base
+    #Retorna a base atualizada e a relação dos itens com datas nulas ou fora do período da série do IPCA (não atualizados, var_ipca nula)
     #Importa as tabelas de dados do IPCA
     #path_ipca = r'C:/Users/cecil.skaleski/Documents/10. ATR/3_FERRAMENTAS/1_SANEAMENTO/1_FISCALIZAÇÃO/2_AMOSTRAGEM/3_BRR/ipca_202312SerieHist.xls'
-    df_ipca = importa_ipca(path_ipca)
-    #Monta a tabela com  a variação proporcional do índice (pro-rata)
-    df_ipca_rata = ipca_rata(df_ipca)
+    df_ipca, df_ipca_rata = carrega_ipca(path_ipca)
     
     #Calcula a variação do índice para cada ativo
     df_brr_db = df_base.copy()
@@ -331,23 +411,72 @@ def atualiza_ipca(path_ipca, df_base, db_monet, cols_data, cols_monet):
     df_brr_db['data_monet_atual'] = pd.to_datetime(db_monet, format='%d/%m/%Y')
     col_ini = cols_data[0]
     col_fim = cols_data[1]
-    df_brr_db['var_ipca'] = df_brr_db.apply(lambda x: var_indice(x[col_ini], x[col_fim], df_ipca_rata), axis=1)
+    df_brr_db['var_ipca'], situacao_ini, situacao_fim = var_indice(df_brr_db[col_ini], df_brr_db[col_fim], df_ipca_rata)
+    df_datas_inv = datas_invalidas(df_brr_db, cols_data, [situacao_ini, situacao_fim], df_ipca_rata)
     
     #Aplica a variação do índice às colunas selecionadas
     for col in cols_monet:
         df_brr_db[col] = df_brr_db[col] * df_brr_db['var_ipca']
-    return  df_brr_db
-
-def TIR(fluxo_caixa):
-    #Calcula a TIR de um fluxo de caixa (dataframe)
-    tir = npf.irr(fluxo_caixa)
-    #Calcula o VPL
-    df_vpl = []
-    for ano in range(0, len(fluxo_caixa)):
-        #Calcula cada elemento do fluxo descontando pela taxa i
-        df_vpl.append(fluxo_caixa[ano]/(1 + tir)**ano)
+    return  df_brr_db, df_datas_inv
+
+def TIR(fluxo_caixa, chute=None):
+    #Calcula a TIR de um fluxo de caixa (lista) e o fluxo descontado pela TIR (ver fluxo_BRR.tir)
+    #chute: estimativa inicial da TIR (ex.: taxa de juros do fluxo)
+    fluxo = np.asarray(fluxo_caixa, dtype=np.float64)
+    tir = fluxo_BRR.tir(fluxo[None, :], chute)[0]
+    #Calcula cada elemento do fluxo descontando pela TIR
+    df_vpl = (fluxo * fluxo_BRR.descontos([tir], len(fluxo))[0]).tolist()
     return df_vpl, tir
 
+def monta_resumo(results_brr):
+    #Monta o quadro resumo por exercício (linhas dos motores de depreciação) com a QRR e a taxa média de depreciação de cada período
+    df_resumo_brr = pd.DataFrame(results_brr)
+    df_resumo_brr.columns = COLUNAS_RESUMO
+    #Calcula a QRR acumulada em cada período
+    qrrs = [df_resumo_brr.loc[0, 'dep_acum_reg']]
+    for i in range(1, len(df_resumo_brr)):
+        qrr = df_resumo_brr.loc[i, 'dep_acum_reg'] - df_resumo_brr.loc[i-1, 'dep_acum_reg']
+        qrrs.append(qrr)
+    df_resumo_brr['qrr'] = qrrs
+    #Calcula a taxa média de depreciação em cada período
+    mask = df_resumo_brr['BRR bruta'] > 0
+    df_resumo_brr['tdr_media_anual'] = 0.0
+    df_resumo_brr.loc[mask, 'tdr_media_anual'] = (df_resumo_brr.loc[mask, 'qrr'] / df_resumo_brr.loc[mask, 'BRR bruta'])
+    return df_resumo_brr
+
+def monta_fluxo(df_resumo_brr, tx_juros):
+    #Monta o fluxo de caixa de verificação do quadro resumo (investimentos, amortização e juros sobre a BRR líquida)
+    #Retorna o fluxo até o primeiro período sem pagamentos
+    #Avalia os investimentos realizados no período (crescimento da BRR bruta)
+    df_fc = df_resumo_brr.copy()
+    df_fc['Investimento'] = -1 * df_resumo_brr['Investimento']
+     
+    #Repete a ultima linha e adiciona o valor residual, se houver
+    last_date = df_fc['data_imob'].tail(1).iloc[0]                                            
+    df_fc = pd.concat([df_fc, df_fc.tail(1)], axis=0, ignore_index=True)
+    #Ajusta a data do ultimo ano do fluxo
+    df_fc.loc[df_fc.index[-1], 'data_imob'] = (pd.to_datetime(last_date, dayfirst=True) + pd.DateOffset(years=1)).strftime('%d/%m/%Y') 
+    df_fc['Amortização'] = df_fc['qrr']
+    #Ajusta a amortização incluindo eventual saldo não amortizado
+    df_fc.loc[df_fc.index[-1], 'Amortização'] = df_fc.loc[df_fc.index[-1], 'BRR liquida']
+    #Ajusta o investimento no último ano (desconsidera)
+    df_fc.loc[df_fc.index[-1], 'Investimento'] = 0
+    
+    #Calcula os juros
+    juros = [0] + (df_resumo_brr['BRR liquida']*tx_juros).to_list()
+    df_fc['Juros'] = juros
+    #Inclui o saldo devedor
+    df_fc['Saldo'] = df_fc['BRR liquida']
+    #Calcula o fluxo de pagamentos
+    df_fc['Fluxo'] = df_fc['Investimento'] + df_fc['Amortização'] + df_fc['Juros']
+    
+    #Ajusta o nº de períodos do fluxo de caixa
+    aux_corte = df_fc[df_fc['Fluxo'] == 0]
+    if len(aux_corte) > 0:
+        idx_corte = aux_corte.head(1).index[0]
+        df_fc = df_fc.head(idx_corte)
+    return df_fc
+
 def calc_periodos(data_ini, data_fim):
     #Calcula o nº de exercícios entre duas datas e monta a lista de datas de simulação
     #Inicio do exercício: 01/01 (inicio do dia)
@@ -470,100 +599,40 @@ def plota_TDR(df_resumo_brr, n_linhas, rtp, db_monet, db_mov, abs_path, gera_pdf
     return
 #______________________________________________________________________________________
 
-#______________________________________________________________________________________
-#Replica formatação do arquivo excel de saída
-def num_para_letra(n):
-    letras = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-    if n <= 26:
-        result = letras[n - 1]
-    else:
-        quociente = (n - 1) // 26
-        resto = (n - 1) % 26
-        result =  num_para_letra(quociente) + letras[resto]
-    return result
-
-def justificar_tamanho_colunas(ws):
-    for coluna in ws.columns:
-        max_length = 0
-        for cell in coluna[1:]:
-            if cell.value:
-                if isinstance(cell.value, float):
-                    if 0 < cell.value < 1:
-                        max_length = max(max_length, 7)
-                    else:
-                        max_length = max(max_length, len(str(cell.value)))
-                else:
-                    max_length = max(max_length, len(str(cell.value)))
-
-        largura_justificada = (max_length + 2) * 1.2
-        ws.column_dimensions[coluna[0].column_letter].width = largura_justificada
-    return
-
-def copiar_estilos_celula(origem, destino):
-    destino.font = copy(origem.font)
-    destino.fill = copy(origem.fill)
-    destino.border = copy(origem.border)
-    destino.alignment = copy(origem.alignment)
-    destino.protection = copy(origem.protection)
-    destino.number_format = origem.number_format
-    return
-
-def copia_format(template_path, original_path, output_path):
-    template_workbook = openpyxl.load_workbook(template_path)
-    original_workbook = openpyxl.load_workbook(original_path)
-
-    template_sheet = template_workbook.active
-    original_sheet = original_workbook.active
-    
-    tpdebug = round(len(list(original_sheet.iter_rows()))/2)
-    template_place = list(template_sheet.iter_rows())[1:] * round((len(list(original_sheet.iter_rows()))-1)/round(len(list(template_sheet.iter_rows())[1:])))
-    new_template_list = [list(template_sheet.iter_rows())[0]] * round(len(list(original_sheet.iter_rows())[0])/len(list(original_sheet.iter_rows())[0]))
-    new_template_list.extend(template_place)
-
-    justificar_tamanho_colunas(original_sheet)
-
-    lenght_x = len(new_template_list[0])
-    lenght_y = len(new_template_list)
-
-    for sheet_name in original_workbook.sheetnames:
-        ws = original_workbook[sheet_name]
-        for row in ws.iter_rows(min_row=1, max_row=lenght_y*3, min_col=1, max_col=lenght_x+100):
-            for cell in row:
-                cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-    
-    for row_template, row_original in zip(new_template_list, original_sheet.iter_rows()):
-        for cell_template, cell_original in zip(row_template, row_original):
-            copiar_estilos_celula(cell_template, cell_original)
-
-    original_workbook.save(output_path)
-    return
-#______________________________________________________________________________________
-
 #______________________________________________________________________________________
 #Função principal
-def movimenta_BRR(export, gera_pdf, open_folder, abs_path, db_monet, db_mov, anos_sim, path_ref, path_eleg, path_ipca, mensagem_text):
+def movimenta_BRR(export, gera_pdf, open_folder, abs_path, db_monet, db_mov, anos_sim, path_ref, path_eleg, path_ipca, progresso=None, executa_graficos=None, filtros=None, motor='matriz', retratos=False,
+                  tx_juros=TX_JUROS, taxas_sensibilidade=None):
     """Movimenta a BRR conforme orientação técnica (protocolo n° xx.xxx.xx-x)"""
+    #progresso: destino das mensagens de progresso (ver progresso_BRR); se não informado, as mensagens são apenas impressas no console
+    #executa_graficos: função que executa as funções de gráficos (funcao, *args); se não informada, os gráficos são gerados na própria thread
+    #    (a execução em segundo plano agenda os gráficos na thread da interface, ver segundo_plano_BRR.graficos_na_interface)
+    #path_ref: arquivo .xlsx da BRR consolidada ou dataset Parquet particionado gerado pela etapa consolida (ver dataset_BRR)
+    #motor: cálculo do quadro resumo por exercício (ver deprecia_BRR): 'matriz' (todas as datas de uma só vez), 'eventos' (somas acumuladas
+    #    dos eventos de cada ativo, para bases grandes e históricos longos) ou 'iterativo' (base depreciada em cada data)
+    #    Em todos os motores somente a base depreciada na data final é mantida em memória (relatórios e exportação)
+    #retratos: grava a base depreciada em cada data em 6_SAIDA_MOVIMENTA/2_RETRATOS (um arquivo Parquet por data, ver grava_retrato)
+    #tx_juros: taxa de juros do fluxo de caixa de verificação
+    #taxas_sensibilidade: taxas de juros da tabela de sensibilidade da TIR (ver fluxo_BRR.tabela_sensibilidade); se não informadas, a tabela não é apresentada
+    #path_ipca: série histórica do IPCA; se não informada (ou pasta), é utilizada a série mais recente da pasta (padrão: 5_ENTRADA_MOVIMENTA)
+    #filtros: seleção de partições do dataset (ex.: {'municipio': ['CURITIBA']}); na leitura do .xlsx, as linhas são filtradas
+    #Retorna True ao concluir a movimentação (False se a série do IPCA não for encontrada ou se houver itens com datas nulas ou fora do período da série)
+    progresso = progresso_BRR.destino_progresso(progresso)
+    if executa_graficos is None:
+        executa_graficos = progresso_BRR.executa_local
     #Carrega a BRR
     print('')
     print('_____________________________________MOVIMENTA BRR_____________________________________')
     print('Carregando a BRR...')
-    mensagem_text.insert(tk.END, '\n\nCarregando a BRR...\n')
-    df_brr = pd.read_excel(path_ref)
-    #Faz o drop de eventuais valores expurios
-    df_brr.dropna(how='all', axis=1, inplace=True)
-    df_brr.dropna(how='all', axis=0, inplace=True)
+    progresso('\n\nCarregando a BRR...\n')
+    df_brr, mem_antes, mem_depois = carrega_brr(path_ref, filtros)
+    print(tipos_BRR.relata_memoria(mem_antes, mem_depois))
+    progresso(f'{tipos_BRR.relata_memoria(mem_antes, mem_depois)}\n')
     
     #Importa a lista de alterações de elegibilidade
-    mensagem_text.insert(tk.END, '\n\nCarregando a lista de alterações da elegibilidade...\n')
-    df_eleg = pd.read_excel(path_eleg)
-    #Faz o drop de eventuais valores expurios
-    df_eleg.dropna(how='all', axis=1, inplace=True)
-    df_eleg.dropna(how='all', axis=0, inplace=True)
-    #Converte a data para timestamp
-    flag_eleg = False
-    if len(df_eleg) > 0:
-        df_eleg['data'] = pd.to_datetime(df_eleg['data'])
-        flag_eleg = True
+    progresso('\n\nCarregando a lista de alterações da elegibilidade...\n')
+    df_eleg = carrega_elegibilidade(path_eleg)
+    flag_eleg = len(df_eleg) > 0
     
     #Cria a base de movimentação
     #Dados da base
@@ -571,14 +640,36 @@ def movimenta_BRR(export, gera_pdf, open_folder, abs_path, db_monet, db_mov, ano
     df_brr['data_monet_atual'] = pd.to_datetime(db_monet, format='%d/%m/%Y')
     #Database de movimentação atualizada
     df_brr['data_mov_atual'] = pd.to_datetime(db_mov, format='%d/%m/%Y')
-    rtp = df_brr['rtp'].apply(int).max()
-    
+    rtp = df_brr['rtp'].astype(int).max()
+
+    #Apresenta a tabela resumo da BRR carregada (por conta contábil)
+    df_res_brr = resumo_BRR.tabela_resumo(df_brr, 'qtde', 'custo_contabil', 'conta_contabil', 'municipio')
+    df_res_brr['Custo contábil'] = df_res_brr['Custo contábil'].apply(formats2)
+    df_res_brr['%'] = df_res_brr['%'].apply(formats3)
+    df_res_brr['% acum'] = df_res_brr['% acum'].apply(formats3)
+    print('')
+    print('Tabela resumo da BRR')
+    print(df_res_brr)
+    progresso(f'\n\nTabela resumo da BRR\n{df_res_brr}\n')
+
     #Atualiza monetariamente a base
     print('')
     print('____________________________________Atualização monetária____________________________________')
     print(f'Atualizando monetariamente a BRR para a database de {db_monet}...')
-    mensagem_text.insert(tk.END, f'\n\n____________________________________Atualização monetária____________________________________\n')
-    mensagem_text.insert(tk.END, f'Atualizando monetariamente a BRR para a database de {db_monet}...\n')
+    progresso(f'\n\n____________________________________Atualização monetária____________________________________\n')
+    progresso(f'Atualizando monetariamente a BRR para a database de {db_monet}...\n')
+    #Série histórica do IPCA
+    path_ipca, path_recente = indices_BRR.resolve_serie(path_ipca, monta_path(abs_path, '5_ENTRADA_MOVIMENTA', ''))
+    if path_ipca is None:
+        print('Série histórica do IPCA não encontrada!')
+        progresso('Série histórica do IPCA não encontrada!\n')
+        print('_____________________________________MOVIMENTA BRR_____________________________________')
+        return False
+    print(f'Série histórica do IPCA: {os.path.basename(path_ipca)}')
+    progresso(f'Série histórica do IPCA: {os.path.basename(path_ipca)}\n')
+    if path_recente is not None:
+        print(f'    Atenção: há uma série mais recente na pasta ({os.path.basename(path_recente)})')
+        progresso(f'    Atenção: há uma série mais recente na pasta ({os.path.basename(path_recente)})\n')
     #Cria uma cópia para comparar o resultado
     df_base_bkp = df_brr.copy()
     #Define as colunas que contém as datas iniciais e finais do calculo monetario
@@ -590,7 +681,17 @@ def movimenta_BRR(export, gera_pdf, open_folder, abs_path, db_monet, db_mov, ano
     cols_monet = ['vrb']
     
     #Atualiza monetarimente
-    df_brr_monet = atualiza_ipca(path_ipca, df_brr, db_monet, cols_data, cols_monet)
+    df_brr_monet, df_datas_inv = atualiza_ipca(path_ipca, df_brr, db_monet, cols_data, cols_monet)
+    #Interrompe se houver itens com datas nulas ou fora do período da série do IPCA
+    if len(df_datas_inv) > 0:
+        print(f'{len(df_datas_inv)} itens com datas nulas ou fora do período da série do IPCA:')
+        print(df_datas_inv.head(10))
+        print('Atualização monetária não realizada! Verifique as datas monetárias da BRR e a série histórica do IPCA.')
+        progresso(f'\n{len(df_datas_inv)} itens com datas nulas ou fora do período da série do IPCA:\n')
+        progresso(f'{df_datas_inv.head(10)}\n')
+        progresso('Atualização monetária não realizada! Verifique as datas monetárias da BRR e a série histórica do IPCA.\n')
+        print('_____________________________________MOVIMENTA BRR_____________________________________')
+        return False
     
     #Verifica se a atualização foi bem sucedida
     print(f'Verificando se a atualização foi bem sucedida...')
@@ -598,7 +699,7 @@ def movimenta_BRR(export, gera_pdf, open_folder, abs_path, db_monet, db_mov, ano
     divers = []
     idx_divers = []
     for col in cols_monet:
-       aux = (df_brr_monet[col_verif].apply(lambda x: round(x, 4)) != (df_brr_monet[col] / df_base_bkp[col]).apply(lambda x: round(x, 4)))
+       aux = (df_brr_monet[col_verif].round(4) != (df_brr_monet[col] / df_base_bkp[col]).round(4))
        idx_divers += df_brr_monet[aux].index.to_list()
        divers.append(aux.sum())
     #Monta o dataframe
@@ -613,17 +714,15 @@ def movimenta_BRR(export, gera_pdf, open_folder, abs_path, db_monet, db_mov, ano
     print(f"Variação média do índice monetário: {formats3(df_brr_monet['vrb'].sum() / df_brr['vrb'].sum() - 1)}")
     print('')
     print('____________________________________Atualização monetária____________________________________')
-    mensagem_text.insert(tk.END, f'\n\n{df_ver_monet}\n\n')
-    mensagem_text.insert(tk.END, f'Atualização monetária da BRR concluída com sucesso!\n')
-    mensagem_text.insert(tk.END, f"Variação média do índice monetário: {formats3(df_brr_monet['vrb'].sum() / df_brr['vrb'].sum() - 1)}\n")
-    mensagem_text.insert(tk.END, f'\n\n____________________________________Atualização monetária____________________________________\n')
+    progresso(f'\n\n{df_ver_monet}\n\n')
+    progresso(f'Atualização monetária da BRR concluída com sucesso!\n')
+    progresso(f"Variação média do índice monetário: {formats3(df_brr_monet['vrb'].sum() / df_brr['vrb'].sum() - 1)}\n")
+    progresso(f'\n\n____________________________________Atualização monetária____________________________________\n')
     
     #Movimentação da base
     print('')
     print('____________________________________Depreciação da BRR____________________________________')
-    mensagem_text.insert(tk.END, f'\n\n____________________________________Depreciação da BRR____________________________________\n')
-    #Quadro resumo
-    cols_resumo = ['data_imob', 'data_monet_atual', 'Investimento', 'BRR bruta', 'BRR liquida', 'dep_acum_reg', 'saldo_ineleg_bruto', 'saldo_ineleg_liquido']
+    progresso(f'\n\n____________________________________Depreciação da BRR____________________________________\n')
     #Calcula a depreciação acumulada e o valor regulatório líquido dos ativos
     data_ini = df_brr['data_imob'].min()
     data_fim = pd.to_datetime(db_mov, format='%d/%m/%Y')
@@ -631,77 +730,68 @@ def movimenta_BRR(export, gera_pdf, open_folder, abs_path, db_monet, db_mov, ano
     
     print('')
     print('Depreciando a BRR para as datas selecionadas...')
-    mensagem_text.insert(tk.END, f'\n\nDepreciando a BRR para as datas selecionadas...\n')
+    progresso(f'\n\nDepreciando a BRR para as datas selecionadas...\n')
     results_brr = []
-    dfs_brr = []
     df_brr_movs = df_brr_monet.copy()
-    for data in datas:
-        print(f'\t{data}')
-        mensagem_text.insert(tk.END, f'\t{data}\n')
+    df_eleg_mov = df_eleg if flag_eleg == True else None
+    #Alterações de elegibilidade ordenadas e mapeadas para as posições dos ativos uma única vez (depreciação data a data)
+    registro_eleg = deprecia_BRR.RegistroElegibilidade(df_brr_movs, df_eleg) if flag_eleg == True else None
+    #Retratos: bases das datas intermediárias gravadas em disco (não são mantidas em memória)
+    pasta_retratos = None
+    if retratos == True:
+        folder_path = '6_SAIDA_MOVIMENTA//2_RETRATOS//'
+        pasta_retratos = monta_path(abs_path, folder_path, f"{rtp}RTP_DBM-{db_monet.replace('/', '-')}")
+    if motor in ('matriz', 'eventos'):
+        for data in datas:
+            print(f'\t{data}')
+            progresso(f'\t{data}\n')
+        #Quadro resumo de todas as datas de uma só vez (ver deprecia_BRR)
+        resumo = deprecia_BRR.resumo_matriz if motor == 'matriz' else deprecia_BRR.resumo_eventos
+        results_brr = resumo(df_brr_movs, datas, df_eleg_mov)
+        #Bases das datas intermediárias: calculadas somente para os retratos
+        if pasta_retratos is not None:
+            for data in datas[:-1]:
+                db_mov = pd.to_datetime(data, format='%d/%m/%Y')
+                df_brr_db, _ = deprecia_base(df_brr_movs, db_mov, registro_eleg)
+                grava_retrato(df_brr_db, pasta_retratos, db_mov)
+                df_brr_db = None
+        #Base depreciada na data final (relatórios e exportação)
+        data = datas[-1]
         db_mov = pd.to_datetime(data, format='%d/%m/%Y')
-        #Deprecia a base
-        if flag_eleg == True:
-            df_brr_db, result_brr = calc_brr_imob2(df_brr_movs, db_mov, df_eleg)
-        else:
-            df_brr_db, result_brr = calc_brr_imob(df_brr_movs, db_mov)
-        #Registra
-        results_brr.append(result_brr)
-        dfs_brr.append(df_brr_db)
+        df_brr_db, _ = deprecia_base(df_brr_movs, db_mov, registro_eleg)
+        if pasta_retratos is not None:
+            grava_retrato(df_brr_db, pasta_retratos, db_mov)
+    else:
+        for data in datas:
+            print(f'\t{data}')
+            progresso(f'\t{data}\n')
+            db_mov = pd.to_datetime(data, format='%d/%m/%Y')
+            #Deprecia a base (a base da data anterior é descartada antes do cálculo)
+            df_brr_db = None
+            df_brr_db, result_brr = deprecia_base(df_brr_movs, db_mov, registro_eleg)
+            #Registra somente a linha do quadro resumo (e o retrato, se solicitado)
+            results_brr.append(result_brr)
+            if pasta_retratos is not None:
+                grava_retrato(df_brr_db, pasta_retratos, db_mov)
+    if pasta_retratos is not None:
+        print(f'    Retratos da base gravados em: {pasta_retratos}')
+        progresso(f'    Retratos da base gravados em: {pasta_retratos}\n')
     
-    #Monta o dataframe
-    df_resumo_brr = pd.DataFrame(results_brr)
-    df_resumo_brr.columns = cols_resumo
-    #Calcula a QRR acumulada em cada período
-    qrrs = [df_resumo_brr.loc[0, 'dep_acum_reg']]
-    for i in range(1, len(df_resumo_brr)):
-        qrr = df_resumo_brr.loc[i, 'dep_acum_reg'] - df_resumo_brr.loc[i-1, 'dep_acum_reg']
-        qrrs.append(qrr)
-    df_resumo_brr['qrr'] = qrrs
-    #Calcula a taxa média de depreciação em cada período
-    mask = df_resumo_brr['BRR bruta'] > 0
-    df_resumo_brr['tdr_media_anual'] = 0.0
-    df_resumo_brr.loc[mask, 'tdr_media_anual'] = (df_resumo_brr.loc[mask, 'qrr'] / df_resumo_brr.loc[mask, 'BRR bruta'])
+    #Monta o quadro resumo
+    df_resumo_brr = monta_resumo(results_brr)
     #Calcula os totais
     qrr_total = df_resumo_brr['qrr'].sum()
     
     #Monta fluxo de caixa de verificação
-    #Avalia os investimentos realizados no período (crescimento da BRR bruta)
-    df_fc = df_resumo_brr.copy()
-    df_fc['Investimento'] = -1 * df_resumo_brr['Investimento']
-     
-    #Repete a ultima linha e adiciona o valor residual, se houver
-    last_date = df_fc['data_imob'].tail(1).iloc[0]                                            
-    df_fc = pd.concat([df_fc, df_fc.tail(1)], axis=0, ignore_index=True)
-    #Ajusta a data do ultimo ano do fluxo
-    df_fc.loc[df_fc.index[-1], 'data_imob'] = (pd.to_datetime(last_date, dayfirst=True) + pd.DateOffset(years=1)).strftime('%d/%m/%Y') 
-    df_fc['Amortização'] = df_fc['qrr']
-    #Ajusta a amortização incluindo eventual saldo não amortizado
-    df_fc.loc[df_fc.index[-1], 'Amortização'] = df_fc.loc[df_fc.index[-1], 'BRR liquida']
-    #Ajusta o investimento no último ano (desconsidera)
-    df_fc.loc[df_fc.index[-1], 'Investimento'] = 0
-    
-    #Calcula os juros
-    tx_juros = 0.1182768 # Taxa de juros 
     n_alg = len(str(tx_juros*100).split('.')[-1])
-    juros = [0] + (df_resumo_brr['BRR liquida']*tx_juros).to_list()
-    df_fc['Juros'] = juros
-    #Inclui o saldo devedor
-    df_fc['Saldo'] = df_fc['BRR liquida']
-    #Calcula o fluxo de pagamentos
-    df_fc['Fluxo'] = df_fc['Investimento'] + df_fc['Amortização'] + df_fc['Juros']
+    df_fc = monta_fluxo(df_resumo_brr, tx_juros)
     
-    #Adiciona as informações do fluxo de caixa ao quadro resumo
-    df_resumo_brr['Saldo'] = df_fc['Saldo']
-    
-    #Ajusta o nº de períodos do fluxo de caixa
-    aux_corte = df_fc[df_fc['Fluxo'] == 0]
-    if len(aux_corte) > 0:
-        idx_corte = aux_corte.head(1).index[0]
-        df_fc = df_fc.head(idx_corte)
+    #Adiciona as informações do fluxo de caixa ao quadro resumo (saldo devedor: BRR líquida)
+    df_resumo_brr['Saldo'] = df_resumo_brr['BRR liquida']
     
     #Calcula a TIR do fluxo gerado
     fluxo_caixa = df_fc['Fluxo'].to_list()
-    df_vpl, tir = TIR(fluxo_caixa)
+    df_vpl, tir = TIR(fluxo_caixa, tx_juros)
     # Avalia o erro relativo na estimativa da TIR
     erro_tir = ((tir - tx_juros) / tx_juros)  # Diferença já em valores percentuais
     tol_tir = 0.001 / 100 # Tolerancia já em valores percentuais (1 = 1%)
@@ -720,12 +810,12 @@ def movimenta_BRR(export, gera_pdf, open_folder, abs_path, db_monet, db_mov, ano
     #Calcula o investimento total realizado no período
     tot_invest = df_resumo_brr['Investimento'].sum()
     print(f'Total de investimentos imobilizados até {data}: {formats2(tot_invest)}')
-    mensagem_text.insert(tk.END, f'\n\n{df_resumo_brr_fmt}\n\n')
-    mensagem_text.insert(tk.END, f"Base depreciada com sucesso! Valor da depreciação acumulada até {data}: {df_resumo_brr_fmt['dep_acum_reg'].tail(1).iloc[0]}\n")
-    mensagem_text.insert(tk.END, f"QRR total paga até {data}: {formats2(qrr_total)}\n")
+    progresso(f'\n\n{df_resumo_brr_fmt}\n\n')
+    progresso(f"Base depreciada com sucesso! Valor da depreciação acumulada até {data}: {df_resumo_brr_fmt['dep_acum_reg'].tail(1).iloc[0]}\n")
+    progresso(f"QRR total paga até {data}: {formats2(qrr_total)}\n")
     #Calcula o investimento total realizado no período
     tot_invest = df_resumo_brr['Investimento'].sum()
-    mensagem_text.insert(tk.END, f'Total de investimentos imobilizados até {data}: {formats2(tot_invest)}\n')
+    progresso(f'Total de investimentos imobilizados até {data}: {formats2(tot_invest)}\n')
     
     #Seleciona as colunas para compor a tabela resumo
     cols_mov = [
@@ -749,34 +839,48 @@ def movimenta_BRR(export, gera_pdf, open_folder, abs_path, db_monet, db_mov, ano
     print(f'Diferença BRR bruta-líquida em {data}: {formats2(dif_brr)}')
     print('')
     print('____________________________________Depreciação da BRR____________________________________')
-    mensagem_text.insert(tk.END, f'Diferença BRR bruta-líquida em {data}: {formats2(dif_brr)}\n\n')
-    mensagem_text.insert(tk.END, f'\n\n____________________________________Depreciação da BRR____________________________________\n')
+    progresso(f'Diferença BRR bruta-líquida em {data}: {formats2(dif_brr)}\n\n')
+    progresso(f'\n\n____________________________________Depreciação da BRR____________________________________\n')
     
     #Apresenta as informações do fluxo de caixa
     print(' ')
     print(f'Taxa de juros utilizada: {str(tx_juros*100)}%')
     print(f'TIR estimada: {round(tir*100, n_alg)}%')
-    mensagem_text.insert(tk.END, ' ')
-    mensagem_text.insert(tk.END, f'Taxa de juros utilizada: {str(tx_juros*100)}%\n')
-    mensagem_text.insert(tk.END, f'TIR estimada: {round(tir*100, n_alg)}%\n')
+    progresso(' ')
+    progresso(f'Taxa de juros utilizada: {str(tx_juros*100)}%\n')
+    progresso(f'TIR estimada: {round(tir*100, n_alg)}%\n')
     if abs(erro_tir) < tol_tir:
         print(f'Erro na estimativa da TIR: {formats3(erro_tir)}, inferior a {tol_tir*100}%')
-        mensagem_text.insert(tk.END, f'Erro na estimativa da TIR: {formats3(erro_tir)}, inferior a {tol_tir*100}%\n')
+        progresso(f'Erro na estimativa da TIR: {formats3(erro_tir)}, inferior a {tol_tir*100}%\n')
     else:
         print(f'Erro na estimativa da TIR: {formats3(erro_tir)}, superior ao limite de {tol_tir*100}%')
-        mensagem_text.insert(tk.END, f'Erro na estimativa da TIR: {formats3(erro_tir)}, superior ao limite de {tol_tir*100}%\n')
+        progresso(f'Erro na estimativa da TIR: {formats3(erro_tir)}, superior ao limite de {tol_tir*100}%\n')
+    #Sensibilidade da TIR à taxa de juros (todas as taxas de uma só vez)
+    if taxas_sensibilidade is not None and len(taxas_sensibilidade) > 0:
+        df_sens = fluxo_BRR.tabela_sensibilidade(df_resumo_brr, taxas_sensibilidade)
+        for col in ['tx_juros', 'tir', 'erro_tir']:
+            df_sens[col] = df_sens[col].apply(formats3)
+        df_sens['vpl'] = df_sens['vpl'].apply(formats2)
+        print('')
+        print('Sensibilidade da TIR à taxa de juros')
+        print(df_sens)
+        progresso(f'\nSensibilidade da TIR à taxa de juros\n{df_sens}\n')
     #_______________________________________
     
     #Apresenta os gráficos na tela
     #BRR bruta e líquida
     n_linhas = len(df_brr_mov)
-    plota_BRR(df_resumo_brr, n_linhas, rtp, db_monet, db_mov, abs_path, gera_pdf)
+    df_graficos = df_resumo_brr.copy()
+    executa_graficos(plota_BRR, df_graficos, n_linhas, rtp, db_monet, db_mov, abs_path, gera_pdf)
     #QRR
-    plota_QRR(df_resumo_brr, n_linhas, rtp, db_monet, db_mov, abs_path, gera_pdf)
+    executa_graficos(plota_QRR, df_graficos, n_linhas, rtp, db_monet, db_mov, abs_path, gera_pdf)
     #TDR
-    plota_TDR(df_resumo_brr, n_linhas, rtp, db_monet, db_mov, abs_path, gera_pdf)
+    executa_graficos(plota_TDR, df_graficos, n_linhas, rtp, db_monet, db_mov, abs_path, gera_pdf)
     
     #Apresenta uma lista dos ativos que não depreciaram 100% (conferência de valores)
+    #Agrupamento por conta contábil, serviço e taxa de depreciação (soma do valor regulatório líquido)
+    i_agrup = [df_brr_db.columns.get_loc(col) for col in ['conta_contabil', 'servico', 'taxa_deprec_anos']]
+    i_vrl = df_brr_db.columns.get_loc('vrl')
     df_nao_deprec = df_brr_db[(df_brr_db['vrl'].apply(round) != 0) & (df_brr_db['elegibilidade'] != 'Não elegível')]
     #Separa ativos não amortizáveis dos amortizáveis
     df_nao_amort = df_nao_deprec[df_nao_deprec['taxa_deprec_anos'] == 0]
@@ -784,76 +888,65 @@ def movimenta_BRR(export, gera_pdf, open_folder, abs_path, db_monet, db_mov, ano
     pd.set_option('display.max_rows', 300)
     print('')
     print(f"Ativos não amortizáveis: {len(df_nao_amort)} ({formats2(df_nao_amort['vrl'].sum())})")
-    mensagem_text.insert(tk.END, f"\n\nAtivos não amortizáveis: {len(df_nao_amort)} ({formats2(df_nao_amort['vrl'].sum())})\n")
+    progresso(f"\n\nAtivos não amortizáveis: {len(df_nao_amort)} ({formats2(df_nao_amort['vrl'].sum())})\n")
     if len(df_nao_amort) > 0:
         print('')
-        print(agrupa2(df_nao_amort, [6, 5, 12], 27, 1, 1))
+        print(agrupa2(df_nao_amort, i_agrup, i_vrl, 1, 1))
         print('')
         print('')
-        mensagem_text.insert(tk.END, f"\n{agrupa2(df_nao_amort, [6, 5, 12], 27, 1, 1)}\n\n")
+        progresso(f"\n{agrupa2(df_nao_amort, i_agrup, i_vrl, 1, 1)}\n\n")
     
     print(f"Ativos com saldo a amortizar: {len(df_amort)} ({formats2(df_amort['vrl'].sum())})")
     print('')
-    mensagem_text.insert(tk.END, f"Ativos com saldo a amortizar: {len(df_amort)} ({formats2(df_amort['vrl'].sum())})\n")
+    progresso(f"Ativos com saldo a amortizar: {len(df_amort)} ({formats2(df_amort['vrl'].sum())})\n")
     if len(df_amort) > 0:
-        print(agrupa2(df_amort, [6, 5, 12], 27, 1, 1))
-        mensagem_text.insert(tk.END, f"\n{agrupa2(df_amort, [6, 5, 12], 27, 1, 1)}\n")
+        print(agrupa2(df_amort, i_agrup, i_vrl, 1, 1))
+        progresso(f"\n{agrupa2(df_amort, i_agrup, i_vrl, 1, 1)}\n")
     
     #Exporta resultados
     #Exporta o resumo da movimentação da BRR em formato de planilha excel
-    export = True
     if export == True:
         print(f'Exportando dados em formato .xlsx...')
-        mensagem_text.insert(tk.END, f'\nExportando dados em formato .xlsx...\n')
+        progresso(f'\nExportando dados em formato .xlsx...\n')
         fname = f"RESUMO_BRR_{rtp}RTP_DBM-{db_monet.replace('/', '-')}_DBI-{db_mov.strftime('%d-%m-%Y')}_{str(n_linhas)}_itens.xlsx"
         folder_path = '6_SAIDA_MOVIMENTA//'
         path_exp = monta_path(abs_path, folder_path, fname)
-        with pd.ExcelWriter(path_exp) as writer:
-            df_resumo_brr.to_excel(writer, index=False)
+        #Formatação do arquivo de modelo (aplicada durante a exportação)
+        folder_path = '5_ENTRADA_MOVIMENTA/1_FORMATOS//'
+        template_path = monta_path(abs_path, folder_path, 'template_resumo_brr.xlsx')
+        formata_BRR.exporta_xlsx(df_resumo_brr, path_exp, formata_BRR.carrega_modelo(template_path))
         print(f'    Arquivo exportado com sucesso!')
         print(f'    {path_exp}')
-        mensagem_text.insert(tk.END, f'    Arquivo exportado com sucesso!\n')
-        mensagem_text.insert(tk.END, f'    {path_exp}\n')
-        #Replica a formatação do template
-        print('Replicando a formatação do arquivo de modelo...')
-        mensagem_text.insert(tk.END, "Replicando a formatação do arquivo de modelo...\n")
-        mensagem_text.see('end')
-        mensagem_text.update()
-        folder_path = '5_ENTRADA_MOVIMENTA/1_FORMATOS//'
-        fname = 'Template_resumo_brr.xlsx'
-        template_path = monta_path(abs_path, folder_path, fname)
-        copia_format(template_path, path_exp, path_exp)
-        print('    Formatação replicada com sucesso!')
-        mensagem_text.insert(tk.END, "    Formatação replicada com sucesso!\n")
-        mensagem_text.see('end')
-        mensagem_text.update()
+        progresso(f'    Arquivo exportado com sucesso!\n')
+        progresso(f'    {path_exp}\n')
         
         #Exporta a BRR final em formato de planilha excel
         n_linhas = len(df_brr_mov)
         print(f'Exportando dados em formato .xlsx...')
-        mensagem_text.insert(tk.END, f'Exportando dados em formato .xlsx...\n')
+        progresso(f'Exportando dados em formato .xlsx...\n')
         fname = f"BRR_{rtp}RTP_DBM-{db_monet.replace('/', '-')}_DBI-{db_mov.strftime('%d-%m-%Y')}_{str(n_linhas)}_itens.xlsx"
         folder_path = '6_SAIDA_MOVIMENTA//'
         folder_exp = folder_path.split('/')[0]
         path_exp = monta_path(abs_path, folder_path, fname)
-        with pd.ExcelWriter(path_exp) as writer:
-            df_brr_mov.to_excel(writer, index=False)
+        formata_BRR.exporta_xlsx(df_brr_mov, path_exp)
         print(f'    Arquivo exportado com sucesso!')
         print(f'    {path_exp}')
-        mensagem_text.insert(tk.END, f'    Arquivo exportado com sucesso!\n')
-        mensagem_text.insert(tk.END, f'    {path_exp}\n')
+        progresso(f'    Arquivo exportado com sucesso!\n')
+        progresso(f'    {path_exp}\n')
         
         #Abre a pasta com os arquivos gerados
         if open_folder == True:
             res = subprocess.Popen(fr'explorer "{folder_exp}"')
     #_______________________________________
     print('_____________________________________MOVIMENTA BRR_____________________________________')
-    return
+    return True
 #______________________________________________________________________________________
 
 #______________________________________________________________________________________
 #Funções GUI
 def buscar_arquivo(entry_arquivo, path_var):
+    import tkinter as tk
+    from tkinter import filedialog
     abs_path = os.path.dirname(__file__)
     folder_path = '5_ENTRADA_MOVIMENTA'
     dir_ini = os.path.join(abs_path, folder_path)
@@ -863,7 +956,8 @@ def buscar_arquivo(entry_arquivo, path_var):
     entry_arquivo.xview_moveto(1)
     path_var.set(arquivo)
 
-def movimentar_brr(db_monet_var, db_mov_var, anos_sim_var, path_ref_var, path_eleg_var, path_ipca_var, mensagem_text):
+def movimentar_brr(db_monet_var, db_mov_var, anos_sim_var, path_ref_var, path_eleg_var, path_ipca_var, painel):
+    import segundo_plano_BRR
     #Captura o conteúdo dos elementos de texto
     db_monet = db_monet_var.get()
     db_mov = db_mov_var.get()
@@ -878,14 +972,15 @@ def movimentar_brr(db_monet_var, db_mov_var, anos_sim_var, path_ref_var, path_el
     gera_pdf = True
     open_folder = True
     anos_sim = anos_sim_var
-    movimenta_BRR(export, gera_pdf, open_folder, abs_path, db_monet, db_mov, anos_sim, path_ref, path_eleg, path_ipca, mensagem_text)
+    #Executa em segundo plano (os gráficos são gerados na thread da interface)
+    args = (export, gera_pdf, open_folder, abs_path, db_monet, db_mov, anos_sim, path_ref, path_eleg, path_ipca)
+    kwargs = {'executa_graficos': segundo_plano_BRR.graficos_na_interface(painel)}
+    segundo_plano_BRR.executa(painel, 'Movimenta BRR', movimenta_BRR, args, kwargs, mensagem_sucesso='Base de dados movimentada com sucesso!')
     #______________________________________EXECUÇÃO________________________________________
-    #Feedback na caixa de mensagens
-    mensagem_text.config(state=tk.NORMAL)
-    mensagem_text.insert(tk.END, "Base de dados movimentada com sucesso!\n")
-    mensagem_text.config(state=tk.DISABLED)
 
 def make_frame(frame):
+    import tkinter as tk
+    import segundo_plano_BRR
     #Captura o conteudo das caixas de texto com o caminho dos arquivos selecionados
     path_ref_var = tk.StringVar()
     path_eleg_var = tk.StringVar()
@@ -937,7 +1032,7 @@ def make_frame(frame):
     entry_data_mov.grid(row=4, column=1, padx=10, sticky="w")
     
     # Botão Movimentar BRR
-    btn_converter_base_dados = tk.Button(frame, text="Movimentar BRR", bg="navy", fg="white", width=20, height=2, command=lambda: movimentar_brr(entry_data_monetaria, entry_data_mov, anos_sim_var, path_ref_var, path_eleg_var, path_ipca_var, mensagem_text))
+    btn_converter_base_dados = tk.Button(frame, text="Movimentar BRR", bg="navy", fg="white", width=20, height=2, command=lambda: movimentar_brr(entry_data_monetaria, entry_data_mov, anos_sim_var, path_ref_var, path_eleg_var, path_ipca_var, painel))
     btn_converter_base_dados.grid(row=5, column=0, columnspan=3, pady=10)  
 
     # Display
@@ -952,7 +1047,11 @@ def make_frame(frame):
     scrollbar.grid(row=7, column=3, rowspan=3, sticky='nse')
     mensagem_text['yscrollcommand'] = scrollbar.set
 
+    # Progresso da execução
+    painel = segundo_plano_BRR.painel_execucao(frame, mensagem_text, btn_converter_base_dados, 6, 38)
+
 def init_frame():
+    import tkinter as tk
     root = tk.Tk()
     root.title("Movimenta BRR")
 
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:48:20 2026
+
+@author: cecil.skaleski, est.angelo
+
+Destinos das mensagens de progresso e decisões de continuidade das etapas converte, consolida e movimenta (independentes da interface gráfica).
+"""
+
+#______________________________________________________________________________________
+#Destinos das mensagens de progresso
+#Um destino é qualquer função que recebe o texto da mensagem (ex.: print, list.append, queue.put)
+def sem_progresso(texto):
+    #Descarta as mensagens (o log das etapas continua sendo impresso no console)
+    return
+
+def destino_progresso(progresso):
+    #Retorna o destino informado ou o destino nulo
+    if progresso is None:
+        return sem_progresso
+    return progresso
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Execução de tarefas
+def executa_local(funcao, *args):
+    #Executa a função imediatamente, na própria thread (ex.: gráficos na execução sem thread de trabalho)
+    return funcao(*args)
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Decisões de continuidade
+def decide_continuar(continuar, pergunta):
+    #Decide se a execução continua após a detecção de inconsistências
+    #continuar: True/False (decisão informada previamente, execução desassistida), None (pergunta no console)
+    #ou função que recebe a pergunta e retorna True/False (ex.: caixa de diálogo da interface)
+    #Retorna 'S' ou 'N'
+    if continuar is None:
+        return (input(f'{pergunta} (S ou N) ')).upper().strip()
+    if callable(continuar):
+        continuar = continuar(pergunta)
+    if continuar:
+        return 'S'
+    return 'N'
+#______________________________________________________________________________________
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:47 2026
+
+@author: cecil.skaleski, est.angelo
+
+Tabela resumo da BRR por conta contábil (comum às etapas converte, consolida e movimenta).
+"""
+
+import pandas as pd
+
+#______________________________________________________________________________________
+#Funções de processamento de dados
+def tabela_resumo(df, col_qtde, col_custo, col_conta, col_mun):
+    #Calcula a tabela resumo por conta contábil em uma única agregação agrupada (linhas, qtde, nº de municípios e custo)
+    #Retorna a tabela ordenada por maior custo, com o impacto percentual e cumulativo e a linha de totais (índice 'TOTAL')
+    gb = df.groupby(col_conta, sort=False, dropna=False, observed=True)
+    df_resumo = gb.agg(**{
+        'Linhas': (col_custo, 'size'),
+        'Qtde de bens': (col_qtde, 'sum'),
+        'Custo contábil': (col_custo, 'sum'),
+        })
+    #Municípios distintos por conta: pares (conta, município) sem repetição
+    df_resumo['N municípios'] = df[[col_conta, col_mun]].drop_duplicates().groupby(col_conta, sort=False, dropna=False, observed=True).size()
+    df_resumo = df_resumo.rename_axis('Conta contábil').reset_index()
+    df_resumo = df_resumo[['Conta contábil', 'Linhas', 'Qtde de bens', 'N municípios', 'Custo contábil']]
+    #Ordena por maior custo, linhas, qtde e municipios
+    df_resumo = df_resumo.sort_values(['Custo contábil', 'Linhas', 'Qtde de bens', 'N municípios'], ascending=[False, False, False, False]).reset_index(drop=True)
+    #Calcula o impacto percentual e cumulativo
+    df_resumo['%'] = df_resumo['Custo contábil'] / df_resumo['Custo contábil'].sum()
+    df_resumo['% acum'] = df_resumo['%'].cumsum()
+    #Adiciona os totais
+    df_total = pd.DataFrame({
+        'Conta contábil': ['TOTAL'],
+        'Linhas': [df_resumo['Linhas'].sum()],
+        'Qtde de bens': [df_resumo['Qtde de bens'].sum()],
+        'N municípios': [len(df[col_mun].unique())],
+        'Custo contábil': [df_resumo['Custo contábil'].sum()],
+        '%': [df_resumo['%'].sum()],
+        '% acum': [1.0],
+        }, index=['TOTAL'])
+    df_resumo = pd.concat([df_resumo, df_total], axis=0)
+    #Quantidades em valores unitários
+    df_resumo['Qtde de bens'] = df_resumo['Qtde de bens'].astype('int64')
+    return df_resumo
+#______________________________________________________________________________________
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:41:09 2026
+
+@author: cecil.skaleski, est.angelo
+
+Execução das etapas converte, consolida e movimenta em segundo plano (thread de trabalho), mantendo a interface gráfica responsiva.
+
+As mensagens de progresso são enviadas para uma fila, esvaziada periodicamente pela interface (after) em lotes.
+Tarefas que precisam da interface (gráficos, perguntas ao usuário) são enviadas pela mesma fila e executadas na thread principal.
+"""
+
+import time
+import queue
+import threading
+import traceback
+
+import tkinter as tk
+from tkinter import ttk
+from tkinter import messagebox
+
+#Intervalo de leitura da fila de mensagens [ms]
+INTERVALO_FILA = 100
+
+#______________________________________________________________________________________
+#Funções acessórias
+def formata_tempo(segundos):
+    #Formata o tempo decorrido (mm:ss ou hh:mm:ss)
+    minutos, segundos = divmod(int(segundos), 60)
+    horas, minutos = divmod(minutos, 60)
+    if horas > 0:
+        return f'{horas:d}:{minutos:02d}:{segundos:02d}'
+    return f'{minutos:02d}:{segundos:02d}'
+
+def escreve_mensagens(mensagem_text, texto):
+    #Insere o lote de mensagens na caixa de mensagens (uma única atualização da tela por lote)
+    mensagem_text.config(state=tk.NORMAL)
+    mensagem_text.insert(tk.END, texto)
+    mensagem_text.see('end')
+    mensagem_text.config(state=tk.DISABLED)
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Elementos da interface
+def painel_execucao(frame, mensagem_text, botao, linha, pady):
+    #Cria a barra de progresso e o rótulo do tempo decorrido na linha indicada do frame
+    barra = ttk.Progressbar(frame, mode='indeterminate', length=300)
+    barra.grid(row=linha, column=1, pady=(pady, 0), padx=10, sticky='e')
+    rotulo_tempo = tk.Label(frame, text='', fg='blue')
+    rotulo_tempo.grid(row=linha, column=2, pady=(pady, 0), sticky='w')
+    painel = {
+        'frame': frame,
+        'mensagem_text': mensagem_text,
+        'botao': botao,
+        'barra': barra,
+        'tempo': rotulo_tempo,
+        'fila': None,
+        }
+    return painel
+
+def graficos_na_interface(painel):
+    #Retorna a função que agenda a execução da função de gráfico funcao(*args) na thread da interface (sem aguardar o resultado)
+    #Os gráficos do matplotlib não podem ser criados fora da thread principal
+    #O modo interativo evita que plt.show() bloqueie a leitura da fila enquanto as janelas dos gráficos estiverem abertas
+    def agenda(funcao, *args):
+        def tarefa():
+            import matplotlib.pyplot as plt
+            with plt.ion():
+                funcao(*args)
+        painel['fila'].put(tarefa)
+    return agenda
+
+def pergunta_na_interface(painel):
+    #Retorna a função de decisão (ver progresso_BRR.decide_continuar) que pergunta ao usuário em uma caixa de diálogo
+    #A thread de trabalho aguarda a resposta do usuário
+    def pergunta(texto):
+        resposta = {}
+        respondida = threading.Event()
+        def mostra():
+            try:
+                resposta['valor'] = messagebox.askyesno('Continuar?', texto, parent=painel['frame'])
+            finally:
+                respondida.set()
+        painel['fila'].put(mostra)
+        respondida.wait()
+        return resposta.get('valor', False)
+    return pergunta
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Execução
+def executa(painel, etapa, funcao, args, kwargs=None, mensagem_sucesso=None):
+    #Executa funcao(*args, progresso=..., **kwargs) em uma thread de trabalho
+    #mensagem_sucesso: mensagem apresentada ao final da etapa, se concluída (funcao retorna True)
+    if painel['fila'] is not None:
+        #Etapa já em execução
+        return
+    kwargs = {} if kwargs is None else kwargs
+    fila = queue.Queue()
+    painel['fila'] = fila
+    inicio = time.perf_counter()
+
+    def trabalho():
+        try:
+            resultado = funcao(*args, progresso=fila.put, **kwargs)
+            fila.put(('fim', resultado, None))
+        except Exception as erro:
+            traceback.print_exc()
+            fila.put(('fim', None, erro))
+
+    def drena_fila():
+        #Esvazia a fila em lote: as mensagens acumuladas são inseridas de uma só vez
+        textos = []
+        fim = None
+        while fim is None:
+            try:
+                item = fila.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, str):
+                textos.append(item)
+            elif callable(item):
+                #Tarefa da interface: mantém a ordem em relação às mensagens
+                if textos:
+                    escreve_mensagens(painel['mensagem_text'], ''.join(textos))
+                    textos = []
+                item()
+            else:
+                fim = item
+        if textos:
+            escreve_mensagens(painel['mensagem_text'], ''.join(textos))
+        decorrido = formata_tempo(time.perf_counter() - inicio)
+        if fim is None:
+            painel['tempo'].config(text=f'{etapa}: {decorrido}')
+            painel['frame'].after(INTERVALO_FILA, drena_fila)
+            return
+        #Final da etapa
+        _, resultado, erro = fim
+        painel['barra'].stop()
+        painel['botao'].config(state=tk.NORMAL)
+        painel['fila'] = None
+        if erro is not None:
+            painel['tempo'].config(text=f'{etapa}: erro ({decorrido})')
+            escreve_mensagens(painel['mensagem_text'], f'\nErro na execução ({etapa}): {erro}\n')
+            return
+        painel['tempo'].config(text=f'{etapa}: {decorrido}')
+        escreve_mensagens(painel['mensagem_text'], f'Tempo de execução ({etapa}): {decorrido}\n')
+        if resultado and mensagem_sucesso is not None:
+            escreve_mensagens(painel['mensagem_text'], f'{mensagem_sucesso}\n')
+
+    painel['botao'].config(state=tk.DISABLED)
+    painel['barra'].start(INTERVALO_FILA)
+    painel['tempo'].config(text=f'{etapa}: 00:00')
+    threading.Thread(target=trabalho, daemon=True).start()
+    painel['frame'].after(INTERVALO_FILA, drena_fila)
+    return
+#______________________________________________________________________________________
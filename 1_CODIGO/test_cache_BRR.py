@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:37:05 2026
+
+@author: cecil.skaleski, est.angelo
+
+Leitura em fluxo das colunas selecionadas (cache_BRR.le_excel_colunas), comparada com o pd.read_excel seguido da remoção das
+colunas e linhas totalmente vazias e da seleção das colunas, em planilhas sintéticas com casos limite.
+
+Execução (a partir da pasta 1_CODIGO): python -m pytest -q test_cache_BRR.py
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import openpyxl
+import pytest
+
+import cache_BRR
+
+ABA = 'BRR Incremental'
+
+#______________________________________________________________________________________
+#Planilhas sintéticas e leitura de referência
+def grava_planilha(path, linhas):
+    #Grava a aba com as linhas indicadas (a 1ª é o cabeçalho)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = ABA
+    for linha in linhas:
+        ws.append(linha)
+    wb.save(path)
+    return str(path)
+
+def referencia(path, colunas):
+    #Leitura da aba inteira, remoção das colunas e linhas vazias e seleção das colunas
+    df = cache_BRR.limpa_vazios(pd.read_excel(path, sheet_name=ABA))
+    return df[[col for col in df.columns if col in colunas]]
+
+def linhas_casos_limite():
+    #Tipos misturados, datas, textos de valor ausente, células de erro, linhas vazias e com valor apenas nas colunas não lidas
+    return [
+        ['A', 'B', 'C', 'D', 'E', 'A'],
+        [1, 'x', 2.5, datetime.datetime(2020, 1, 1), 'z', 9],
+        [None, None, None, None, 'so_E', None],
+        [],
+        [3.0, ' y ', None, datetime.datetime(2021, 5, 3), None, None],
+        [None, 'NA', 7, None, None],
+        [4, None, '#N/A', None],
+        [None, None, None, None, 'NA'],
+        [None, None, '#DIV/0!'],
+        [None, 'NA', None, None, 'k'],
+        [None, None, None, None, None, None, 'fora do cabeçalho'],
+        ['5', 6.0, 7, None],
+        ]
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Testes
+@pytest.mark.parametrize('colunas', [['A', 'B', 'C', 'D'], ['B', 'Z'], ['E'], ['A', 'B', 'C', 'D', 'E'], ['D']])
+def test_colunas_casos_limite(tmp_path, colunas):
+    #Nomes repetidos no cabeçalho: somente a 1ª ocorrência é lida
+    path = grava_planilha(tmp_path / 'casos.xlsx', linhas_casos_limite())
+    pd.testing.assert_frame_equal(cache_BRR.le_excel_colunas(path, ABA, colunas), referencia(path, colunas))
+
+@pytest.mark.parametrize('nulo', sorted(cache_BRR.VALORES_NULOS - {''}))
+def test_textos_valor_ausente(tmp_path, nulo):
+    #Linha com valor ausente apenas nas colunas não lidas: removida, como no pd.read_excel
+    path = grava_planilha(tmp_path / 'nulos.xlsx', [['A', 'B'], [1, 'x'], [None, nulo], [2, 'y']])
+    pd.testing.assert_frame_equal(cache_BRR.le_excel_colunas(path, ABA, ['A']), referencia(path, ['A']))
+
+def test_base_aleatoria(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        'iu': [f'iu-{i}' for i in range(n)],
+        'valor': rng.uniform(0, 1e6, n).round(2),
+        'qtd': rng.integers(0, 100, n),
+        'data': pd.to_datetime('2000-01-01') + pd.to_timedelta(rng.integers(0, 9000, n), 'D'),
+        'texto': rng.choice(['a', 'b', None], n),
+        'extra': rng.choice([1.5, None], n),
+        })
+    df.loc[rng.choice(n, 50, replace=False), ['iu', 'valor', 'qtd', 'data']] = None
+    path = str(tmp_path / 'base.xlsx')
+    df.to_excel(path, sheet_name=ABA, index=False)
+    colunas = ['iu', 'valor', 'qtd', 'data']
+    pd.testing.assert_frame_equal(cache_BRR.le_excel_colunas(path, ABA, colunas), referencia(path, colunas))
+
+def test_le_excel_colunas_cache(tmp_path):
+    #Leitura pelo cache (1ª leitura e leitura da entrada gravada) igual à leitura direta
+    path = grava_planilha(tmp_path / 'casos.xlsx', linhas_casos_limite())
+    pasta_cache = str(tmp_path / 'cache')
+    colunas = ['A', 'C', 'D']
+    esperado = referencia(path, colunas)
+    for _ in range(2):
+        pd.testing.assert_frame_equal(cache_BRR.le_excel(path, pasta_cache=pasta_cache, colunas=colunas, sheet_name=ABA), esperado)
+
+def test_aba_sem_dados(tmp_path):
+    path = grava_planilha(tmp_path / 'cabecalho.xlsx', [['A', 'B']])
+    assert cache_BRR.le_excel_colunas(path, ABA, ['A']).empty
+    path = grava_planilha(tmp_path / 'vazia.xlsx', [])
+    assert cache_BRR.le_excel_colunas(path, ABA, ['A']).empty
+#______________________________________________________________________________________
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:58:26 2026
+
+@author: cecil.skaleski, est.angelo
+
+Limpeza de espaços (converte_BRR_v7.remove_espacos) e ano de imobilização (ano_imobilizacao) comparados com a aplicação
+célula a célula (referência), em colunas de baixa e alta cardinalidade e de tipos misturados.
+
+Execução (a partir da pasta 1_CODIGO): python -m pytest -q test_converte_BRR.py
+Desempenho: python benchmark_converte_BRR.py
+"""
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_string_dtype
+import pytest
+
+import converte_BRR_v7
+
+#______________________________________________________________________________________
+#Referências (célula a célula)
+def aplica_strip(x):
+    #Aplica a função strip
+    if isinstance(x, str):
+        x = x.strip()
+    return x
+
+def remove_espacos_referencia(database):
+    #strip aplicado a cada célula das colunas de texto (inclusive as de tipos misturados)
+    aux = database.copy()
+    for i in range(aux.shape[1]):
+        coluna = aux.iloc[:, i]
+        if is_string_dtype(coluna.dtype):
+            aux.isetitem(i, coluna.apply(aplica_strip).astype(coluna.dtype))
+    return aux
+
+def ano_imobilizacao_referencia(datas):
+    return datas.apply(lambda x: str(x.year))
+
+def monta_base(n, semente=0):
+    #Colunas de texto de baixa cardinalidade, de tipos misturados e de valores distintos; numérica e datas
+    rng = np.random.default_rng(semente)
+    textos = np.array([' a ', 'bb', ' cc', 'dd  ', 'e'], dtype=object)[rng.integers(0, 5, n)]
+    mista = textos.copy()
+    mista[::3] = 7
+    mista[::5] = np.nan
+    mista[::11] = pd.Timestamp('2020-01-01')
+    distintos = np.array([f' iu-{i} ' if i % 2 else f'iu-{i}' for i in rng.permutation(n)], dtype=object)
+    distintos[::13] = None
+    datas = pd.Series(pd.to_datetime('2000-01-01') + pd.to_timedelta(rng.integers(0, 9000, n), 'D'))
+    datas[::97] = pd.NaT
+    return pd.DataFrame({'texto': textos, 'mista': mista, 'distintos': distintos, 'valor': rng.random(n)}), datas
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Testes
+@pytest.mark.parametrize('n', [0, 1, 50, 5000])
+def test_remove_espacos(n):
+    df, _ = monta_base(n)
+    pd.testing.assert_frame_equal(converte_BRR_v7.remove_espacos(df), remove_espacos_referencia(df))
+
+def test_remove_espacos_caminhos():
+    #As colunas de baixa cardinalidade são fatoradas e as de valores distintos são limpas valor a valor
+    df, _ = monta_base(5000)
+    assert converte_BRR_v7.distintos(df['texto']) <= converte_BRR_v7.LIMITE_DISTINTOS
+    assert converte_BRR_v7.distintos(df['mista']) <= converte_BRR_v7.LIMITE_DISTINTOS
+    assert converte_BRR_v7.distintos(df['distintos']) > converte_BRR_v7.LIMITE_DISTINTOS
+
+def test_remove_espacos_nomes_repetidos_e_string():
+    df = pd.DataFrame([[' a', 1, 'b '], ['c ', 2, None]], columns=['x', 'n', 'x'])
+    df['s'] = pd.Series([' s1 ', None], dtype='string')
+    res = converte_BRR_v7.remove_espacos(df)
+    pd.testing.assert_frame_equal(res, remove_espacos_referencia(df))
+    assert res.iloc[:, 0].tolist() == ['a', 'c'] and res.iloc[:, 2].tolist() == ['b', None]
+    #Base original inalterada
+    assert df.iloc[0, 0] == ' a'
+
+def test_ano_imobilizacao():
+    _, datas = monta_base(5000)
+    pd.testing.assert_series_equal(converte_BRR_v7.ano_imobilizacao(datas), ano_imobilizacao_referencia(datas))
+#______________________________________________________________________________________
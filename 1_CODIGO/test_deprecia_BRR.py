@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:40 2026
+
+@author: cecil.skaleski, est.angelo
+
+Equivalência dos motores de depreciação (deprecia_BRR.resumo_matriz e resumo_eventos) com o cálculo data a data
+(movimenta_BRR_v8.calc_brr_imob e calc_brr_imob2), em bases sintéticas.
+
+Execução (a partir da pasta 1_CODIGO): python -m pytest -q test_deprecia_BRR.py
+"""
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+import pytest
+
+import deprecia_BRR
+import movimenta_BRR_v8
+
+MOTORES = [deprecia_BRR.resumo_matriz, deprecia_BRR.resumo_eventos]
+#Tolerância relativa dos totais não nulos
+TOLERANCIA = 1e-12
+
+#______________________________________________________________________________________
+#Bases sintéticas
+def monta_base(semente, n=300, dias=3000, taxas=(5.0, 10.0, 20.0, 25.0)):
+    #Base com datas de imobilização a partir de 1980 (dias: intervalo das datas), taxas e valores aleatórios
+    rng = np.random.default_rng(semente)
+    return pd.DataFrame({
+        'iu': [f'iu-{i}' for i in range(n)],
+        'data_imob': pd.to_datetime('1980-01-01') + pd.to_timedelta(rng.integers(0, dias, n), 'D'),
+        'taxa_deprec_anos': rng.choice(taxas, n),
+        'vrb': rng.uniform(1e3, 1e7, n),
+        'elegibilidade': 'ELEGIVEL',
+        'data_monet_atual': pd.Timestamp('2023-12-31'),
+        })
+
+def monta_eleg(df_base, semente, n=60):
+    #Alterações para não elegível (uma por ativo) com datas aleatórias
+    rng = np.random.default_rng(semente)
+    return pd.DataFrame({
+        'iu': df_base['iu'].sample(n, random_state=semente).to_numpy(),
+        'elegibilidade': deprecia_BRR.NAO_ELEGIVEL,
+        'data': pd.to_datetime('1981-01-01') + pd.to_timedelta(rng.integers(0, 12000, n), 'D'),
+        })
+
+def referencia(df_base, datas, df_eleg):
+    #Quadro resumo calculado data a data
+    if df_eleg is None:
+        return [movimenta_BRR_v8.calc_brr_imob(df_base, data)[1] for data in datas]
+    return [movimenta_BRR_v8.calc_brr_imob2(df_base, data, df_eleg)[1] for data in datas]
+
+def compara(df_base, df_eleg=None, db_mov='2023-12-31'):
+    #Compara os motores com o cálculo data a data: totais nulos exatamente nulos, demais com erro relativo inferior à tolerância
+    datas = movimenta_BRR_v8.calc_periodos(df_base['data_imob'].min(), pd.Timestamp(db_mov))
+    ref = referencia(df_base, datas, df_eleg)
+    valores_ref = np.array([linha[2:] for linha in ref], dtype=np.float64)
+    for motor in MOTORES:
+        res = motor(df_base, datas, df_eleg)
+        assert [linha[:2] for linha in res] == [linha[:2] for linha in ref]
+        valores = np.array([linha[2:] for linha in res], dtype=np.float64)
+        nulos = valores_ref == 0
+        assert (valores[nulos] == 0).all(), motor.__name__
+        escala = np.abs(valores_ref).max(axis=0)
+        assert (np.abs(valores - valores_ref) <= TOLERANCIA * escala[None, :]).all(), motor.__name__
+        #Quadro resumo e fluxo de caixa de verificação derivados (testes de valores nulos)
+        df_ref = movimenta_BRR_v8.monta_resumo(ref)
+        df_res = movimenta_BRR_v8.monta_resumo(res)
+        np.testing.assert_allclose(df_res['tdr_media_anual'], df_ref['tdr_media_anual'], rtol=1e-9, atol=1e-12)
+        assert len(movimenta_BRR_v8.monta_fluxo(df_res, movimenta_BRR_v8.TX_JUROS)) == len(movimenta_BRR_v8.monta_fluxo(df_ref, movimenta_BRR_v8.TX_JUROS))
+    return valores_ref
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Testes
+@pytest.mark.parametrize('semente', range(5))
+def test_sem_elegibilidade(semente):
+    compara(monta_base(semente))
+
+@pytest.mark.parametrize('semente', range(5))
+def test_com_elegibilidade(semente):
+    df_base = monta_base(semente)
+    compara(df_base, monta_eleg(df_base, semente))
+
+@pytest.mark.parametrize('semente', range(5))
+def test_base_totalmente_depreciada(semente):
+    #Imobilizações concentradas no início e vida útil curta: BRR bruta e líquida nulas e anos sem investimento
+    df_base = monta_base(semente, dias=400, taxas=(10.0, 20.0, 25.0))
+    valores_ref = compara(df_base)
+    assert (valores_ref[-10:, 1:3] == 0).all()
+    assert (valores_ref[5:, 0] == 0).all()
+    compara(df_base, monta_eleg(df_base, semente))
+
+def test_casos_especiais():
+    #Ativos não elegíveis na base, taxa nula, valor nulo, data de movimentação no meio do ano
+    df_base = monta_base(7)
+    df_base.loc[df_base.index[:20], 'elegibilidade'] = deprecia_BRR.NAO_ELEGIVEL
+    df_base.loc[df_base.index[20:30], 'taxa_deprec_anos'] = 0.0
+    df_base.loc[df_base.index[30:35], 'vrb'] = 0.0
+    compara(df_base, monta_eleg(df_base, 7), db_mov='2015-06-30')
+#______________________________________________________________________________________
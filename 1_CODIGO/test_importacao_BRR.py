@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:41:17 2026
+
+@author: cecil.skaleski, est.angelo
+
+Importação das etapas sem a interface gráfica: os módulos das etapas e a linha de comando (movbrr) não dependem do tkinter.
+
+Execução (a partir da pasta 1_CODIGO): python -m pytest -q test_importacao_BRR.py
+"""
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+#Módulos executados sem Tk (linha de comando, cenários em paralelo, testes)
+MODULOS = ['movbrr', 'converte_BRR_v7', 'consolida_BRR_v5', 'movimenta_BRR_v8', 'cenarios_BRR']
+
+#Bloqueia a importação do tkinter (ambiente sem Tk) antes de executar o código
+BLOQUEIO_TK = '''
+import sys
+class BloqueiaTk:
+    def find_spec(self, nome, path=None, target=None):
+        if nome == 'tkinter' or nome.startswith('tkinter.') or nome == '_tkinter':
+            raise ImportError('tkinter indisponível')
+        return None
+sys.meta_path.insert(0, BloqueiaTk())
+import matplotlib
+matplotlib.use('Agg')
+'''
+
+def executa_sem_tk(codigo):
+    #Executa o código em outro processo (módulos ainda não importados), com o tkinter bloqueado
+    return subprocess.run([sys.executable, '-c', BLOQUEIO_TK + codigo], cwd=PASTA, capture_output=True, text=True)
+
+#______________________________________________________________________________________
+#Testes
+def test_bloqueio_tk():
+    res = executa_sem_tk('import tkinter')
+    assert res.returncode != 0 and 'tkinter indisponível' in res.stderr
+
+@pytest.mark.parametrize('modulo', MODULOS)
+def test_importa_sem_tk(modulo):
+    res = executa_sem_tk(f'import {modulo}\nassert "tkinter" not in sys.modules')
+    assert res.returncode == 0, res.stderr
+
+def test_linha_comando_sem_tk():
+    res = executa_sem_tk('import movbrr\nmovbrr.main(["--help"])')
+    assert 'usage' in res.stdout, res.stderr
+#______________________________________________________________________________________
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:05:52 2026
+
+@author: cecil.skaleski, est.angelo
+
+Tabela diária do IPCA pro-rata (movimenta_BRR_v8.ipca_rata) e consulta das datas (posicao_datas e var_indice), comparadas com a
+construção anterior (interpolação linear por par de meses consecutivos), em uma série mensal sintética.
+
+Execução (a partir da pasta 1_CODIGO): python -m pytest -q test_movimenta_BRR.py
+"""
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+import pytest
+
+import movimenta_BRR_v8
+
+#______________________________________________________________________________________
+#Série sintética e construção de referência
+def monta_serie():
+    #Série mensal (último dia de cada mês, como importa_ipca) com um mês de índice inalterado (mar/2020 = fev/2020)
+    datas = pd.date_range('2019-10-31', '2020-09-30', freq='ME')
+    indices = [5000.0, 5010.5, 5030.2, 5041.0, 5048.7, 5048.7, 5060.1, 5055.3, 5071.9, 5090.0, 5095.4, 5110.8]
+    return pd.DataFrame({'Data_ts': datas, 'Índice': indices})
+
+def ipca_rata_referencia(df_ipca, remove_repetidos=False):
+    #Construção anterior: datas de cada par de meses consecutivos com np.linspace entre os índices e concatenação dos pares
+    #A data final de um par é a inicial do par seguinte (mesmo índice): prevalece a primeira ocorrência
+    #remove_repetidos: remoção anterior por valor do índice (descartava os dias de meses com índice inalterado)
+    partes = []
+    for i in range(len(df_ipca) - 1):
+        datas = pd.date_range(df_ipca.loc[i, 'Data_ts'], df_ipca.loc[i + 1, 'Data_ts'], freq='D')
+        partes.append(pd.DataFrame({'Índice': np.linspace(df_ipca.loc[i, 'Índice'], df_ipca.loc[i + 1, 'Índice'], len(datas))}, index=datas))
+    df = pd.concat(partes)
+    if remove_repetidos:
+        return df.drop_duplicates(keep='first')
+    return df[~df.index.duplicated(keep='first')]
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Testes
+def test_ipca_rata_referencia():
+    df_ipca = monta_serie()
+    df_rata = movimenta_BRR_v8.ipca_rata(df_ipca)
+    ref = ipca_rata_referencia(df_ipca)
+    assert df_rata.index.equals(ref.index)
+    np.testing.assert_allclose(df_rata['Índice'].to_numpy(), ref['Índice'].to_numpy(), rtol=1e-14)
+    #Índices mensais reproduzidos exatamente nas datas da série
+    assert (df_rata.loc[df_ipca['Data_ts'], 'Índice'].to_numpy() == df_ipca['Índice'].to_numpy()).all()
+
+def test_ipca_rata_indice_diario_continuo():
+    df_ipca = monta_serie()
+    df_rata = movimenta_BRR_v8.ipca_rata(df_ipca)
+    assert df_rata.index.freq == 'D'
+    assert df_rata.index.is_monotonic_increasing and df_rata.index.is_unique
+    assert (np.diff(df_rata.index.to_numpy()) == np.timedelta64(1, 'D')).all()
+    assert df_rata.index[0] == df_ipca['Data_ts'].iloc[0] and df_rata.index[-1] == df_ipca['Data_ts'].iloc[-1]
+    assert len(df_rata) == (df_ipca['Data_ts'].iloc[-1] - df_ipca['Data_ts'].iloc[0]).days + 1
+
+def test_ipca_rata_mes_inalterado():
+    #Os dias do mês de índice inalterado (descartados pela remoção anterior por valor) estão presentes com o índice constante
+    df_ipca = monta_serie()
+    df_rata = movimenta_BRR_v8.ipca_rata(df_ipca)
+    antiga = ipca_rata_referencia(df_ipca, remove_repetidos=True)
+    ausentes = df_rata.index.difference(antiga.index)
+    assert ausentes.equals(pd.date_range('2020-03-01', '2020-03-31', freq='D'))
+    assert (df_rata.loc['2020-02-29':'2020-03-31', 'Índice'] == 5048.7).all()
+    #Demais dias: mesmos valores da construção anterior
+    np.testing.assert_allclose(df_rata.loc[antiga.index, 'Índice'].to_numpy(), antiga['Índice'].to_numpy(), rtol=1e-14)
+
+def test_posicao_datas():
+    df_rata = movimenta_BRR_v8.ipca_rata(monta_serie())
+    datas = pd.Series(pd.to_datetime(['2019-10-31', '2020-01-15', '2020-09-30', None, '2019-10-30', '2020-10-01']))
+    pos, situacao = movimenta_BRR_v8.posicao_datas(datas, df_rata)
+    assert situacao.tolist() == [0, 0, 0, 1, 2, 3]
+    assert pos.tolist() == [0, 76, len(df_rata) - 1, 0, 0, 0]
+    assert (df_rata.index[pos[:3]] == datas[:3].to_numpy()).all()
+
+@pytest.mark.parametrize('data_ini, data_fim', [('2019-10-31', '2020-09-30'), ('2020-01-15', '2020-03-10'), ('2020-06-30', '2020-06-30')])
+def test_var_indice(data_ini, data_fim):
+    df_ipca = monta_serie()
+    df_rata = movimenta_BRR_v8.ipca_rata(df_ipca)
+    ref = ipca_rata_referencia(df_ipca)
+    var, situacao_ini, situacao_fim = movimenta_BRR_v8.var_indice(pd.Series(pd.to_datetime([data_ini])), pd.Series(pd.to_datetime([data_fim])), df_rata)
+    esperado = ref.loc[data_fim, 'Índice'] / ref.loc[data_ini, 'Índice']
+    assert situacao_ini.tolist() == [0] and situacao_fim.tolist() == [0]
+    np.testing.assert_allclose(var, [esperado], rtol=1e-14)
+
+def test_var_indice_datas_invalidas():
+    df_rata = movimenta_BRR_v8.ipca_rata(monta_serie())
+    datas_ini = pd.Series(pd.to_datetime([None, '2019-01-01', '2020-01-31']))
+    datas_fim = pd.Series(pd.to_datetime(['2020-01-31', '2020-01-31', '2021-01-31']))
+    var, situacao_ini, situacao_fim = movimenta_BRR_v8.var_indice(datas_ini, datas_fim, df_rata)
+    assert np.isnan(var).all()
+    assert situacao_ini.tolist() == [1, 2, 0] and situacao_fim.tolist() == [0, 0, 3]
+#______________________________________________________________________________________
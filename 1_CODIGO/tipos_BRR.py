@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:03:26 2026
+
+@author: cecil.skaleski, est.angelo
+
+Tipos compactos das colunas da BRR (comum às etapas converte, consolida e movimenta), aplicados logo após a carga da base.
+
+Colunas de texto com poucos valores distintos (município, serviço, conta contábil, elegibilidade, rtp) e a descrição dos ativos
+são convertidas em categorias (cada texto distinto é armazenado uma única vez, as linhas guardam apenas o código do texto).
+As colunas de data são convertidas em datetime64 (8 bytes por linha, sem objetos Timestamp).
+"""
+
+import pandas as pd
+from pandas.api.types import is_object_dtype
+
+#Colunas convertidas em categorias
+COLUNAS_CATEGORIAS = ['municipio', 'servico', 'conta_contabil', 'elegibilidade', 'rtp', 'onerosidade', 'descricao']
+#Categorias incluídas mesmo sem ocorrência na base (valores atribuídos durante o processamento, ex.: alterações de elegibilidade)
+CATEGORIAS_EXTRAS = {'elegibilidade': ['Não elegível']}
+#Colunas de data
+COLUNAS_DATAS = ['data_imob', 'data_monet']
+
+#______________________________________________________________________________________
+#Funções acessórias
+def memoria(df):
+    #Memória ocupada pelo dataframe [bytes], incluindo o conteúdo dos textos
+    return int(df.memory_usage(deep=True).sum())
+
+def formata_memoria(n_bytes):
+    #Formata a memória em MB (separadores brasileiros)
+    return '{:,.1f} MB'.format(n_bytes / 1024**2).replace(",", "~").replace(".", ",").replace("~", ".")
+
+def relata_memoria(antes, depois):
+    #Mensagem com a memória da base antes e depois da compactação
+    razao = antes / depois if depois > 0 else 1.0
+    return f"    Memória da base: {formata_memoria(antes)} -> {formata_memoria(depois)} ({'{:.1f}'.format(razao).replace('.', ',')}x menor)"
+#______________________________________________________________________________________
+
+#______________________________________________________________________________________
+#Compactação
+def converte_datas(coluna):
+    #Converte a coluna de datas em datetime64 (somente se todos os valores não nulos forem datas válidas)
+    if not is_object_dtype(coluna.dtype):
+        return coluna
+    datas = pd.to_datetime(coluna, dayfirst=True, errors='coerce', format='mixed')
+    if (datas.isnull() & coluna.notnull()).any():
+        return coluna
+    return datas
+
+def converte_categorias(coluna, extras=()):
+    #Converte a coluna em categorias (os nulos permanecem nulos)
+    if not isinstance(coluna.dtype, pd.CategoricalDtype):
+        coluna = coluna.astype('category')
+    novas = [valor for valor in extras if valor not in coluna.cat.categories]
+    if len(novas) > 0:
+        coluna = coluna.cat.add_categories(novas)
+    return coluna
+
+def compacta_tipos(df):
+    #Retorna a base com os tipos compactos e a memória ocupada antes e depois da conversão
+    #Colunas ausentes são ignoradas; os valores não são alterados
+    antes = memoria(df)
+    df = df.copy(deep=False)
+    for col in COLUNAS_DATAS:
+        if col in df.columns:
+            df[col] = converte_datas(df[col])
+    for col in COLUNAS_CATEGORIAS:
+        if col in df.columns:
+            df[col] = converte_categorias(df[col], CATEGORIAS_EXTRAS.get(col, ()))
+    return df, antes, memoria(df)
+#______________________________________________________________________________________
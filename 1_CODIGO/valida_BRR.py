@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:12:05 2026
+
+@author: cecil.skaleski, est.angelo
+
+Verificação dos requisitos mínimos de consistência das bases de BRR (comum às etapas converte e consolida).
+"""
+
+from pandas.api.types import is_integer_dtype
+from pandas.api.types import is_string_dtype
+
+#______________________________________________________________________________________
+#Funções de verificação
+def iu(tipo, plaqueta, complemento):
+    #Monta o código identificador único do ativo na base de referência da Sanepar
+    return f"{str(tipo).split('.')[0]}-{str(plaqueta).split('.')[0]}-{str(complemento).split('.')[0]}"
+
+def parte_iu(coluna):
+    #Converte uma coluna em texto conforme a regra do iu (parte anterior ao '.'), operando sobre a coluna inteira
+    if is_integer_dtype(coluna.dtype):
+        return coluna.astype(str)
+    return coluna.astype(str).str.split('.', n=1).str[0]
+
+def monta_iu(df, col_tipo='tipo', col_plaqueta='plaqueta', col_complemento='complemento'):
+    #Monta o código identificador único (tipo-plaqueta-complemento) de todos os ativos em operações por coluna
+    #Resultado idêntico à aplicação da função iu linha a linha
+    return parte_iu(df[col_tipo]) + '-' + parte_iu(df[col_plaqueta]) + '-' + parte_iu(df[col_complemento])
+
+def mascara_nulos_vazios(coluna):
+    #Marca os itens nulos ou vazios (somente espaços) da coluna
+    mask = coluna.isnull()
+    if is_string_dtype(coluna.dtype):
+        try:
+            mask = mask | coluna.str.strip().eq('')
+        except AttributeError:
+            #Coluna do tipo object sem nenhum texto
+            pass
+    return mask
+
+def verifica_reqs(df, col_names):
+    #Verifica a consistência das colunas indicadas (iu, taxa de depreciação e qtde)
+    #Retorna a flag de inconsistência, as mensagens de erro e as tabelas com as linhas inconsistentes de cada verificação
+    #O dataframe não é copiado nem alterado
+    col_iu = col_names[0]
+    col_deprec = col_names[1]
+    col_qtde = col_names[2]
+    cols_comp = ['tipo', 'plaqueta', 'complemento']
+    flag = False
+    err_msg = []
+    inconsistencias = {}
+    #Verifica se a coluna existe
+    if col_iu not in df.columns:
+        err_msg.append('Coluna com identificador único (iu) não encontrada!')
+        flag = True
+    else:
+        #Verifica se a coluna é consistente
+        mask = mascara_nulos_vazios(df[col_iu])
+        if mask.any():
+            err_msg.append('Coluna identificador único (iu) inconsistente! (itens nulos ou vazios)')
+            inconsistencias['iu nulo ou vazio'] = df.loc[mask, [col_iu]]
+            flag = True
+        #Verifica se há itens com iu replicado
+        mask = df[col_iu].duplicated(keep=False) & df[col_iu].notnull()
+        if mask.any():
+            err_msg.append('Identificadores únicos (iu) replicados nos dados processados!')
+            inconsistencias['iu replicado'] = df.loc[mask, [col_iu]].sort_values(col_iu)
+            flag = True
+        #Verifica a composição do código identificador único de ativo (IU)
+        cols_falt = [col for col in cols_comp if col not in df.columns]
+        if len(cols_falt) > 0:
+            err_msg.append(f'Colunas de composição do identificador único não encontradas: {", ".join(cols_falt)}!')
+            flag = True
+        else:
+            iu_verif = monta_iu(df, *cols_comp)
+            mask = (iu_verif != df[col_iu])
+            if mask.any():
+                #Itens com código inadequado
+                df_comp_res = df.loc[mask, cols_comp + [col_iu]].copy()
+                df_comp_res['iu_verif'] = iu_verif[mask]
+                err_msg.append('Inconsistências detectadas na composição do identificador único!')
+                inconsistencias['composição do iu'] = df_comp_res
+                flag = True
+    #Itens sem taxa de depreciação e sem quantidade definida
+    for col, nome in [(col_deprec, 'taxa de depreciação'), (col_qtde, 'quantidade')]:
+        #Verifica se a coluna existe
+        if col not in df.columns:
+            err_msg.append(f'Coluna {nome} não encontrada!')
+            flag = True
+        else:
+            #Verifica se a coluna é consistente
+            mask = mascara_nulos_vazios(df[col])
+            if mask.any():
+                err_msg.append(f'Coluna {nome} inconsistente! (itens nulos ou vazios)')
+                inconsistencias[f'{nome} nula ou vazia'] = df.loc[mask, [col_iu, col] if col_iu in df.columns else [col]]
+                flag = True
+    return flag, err_msg, inconsistencias
+
+def relata_inconsistencias(inconsistencias, n_linhas=10):
+    #Monta o relatório das inconsistências encontradas: nº de linhas e as primeiras linhas de cada verificação
+    linhas = []
+    for nome, df_inc in inconsistencias.items():
+        linhas.append(f'    {nome}: {len(df_inc)} linhas')
+        linhas.append(f'{df_inc.head(n_linhas)}')
+        if len(df_inc) > n_linhas:
+            linhas.append(f'    ... (+{len(df_inc) - n_linhas} linhas)')
+    return linhas
+#______________________________________________________________________________________